@@ -0,0 +1,46 @@
+import pytest
+from scrapinghelper import ExtractionSchema, Field, HTML
+
+FIELDS = {
+    'title': 'h1',
+    'next': ('a.next', 'href'),
+    'ranks': Field('', 'tr.item td.rank', many=True),
+    'names': Field('', 'tr.item td.name a', many=True),
+    'links': Field('', 'tr.item td.name a', 'href', many=True),
+    'prices': Field('', 'tr.item td.price', many=True),
+    'stocks': Field('', 'tr.item td.stock', many=True),
+}
+
+def find_fields(page: str) ->dict:
+    """ the same extraction with repeated HTML.find() calls. """
+    html = HTML(html=page)
+    return {
+        'title': html.find('h1', first=True).text,
+        'next': html.find('a.next', first=True).attrs.get('href'),
+        'ranks': [ x.text for x in html.find('tr.item td.rank') ],
+        'names': [ x.text for x in html.find('tr.item td.name a') ],
+        'links': [ x.attrs.get('href')
+                   for x in html.find('tr.item td.name a') ],
+        'prices': [ x.text for x in html.find('tr.item td.price') ],
+        'stocks': [ x.text for x in html.find('tr.item td.stock') ],
+    }
+
+@pytest.mark.benchmark(group='extract-page')
+def bench_extract_find(benchmark, listing_page):
+    result = benchmark(find_fields, listing_page)
+    assert len(result['names']) == 200
+
+@pytest.mark.benchmark(group='extract-page')
+def bench_extract_schema(benchmark, listing_page):
+    schema = ExtractionSchema(FIELDS)
+    result = benchmark(schema.apply, listing_page)
+    assert len(result[0]['names']) == 200
+
+@pytest.mark.benchmark(group='extract-batch')
+def bench_extract_schema_dataframe(benchmark, listing_pages):
+    schema = ExtractionSchema({'name': 'td.name a',
+                               'link': ('td.name a', 'href'),
+                               'price': ('td.price', None, float)},
+                              root='tr.item')
+    df = benchmark(schema.to_dataframe, listing_pages)
+    assert len(df) == 200 * len(listing_pages)
@@ -0,0 +1,21 @@
+import pytest
+from scrapinghelper import ParsePool
+from scrapinghelper.parallel import parse_links
+
+@pytest.fixture(scope='module')
+def pool():
+    with ParsePool(chunksize=4) as pool:
+        # start workers before measurement.
+        list(pool.map('links', ['<a href="/">warmup</a>'] * pool.workers))
+        yield pool
+
+@pytest.mark.benchmark(group='parse-pages')
+def bench_parse_links_serial(benchmark, listing_pages):
+    pages = [ x.encode() for x in listing_pages ]
+    result = benchmark(lambda: [ parse_links(x) for x in pages ])
+    assert len(result) == len(pages)
+
+@pytest.mark.benchmark(group='parse-pages')
+def bench_parse_links_pool(benchmark, pool, listing_pages):
+    result = benchmark(lambda: list(pool.map('links', listing_pages)))
+    assert len(result) == len(listing_pages)
@@ -0,0 +1,26 @@
+import pytest
+from scrapinghelper import RateLimiter, SharedRateLimiter
+
+DOMAINS = [ 'host{}.example.com'.format(x) for x in range(100) ]
+
+@pytest.mark.benchmark(group='ratelimit-reserve')
+def bench_ratelimiter_reserve(benchmark):
+    limiter = RateLimiter(rate=1e9, burst=1000)
+    benchmark(limiter.reserve, 'https://host1.example.com/page')
+
+@pytest.mark.benchmark(group='ratelimit-reserve')
+def bench_shared_ratelimiter_reserve(benchmark, tmp_path):
+    limiter = SharedRateLimiter(tmp_path / 'ratelimit', rate=1e9, burst=1000)
+    benchmark(limiter.reserve, 'https://host1.example.com/page')
+    limiter.close()
+
+@pytest.mark.benchmark(group='ratelimit-domains')
+def bench_shared_ratelimiter_domains(benchmark, tmp_path):
+    limiter = SharedRateLimiter(tmp_path / 'ratelimit', rate=1e9, burst=1000)
+
+    def reserve_all():
+        for domain in DOMAINS:
+            limiter.reserve(domain)
+
+    benchmark(reserve_all)
+    limiter.close()
@@ -0,0 +1,39 @@
+import pytest
+from scrapinghelper import Scraper, HTML
+
+BASE_URL = 'https://www.example.com/'
+
+@pytest.fixture(scope='module')
+def scraper():
+    # no rate limit to measure throughput.
+    with Scraper(sleep=0) as scraper:
+        yield scraper
+
+@pytest.mark.benchmark(group='parse-links')
+def bench_get_links(benchmark, scraper, large_page):
+    html = HTML(html=large_page, url=BASE_URL)
+    links = benchmark(scraper.get_links, html=html)
+    assert links
+
+@pytest.mark.benchmark(group='parse-links')
+def bench_get_links_endswith(benchmark, scraper, large_page):
+    html = HTML(html=large_page, url=BASE_URL)
+    benchmark(scraper.get_links, html=html, endswith='.html')
+
+@pytest.mark.benchmark(group='parse-texts')
+def bench_get_texts(benchmark, scraper, large_page):
+    html = HTML(html=large_page, url=BASE_URL)
+    texts = benchmark(scraper.get_texts, ['table', 'tr'], html=html)
+    assert texts
+
+@pytest.mark.benchmark(group='fetch')
+def bench_request(benchmark, scraper, http_server):
+    url = '{}/listing.html'.format(http_server.url)
+    response = benchmark(scraper.request, url, render=False)
+    assert response.status_code == 200
+
+@pytest.mark.benchmark(group='fetch')
+def bench_download_file(benchmark, scraper, http_server, tmp_path):
+    url = '{}/data.bin'.format(http_server.url)
+    filename = str(tmp_path / 'data.bin')
+    assert benchmark(scraper.download_file, url, filename)
@@ -0,0 +1,84 @@
+import sys
+import threading
+import functools
+from pathlib import Path
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+import pytest
+
+sys.path.insert(0,"..")
+
+DATA_DIR = Path(__file__).parent / 'data'
+
+def make_page(rows: int=200, seed: int=0) ->str:
+    """ generate deterministic product listing page. """
+    items = list()
+    for n in range(rows):
+        items.append(
+            '<tr class="item">'
+            f'<td class="rank">{n + 1}</td>'
+            f'<td class="name"><a href="/item/{seed}/{n}.html">item {n}</a></td>'
+            f'<td class="price">{(n * 37 + seed) % 1000}.{n % 100:02d}</td>'
+            f'<td class="stock">{n % 7}</td>'
+            '</tr>'
+        )
+    return (
+        '<html><head><title>listing {}</title></head><body>'
+        '<h1>Listing {}</h1><table id="list">{}</table>'
+        '<a class="next" href="/page/{}.html">next</a>'
+        '</body></html>'
+    ).format(seed, seed, ''.join(items), seed + 1)
+
+def make_text(urls: int=500) ->str:
+    """ generate text with urls. """
+    words = list()
+    for n in range(urls):
+        words.append('see https://www{}.example.com/path/{}/file{}.csv?id={}'
+                     ' and sample text {}.'.format(n % 10, n, n, n, n))
+    return ' '.join(words)
+
+def large_pages() ->dict:
+    """ saved pages of benchmarks/data/*.html, or generated pages. """
+    pages = { x.name: x.read_text(errors='ignore')
+              for x in sorted(DATA_DIR.glob('*.html')) }
+    if not pages:
+        pages = { 'listing-1000.html': make_page(rows=1000) }
+    return pages
+
+@pytest.fixture(scope='session')
+def listing_page() ->str:
+    return make_page()
+
+@pytest.fixture(scope='session')
+def listing_pages() ->list:
+    return [ make_page(seed=x) for x in range(20) ]
+
+@pytest.fixture(scope='session', params=sorted(large_pages()))
+def large_page(request) ->str:
+    return large_pages()[request.param]
+
+@pytest.fixture(scope='session')
+def url_text() ->str:
+    return make_text()
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture(scope='session')
+def http_server(tmp_path_factory):
+    """ serve listing page and binary file on localhost with keep-alive. """
+    docroot = tmp_path_factory.mktemp('www')
+    (docroot / 'listing.html').write_text(make_page())
+    (docroot / 'data.bin').write_bytes(bytes(range(256)) * 4096)
+    handler = functools.partial(QuietHandler, directory=str(docroot))
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.docroot = docroot
+    server.url = 'http://127.0.0.1:{}'.format(server.server_port)
+    yield server
+    server.shutdown()
+    server.server_close()
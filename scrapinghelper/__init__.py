@@ -1,10 +1,29 @@
 import sys
 from .scraper import (
-    Scraper, TAG_LINK, WebScraperException, WebScraperNotFound, MaxRetries,
+    Scraper, TAG_LINK, FetchResult, WebScraperException, WebScraperNotFound,
+    WebScraperDisallowed, MaxRetries,
     HTMLSession, AsyncHTMLSession, HTML, HTMLResponse, Element, PyQuery
 )
 from .user_agents import UserAgent, user_agent
 from .url import URL, remove_urls, replace_urls
+from .extract import ExtractionSchema, Field
+from .ratelimit import RateLimiter, SharedRateLimiter
+from .retry import RetryPolicy, RetryBudget, RetryScheduler
+from .metrics import Metrics, FetchTiming
+from .hooks import HookRegistry, ChromeTraceHook, hook_registry
+from .parallel import ParsePool
+from .sink import ResultSink
+from .store import DownloadStore
+from .connection import DNSCache
+from .transport import AiohttpTransport
+from .iptools import random_ips
+from .headers import HeaderProfiles
+from .robots import RobotsCache
+from .browser import BrowserService, BrowserRecycler
+from .render import ResourceBlocker, TRACKER_PATTERNS
+from .render import (
+    WaitStrategy, WaitForSelector, WaitForNetworkIdle, WaitForFunction
+)
 from .proxy import ProxyManager, PROXY, ProxyRotate, ProxyParseError
 from .logging import logger, LogConfig, LOG_LEVEL
 from .versions import __VERSION__
@@ -19,6 +38,7 @@ except AssertionError:
 __all__ = [
     "Scraper",
     "TAG_LINK",
+    "FetchResult",
     "HTMLSession",
     "AsyncHTMLSession",
     "HTML",
@@ -27,12 +47,41 @@ __all__ = [
     "PyQuery",
     "WebScraperException",
     "WebScraperNotFound",
+    "WebScraperDisallowed",
     "MaxRetries",
     "user_agent",
     "UserAgent",
     "URL",
     "remove_urls",
     "replace_urls",
+    "ExtractionSchema",
+    "Field",
+    "RateLimiter",
+    "SharedRateLimiter",
+    "RetryPolicy",
+    "RetryBudget",
+    "RetryScheduler",
+    "Metrics",
+    "FetchTiming",
+    "HookRegistry",
+    "ChromeTraceHook",
+    "hook_registry",
+    "ParsePool",
+    "ResultSink",
+    "DownloadStore",
+    "DNSCache",
+    "AiohttpTransport",
+    "random_ips",
+    "HeaderProfiles",
+    "RobotsCache",
+    "BrowserService",
+    "BrowserRecycler",
+    "ResourceBlocker",
+    "TRACKER_PATTERNS",
+    "WaitStrategy",
+    "WaitForSelector",
+    "WaitForNetworkIdle",
+    "WaitForFunction",
     "ProxyManager",
     "ProxyRotate",
     "ProxyParseError",
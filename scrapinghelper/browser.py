@@ -0,0 +1,336 @@
+import os
+import json
+import asyncio
+import threading
+import weakref
+import urllib.request
+from pathlib import Path
+from urllib.parse import urlparse
+from typing import Any, Optional, Union
+import pyppeteer
+from pyppeteer.browser import Browser, BrowserContext
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+DEFAULT_MAX_RENDERS = 1000
+DEFAULT_MAX_RSS = 2 * 1024 ** 3
+
+def _proc_children(pid: int) ->list:
+    """ Return pids of descendants of pid from /proc. """
+    parents: dict = dict()
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open('/proc/{}/stat'.format(entry)) as fp:
+                stat = fp.read()
+        except OSError:
+            continue
+        # comm may contain spaces, fields follow the last ')'.
+        ppid = int(stat[stat.rindex(')') + 2:].split()[1])
+        parents.setdefault(ppid, []).append(int(entry))
+    children, stack = list(), [pid]
+    while stack:
+        for child in parents.get(stack.pop(), []):
+            children.append(child)
+            stack.append(child)
+    return children
+
+def _proc_rss(pid: int) ->int:
+    try:
+        with open('/proc/{}/statm'.format(pid)) as fp:
+            return int(fp.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+def process_rss(pid: int) ->int:
+    """ Return RSS bytes of process and all its children.
+    use psutil if installed, otherwise /proc (Linux).
+    """
+    if psutil is not None:
+        try:
+            process = psutil.Process(pid)
+            processes = [process] + process.children(recursive=True)
+        except psutil.Error:
+            return 0
+        rss = 0
+        for x in processes:
+            try:
+                rss += x.memory_info().rss
+            except psutil.Error:
+                pass
+        return rss
+    if not os.path.isdir('/proc'):
+        return 0
+    return sum(_proc_rss(x) for x in [pid] + _proc_children(pid))
+
+
+class BrowserRecycler(object):
+    def __init__(self,
+        max_renders: int=DEFAULT_MAX_RENDERS,
+        max_rss: int=DEFAULT_MAX_RSS,
+        check_every: int=20,
+        metrics: Any=None,
+        ):
+        """ Restart browser after max_renders or when RSS exceeds max_rss.
+        sessions ask due() before each render. the browser is replaced
+        for new renders, and the old one is closed after its in-flight
+        renders finish.
+        contexts of BrowserService have no process, so that they are
+        restarted by max_renders only.
+
+        Parameters
+        ----------
+        max_renders: int
+            The number of renders per browser. 0 means no limit.
+        max_rss: int
+            The maximum RSS bytes of browser and its child processes.
+            0 means no limit.
+        check_every: int
+            check RSS every this number of renders.
+        metrics: Optional[Metrics]
+            if provided, 'browser_restarts_total' and 'browser_rss_bytes'
+            are updated.
+        """
+        self.max_renders = max_renders
+        self.max_rss = max_rss
+        self.check_every = max(check_every, 1)
+        self.metrics = metrics
+        self.restarts: int = 0
+        self.renders: int = 0
+        self.rss: int = 0
+        self._counts: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def due(self, browser: Any) ->bool:
+        """ Return True if browser should be restarted before next render. """
+        count = self._counts.get(browser, 0)
+        if not count:
+            return False
+        if self.max_renders and count >= self.max_renders:
+            return True
+        if self.max_rss and count % self.check_every == 0:
+            process = getattr(browser, 'process', None)
+            if process is not None:
+                self.rss = process_rss(process.pid)
+                if self.metrics is not None:
+                    self.metrics.set_value('browser_rss_bytes', self.rss,
+                                           help_text='RSS of browser.')
+                return self.rss > self.max_rss
+        return False
+
+    def count(self, browser: Any) ->None:
+        """ count a render of browser. """
+        with self._lock:
+            self._counts[browser] = self._counts.get(browser, 0) + 1
+            self.renders += 1
+
+    def restarted(self) ->None:
+        with self._lock:
+            self.restarts += 1
+        if self.metrics is not None:
+            self.metrics.inc('browser_restarts_total',
+                             help_text='Number of browser restarts.')
+
+    def stats(self) ->dict:
+        return dict(restarts=self.restarts, renders=self.renders,
+                    rss=self.rss)
+
+    def __repr__(self) ->str:
+        return ( 'BrowserRecycler(max_renders={}, max_rss={}, restarts={})'
+                 .format(self.max_renders, self.max_rss, self.restarts) )
+
+
+class ServiceContext(object):
+    def __init__(self, browser: Browser, context: BrowserContext):
+        """ Incognito context of BrowserService for one session.
+        works as browser for render, close() closes only the context
+        and disconnects, the browser process keeps running.
+        """
+        self.browser = browser
+        self.context = context
+
+    async def newPage(self) ->Any:
+        return await self.context.newPage()
+
+    async def close(self) ->None:
+        try:
+            await self.context.close()
+        finally:
+            await self.browser.disconnect()
+
+    def __getattr__(self, name: str) ->Any:
+        return getattr(self.context, name)
+
+
+class BrowserService(object):
+    def __init__(self,
+        endpoint: Optional[str]=None,
+        endpoint_file: Optional[Union[str, Path]]=None,
+        browser_args: Optional[list]=None,
+        ignore_https_errors: bool=True,
+        **launch_kwargs: Any,
+        ):
+        """ Long-lived browser shared by sessions and processes.
+        sessions connect by websocket and render in their own
+        incognito contexts, so that browser launch is off the
+        critical path of each job.
+
+        Parameters
+        ----------
+        endpoint: Optional[str]
+            websocket endpoint of running browser to attach.
+            i.e. 'ws://127.0.0.1:9222/devtools/browser/<id>'
+            default is environment variable SCRAPINGHELPER_BROWSER_WS.
+        endpoint_file: Optional[Union[str, Path]]
+            file to share endpoint between processes.
+            if browser of endpoint in file is alive, attach to it.
+            otherwise, launch browser and write its endpoint.
+        browser_args: Optional[list]
+            arguments for browser to launch.
+        ignore_https_errors: bool
+            if True, ignore HTTPS errors of pages.
+        **launch_kwargs:
+            options of pyppeteer.launch()
+
+        Examples
+        --------
+        >>> service = BrowserService(endpoint_file='/tmp/scrapinghelper.ws')
+        >>> service.start()     # launch or attach, once per node.
+        'ws://127.0.0.1:40233/devtools/browser/...'
+        >>> scraper = Scraper(browser_service=service)
+        """
+        self.endpoint = endpoint or os.environ.get('SCRAPINGHELPER_BROWSER_WS')
+        self.endpoint_file = Path(endpoint_file) if endpoint_file else None
+        self.browser_args = browser_args
+        self.ignore_https_errors = ignore_https_errors
+        self.launch_kwargs = launch_kwargs
+        self.process: Any = None
+
+    @staticmethod
+    def is_alive(endpoint: Optional[str], timeout: float=1.0) ->bool:
+        """ Return True if browser of websocket endpoint is running. """
+        if not endpoint:
+            return False
+        url = urlparse(endpoint)
+        try:
+            with urllib.request.urlopen(
+                    'http://{}/json/version'.format(url.netloc),
+                    timeout=timeout) as response:
+                version = json.loads(response.read())
+        except (OSError, ValueError):
+            return False
+        return version.get('webSocketDebuggerUrl') == endpoint
+
+    def start(self) ->str:
+        """ attach to running browser, or launch browser.
+        Returns
+        -------
+        endpoint: str
+            websocket endpoint of browser.
+        """
+        if self.endpoint and self.is_alive(self.endpoint):
+            return self.endpoint
+        if self.endpoint_file is None:
+            self.endpoint = self._launch()
+            return self.endpoint
+
+        self.endpoint_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.endpoint_file, 'a+') as fp:
+            # only one process launches browser.
+            if fcntl is not None:
+                fcntl.flock(fp, fcntl.LOCK_EX)
+            try:
+                fp.seek(0)
+                endpoint = fp.read().strip()
+                if not self.is_alive(endpoint):
+                    endpoint = self._launch()
+                    fp.seek(0)
+                    fp.truncate()
+                    fp.write(endpoint)
+                    fp.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fp, fcntl.LOCK_UN)
+        self.endpoint = endpoint
+        return endpoint
+
+    def _launch(self) ->str:
+        loop = asyncio.new_event_loop()
+        try:
+            browser = loop.run_until_complete(pyppeteer.launch(
+                            headless=True,
+                            args=self.browser_args or [],
+                            ignoreHTTPSErrors=self.ignore_https_errors,
+                            autoClose=False,
+                            handleSIGINT=False,
+                            handleSIGTERM=False,
+                            handleSIGHUP=False,
+                            **self.launch_kwargs))
+            endpoint = browser.wsEndpoint
+            self.process = browser.process
+            # keep browser process running after disconnect.
+            loop.run_until_complete(browser.disconnect())
+        finally:
+            loop.close()
+        return endpoint
+
+    async def open_context(self,
+        proxy_server: Optional[str]=None,
+        ) ->ServiceContext:
+        """ connect to browser and create incognito context.
+        must be called on the event loop of the session.
+
+        Parameters
+        ----------
+        proxy_server: Optional[str]
+            proxy server of context. requires Chrome 84 or later.
+        """
+        if not self.endpoint:
+            # launch in other thread, which runs its own event loop.
+            await asyncio.get_running_loop().run_in_executor(None, self.start)
+        browser = await pyppeteer.connect(
+                        browserWSEndpoint=self.endpoint,
+                        ignoreHTTPSErrors=self.ignore_https_errors)
+        try:
+            if proxy_server:
+                obj = await browser._connection.send(
+                            'Target.createBrowserContext',
+                            {'proxyServer': proxy_server})
+                context = BrowserContext(browser, obj['browserContextId'])
+                browser._contexts[obj['browserContextId']] = context
+            else:
+                context = await browser.createIncognitoBrowserContext()
+        except Exception:
+            await browser.disconnect()
+            raise
+        return ServiceContext(browser, context)
+
+    def stop(self) ->None:
+        """ terminate browser process launched by this service. """
+        if self.process is not None:
+            self.process.terminate()
+            try:
+                self.process.wait(10)
+            except Exception:
+                self.process.kill()
+            self.process = None
+        if self.endpoint_file is not None and self.endpoint_file.exists():
+            if not self.is_alive(self.endpoint_file.read_text().strip()):
+                self.endpoint_file.unlink()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args: Any) ->None:
+        self.stop()
+
+    def __repr__(self) ->str:
+        return 'BrowserService(endpoint={})'.format(self.endpoint)
@@ -0,0 +1,438 @@
+import socket
+import ipaddress
+import threading
+from time import perf_counter, monotonic
+from collections import OrderedDict
+from typing import Any, Optional, Iterable
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from .encoding import install_decoder
+from .retry import DEFAULT_RETRY_STATUSES
+try:
+    import dns.resolver
+except ImportError:
+    dns = None
+
+TIMING_PHASES = ('dns', 'connect', 'tls', 'ttfb')
+
+# phases and DNS cache of the request being sent by this thread.
+_local = threading.local()
+
+def _is_ip(host: str) ->bool:
+    try:
+        ipaddress.ip_address(host.strip('[]'))
+        return True
+    except ValueError:
+        return False
+
+
+class DNSCache(object):
+    def __init__(self,
+        ttl: float=300.0,
+        min_ttl: float=5.0,
+        max_entries: int=4096,
+        ):
+        """ In-process cache of getaddrinfo() results.
+        entries expire by TTL of DNS record if dnspython is installed,
+        otherwise by ttl. IP addresses are not cached.
+
+        Parameters
+        ----------
+        ttl: float
+            The maximum seconds to cache an entry.
+        min_ttl: float
+            The minimum seconds to cache an entry.
+        max_entries: int
+            The number of entries to keep. the oldest used is evicted.
+        """
+        self.ttl = ttl
+        self.min_ttl = min_ttl
+        self.max_entries = max_entries
+        self.hits: int = 0
+        self.misses: int = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _record_ttl(self, host: str) ->float:
+        if dns is None:
+            return self.ttl
+        try:
+            answer = dns.resolver.resolve(host, 'A', raise_on_no_answer=False)
+        except Exception:
+            return self.ttl
+        if answer.rrset is None:
+            return self.ttl
+        return min(max(answer.rrset.ttl, self.min_ttl), self.ttl)
+
+    def resolve(self, host: str, port: int) ->list:
+        """ Return getaddrinfo() of host from cache, or resolve it. """
+        key = (host.lower(), port)
+        now = monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        addrinfo = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        if _is_ip(host):
+            return addrinfo
+        expires = monotonic() + self._record_ttl(host)
+        with self._lock:
+            self._entries[key] = (expires, addrinfo)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return addrinfo
+
+    def invalidate(self, host: str) ->None:
+        """ remove entries of host. i.e. address is not reachable. """
+        with self._lock:
+            for key in [ x for x in self._entries if x[0] == host.lower() ]:
+                del self._entries[key]
+
+    def clear(self) ->None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) ->int:
+        return len(self._entries)
+
+    def __repr__(self) ->str:
+        return 'DNSCache(entries={}, hits={}, misses={})'.format(
+                    len(self._entries), self.hits, self.misses)
+
+
+class _TimedConnectionMixin(object):
+    def _new_conn(self) ->socket.socket:
+        timing = getattr(_local, 'timing', None)
+        cache = getattr(_local, 'dns_cache', None)
+        if timing is None and cache is None:
+            return super()._new_conn()
+
+        host = self._dns_host
+        start = perf_counter()
+        try:
+            if cache is not None:
+                addrinfo = cache.resolve(host, self.port)
+            else:
+                addrinfo = socket.getaddrinfo(host, self.port,
+                                              0, socket.SOCK_STREAM)
+        except OSError:
+            # let urllib3 raise its own exception.
+            return super()._new_conn()
+        resolved = perf_counter()
+        if timing is not None:
+            timing['dns'] += resolved - start
+
+        self._dns_host = addrinfo[0][4][0]
+        try:
+            conn = super()._new_conn()
+        except Exception as e:
+            if cache is not None:
+                cache.invalidate(host)
+            # NewConnectionError is a subclass of ConnectTimeoutError.
+            if ( isinstance(e, ConnectTimeoutError)
+                 and not isinstance(e, NewConnectionError) ):
+                # connecting by hostname would wait for timeout again.
+                # the next attempt resolves host again.
+                raise
+            # address may be stale, try all addresses of host.
+            self._dns_host = host
+            conn = super()._new_conn()
+        finally:
+            self._dns_host = host
+        if timing is not None:
+            timing['connect'] += perf_counter() - resolved
+        return conn
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    def connect(self) ->None:
+        timing = getattr(_local, 'timing', None)
+        if timing is None:
+            return super().connect()
+        before = timing['dns'] + timing['connect']
+        start = perf_counter()
+        super().connect()
+        elapsed = perf_counter() - start
+        timing['tls'] += elapsed - (timing['dns'] + timing['connect'] - before)
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+TIMED_POOL_CLASSES = {
+    'http': TimedHTTPConnectionPool,
+    'https': TimedHTTPSConnectionPool,
+}
+
+class PooledAdapter(HTTPAdapter):
+    def __init__(self,
+            pool_connections: int=10,
+            pool_maxsize: int=10,
+            max_retries: int=0,
+            backoff_factor: float=0.0,
+            status_forcelist: Optional[Iterable[int]]=None,
+            pool_block: bool=False,
+            keep_alive: bool=True,
+            dns_cache: Optional[DNSCache]=None,
+            max_proxies: int=256,
+            proxy_idle_timeout: float=300.0,
+        )->None:
+        """ HTTPAdapter with keep-alive connection pools.
+        the adapter is shared between sessions of Scraper,
+        so that connections survive session close and proxy rotation.
+
+        Parameters
+        ----------
+        pool_connections: int
+            The number of hosts to keep connection pools for.
+        pool_maxsize: int
+            The maximum number of connections to keep per host.
+        max_retries: int
+            The number of retries at the adapter level.
+            default is 0 (no retry).
+        backoff_factor: float
+            backoff factor for retries of urllib3.
+        status_forcelist: Optional[Iterable[int]]
+            HTTP status codes to retry.
+            default is DEFAULT_RETRY_STATUSES of retry.
+        pool_block: bool
+            if True, wait for a free connection when pool is full.
+        keep_alive: bool
+            if False, send 'Connection: close' for every request.
+        dns_cache: Optional[DNSCache]
+            if provided, resolve hosts of new connections with it.
+        max_proxies: int
+            The number of proxies to keep connection pools for.
+            pools of the least recently used proxy are closed.
+        proxy_idle_timeout: float
+            seconds to keep connection pools of unused proxy.
+            0 means no timeout.
+        """
+        if max_retries:
+            max_retries = Retry(
+                total=max_retries,
+                connect=max_retries,
+                read=max_retries,
+                backoff_factor=backoff_factor,
+                status_forcelist=status_forcelist or DEFAULT_RETRY_STATUSES,
+                raise_on_status=False,
+            )
+        self.keep_alive = keep_alive
+        self.dns_cache = dns_cache
+        self.max_proxies = max_proxies
+        self.proxy_idle_timeout = proxy_idle_timeout
+        self.proxy_evictions: int = 0
+        super().__init__(pool_connections=pool_connections,
+                         pool_maxsize=pool_maxsize,
+                         max_retries=max_retries,
+                         pool_block=pool_block)
+        # proxy -> ProxyManager, in order of last use.
+        self.proxy_manager: OrderedDict = OrderedDict()
+        self._proxy_used: dict = dict()
+        self._proxy_lock = threading.Lock()
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) ->None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = TIMED_POOL_CLASSES
+
+    def proxy_manager_for(self, proxy: str, **proxy_kwargs: Any) ->Any:
+        """ Return ProxyManager of proxy, which keeps connections and
+        CONNECT tunnels to the proxy across requests and rotations.
+        """
+        with self._proxy_lock:
+            new = proxy not in self.proxy_manager
+            manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+            if new and not proxy.lower().startswith('socks'):
+                manager.pool_classes_by_scheme = TIMED_POOL_CLASSES
+            self.proxy_manager.move_to_end(proxy)
+            self._proxy_used[proxy] = monotonic()
+            evicted = self._evict_proxies(keep=proxy)
+        for x in evicted:
+            x.clear()
+        return manager
+
+    def _evict_proxies(self, keep: Optional[str]=None) ->list:
+        evicted = list()
+        if self.proxy_idle_timeout:
+            deadline = monotonic() - self.proxy_idle_timeout
+            for proxy in list(self.proxy_manager.keys()):
+                if proxy != keep and self._proxy_used.get(proxy, 0) < deadline:
+                    evicted.append(self._pop_proxy(proxy))
+        while self.max_proxies and len(self.proxy_manager) > self.max_proxies:
+            proxy = next(iter(self.proxy_manager))
+            if proxy == keep:
+                break
+            evicted.append(self._pop_proxy(proxy))
+        return evicted
+
+    def _pop_proxy(self, proxy: str) ->Any:
+        self.proxy_evictions += 1
+        self._proxy_used.pop(proxy, None)
+        return self.proxy_manager.pop(proxy)
+
+    def evict_idle_proxies(self) ->int:
+        """ close connection pools of proxies idle for proxy_idle_timeout.
+        Returns
+        -------
+        evicted: int
+            The number of proxies evicted.
+        """
+        with self._proxy_lock:
+            evicted = self._evict_proxies()
+        for x in evicted:
+            x.clear()
+        return len(evicted)
+
+    def send(self, request: requests.PreparedRequest,
+             **kwargs: Any) ->requests.Response:
+        """ send request and set phases of request to response.timings.
+        response.timings is dict of seconds for 'dns', 'connect', 'tls'
+        and 'ttfb'. 'ttfb' is time from sending request to
+        receive response headers.
+        response.transfer is TransferStats of body, counts bytes on the
+        wire and decoded bytes of 'gzip', 'deflate', 'br' and 'zstd'.
+        """
+        if not self.keep_alive:
+            request.headers['Connection'] = 'close'
+        timing = dict.fromkeys(TIMING_PHASES, 0.0)
+        _local.timing = timing
+        _local.dns_cache = self.dns_cache
+        start = perf_counter()
+        try:
+            response = super().send(request, **kwargs)
+        finally:
+            _local.timing = None
+            _local.dns_cache = None
+        timing['ttfb'] = max( perf_counter() - start
+                              - timing['dns'] - timing['connect']
+                              - timing['tls'], 0.0 )
+        response.timings = timing
+        response.transfer = install_decoder(response.raw)
+        return response
+
+    def prewarm(self,
+        url: str,
+        connections: int=1,
+        proxies: Optional[dict]=None,
+        verify: Any=True,
+        timeout: Optional[float]=None,
+        ) ->int:
+        """ open keep-alive connections to host of url, and return
+        them to the pool for following requests. idle connections
+        in the pool count toward connections.
+        Returns
+        -------
+        connections: int
+            The number of connections opened by this call.
+        """
+        request = requests.Request('GET', url).prepare()
+        if hasattr(self, 'get_connection_with_tls_context'):
+            pool = self.get_connection_with_tls_context(request, verify,
+                                                        proxies=proxies)
+        else:
+            pool = self.get_connection(url, proxies)
+        _local.dns_cache = self.dns_cache
+        taken, opened = list(), 0
+        try:
+            for _ in range(connections):
+                conn = pool._get_conn(timeout=timeout)
+                taken.append(conn)
+                if getattr(conn, 'sock', None) is not None:
+                    # already connected, keep it out of next _get_conn().
+                    continue
+                if timeout is not None:
+                    conn.timeout = timeout
+                try:
+                    if pool.proxy is not None and pool.scheme == 'https':
+                        # CONNECT tunnel and TLS through proxy.
+                        pool._prepare_proxy(conn)
+                    else:
+                        conn.connect()
+                except Exception:
+                    conn.close()
+                    raise
+                opened += 1
+        finally:
+            _local.dns_cache = None
+            for conn in taken:
+                pool._put_conn(conn)
+        return opened
+
+    def _pools(self) ->list:
+        managers = [ (None, self.poolmanager) ]
+        with self._proxy_lock:
+            managers += list(self.proxy_manager.items())
+        pools = list()
+        for proxy, manager in managers:
+            for key in manager.pools.keys():
+                pool = manager.pools.get(key)
+                if pool is not None:
+                    pools.append((proxy, pool))
+        return pools
+
+    def stats(self) ->dict:
+        """ Return connection reuse statistics per host.
+        Returns
+        -------
+        stats: dict
+            {'scheme://host:port': {'connections': int,
+                                    'requests': int,
+                                    'reused': int,
+                                    'idle': int,
+                                    'proxy': Optional[str]}}
+            'connections' is the number of new connections was opened,
+            'reused' is the number of requests sent on
+            an already opened connection.
+        """
+        stats = dict()
+        for proxy, pool in self._pools():
+            key = '{}://{}:{}'.format(pool.scheme, pool.host, pool.port)
+            if proxy:
+                key = '{} via {}'.format(key, proxy)
+            stats[key] = dict(
+                connections=pool.num_connections,
+                requests=pool.num_requests,
+                reused=max(pool.num_requests - pool.num_connections, 0),
+                idle=pool.pool.qsize() if pool.pool else 0,
+                proxy=proxy,
+            )
+        return stats
+
+
+def mount_adapter(
+        session: requests.Session,
+        adapter: HTTPAdapter,
+    ) ->requests.Session:
+    """ mount adapter for http:// and https:// to session. """
+    for prefix in ('http://', 'https://'):
+        session.mount(prefix, adapter)
+    return session
+
+def unmount_adapter(
+        session: requests.Session,
+        adapter: HTTPAdapter,
+    ) ->requests.Session:
+    """ detach adapter from session.
+    shared adapter should be detached before session.close(),
+    otherwise all pooled connections will be closed.
+    """
+    for prefix in [ k for k, v in session.adapters.items() if v is adapter ]:
+        del session.adapters[prefix]
+    return session
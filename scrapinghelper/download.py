@@ -0,0 +1,249 @@
+import os
+import re
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, NamedTuple, Optional, Union
+import requests
+from .logging import logger
+
+CHUNK_SIZE = 64 * 1024
+MIN_SEGMENT_SIZE = 8 * 1024 * 1024
+_CONTENT_RANGE = re.compile(r'bytes\s+(\d+)-(\d+)/(\d+|\*)', re.I)
+
+class Segment(NamedTuple):
+    start: int
+    end: int            # inclusive
+
+    @property
+    def size(self) ->int:
+        return self.end - self.start + 1
+
+
+class SegmentError(Exception):
+    pass
+
+
+def file_digest(filename: Union[str, os.PathLike],
+                algorithm: str='sha256',
+                chunk_size: int=1024 * 1024) ->str:
+    """ Return hex digest of file. """
+    h = hashlib.new(algorithm)
+    with open(filename, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def verify_checksum(filename: Union[str, os.PathLike], checksum: str) ->bool:
+    """ verify file with checksum 'algorithm:hexdigest'. i.e. 'sha256:ab12...'
+    algorithm is 'sha256' if omitted.
+    """
+    algorithm, _, expected = checksum.rpartition(':')
+    return file_digest(filename, algorithm or 'sha256') == expected.lower()
+
+def split_segments(size: int,
+                   segments: int,
+                   min_size: int=MIN_SEGMENT_SIZE) ->list:
+    """ split size bytes into at most segments ranges of min_size or more. """
+    if size <= 0:
+        return []
+    count = max(min(segments, size // max(min_size, 1)), 1)
+    step = -(-size // count)
+    return [ Segment(x, min(x + step, size) - 1)
+             for x in range(0, size, step) ]
+
+def unlink_shared(filename: Union[str, os.PathLike]) ->None:
+    """ remove filename if it has other hardlinks, i.e. blob of
+    DownloadStore, so that writing new file does not change them.
+    """
+    try:
+        if os.stat(filename).st_nlink > 1:
+            os.unlink(filename)
+    except FileNotFoundError:
+        pass
+
+def _pwrite(fd: int, data: bytes, offset: int, lock: threading.Lock) ->None:
+    if hasattr(os, 'pwrite'):
+        view = memoryview(data)
+        while view:
+            written = os.pwrite(fd, view, offset)
+            view, offset = view[written:], offset + written
+    else:
+        with lock:
+            os.lseek(fd, offset, os.SEEK_SET)
+            os.write(fd, data)
+
+
+class SegmentedDownload(object):
+    def __init__(self,
+        session: Callable[[], requests.Session],
+        segments: int=4,
+        chunk_size: int=CHUNK_SIZE,
+        retries: int=3,
+        backoff: float=0.5,
+        min_segment_size: int=MIN_SEGMENT_SIZE,
+        timeout: Optional[float]=None,
+        ):
+        """ Download one file by concurrent byte ranges.
+        size and range support are probed with 'Range: bytes=0-0',
+        segments are written into a preallocated file by positional
+        writes, and each segment is retried from where it stopped.
+
+        Parameters
+        ----------
+        session: Callable[[], requests.Session]
+            Return session for calling thread.
+        segments: int
+            The number of concurrent ranges.
+        chunk_size: int
+            bytes of chunk to read and write.
+        retries: int
+            The number of retries per segment.
+        backoff: float
+            seconds to wait before retry, doubled on each retry.
+        min_segment_size: int
+            The minimum bytes of segment. small files use less segments.
+        timeout: Optional[float]
+            timeout of requests.
+        """
+        self.session = session
+        self.segments = max(segments, 1)
+        self.chunk_size = chunk_size
+        self.retries = retries
+        self.backoff = backoff
+        self.min_segment_size = min_segment_size
+        self.timeout = timeout
+        self.retried: int = 0
+        self.response: Optional[requests.Response] = None
+        self._lock = threading.Lock()
+
+    def probe(self, url: str, headers: Optional[dict]=None) ->Optional[tuple]:
+        """ Return (size, validator) if server supports byte ranges.
+        None means to download in single stream.
+        """
+        # offsets of ranges are of encoded body, which must not be decoded.
+        headers = dict(headers or {}, Range='bytes=0-0')
+        headers['Accept-Encoding'] = 'identity'
+        with self.session().get(url, headers=headers, stream=True,
+                                timeout=self.timeout) as response:
+            if response.status_code != 206:
+                return None
+            self.response = response
+            matched = _CONTENT_RANGE.match(
+                        response.headers.get('Content-Range', ''))
+            if not matched or matched.group(3) == '*':
+                return None
+            validator = ( response.headers.get('ETag')
+                          or response.headers.get('Last-Modified') )
+            if validator and validator.startswith('W/'):
+                # weak ETag could not be used for If-Range.
+                validator = response.headers.get('Last-Modified')
+            return int(matched.group(3)), validator
+
+    def _fetch(self,
+        url: str,
+        fd: int,
+        segment: Segment,
+        headers: dict,
+        ) ->int:
+        offset, attempt = segment.start, 0
+        while True:
+            try:
+                range_headers = dict(headers,
+                                     Range='bytes={}-{}'.format(offset, segment.end))
+                with self.session().get(url, headers=range_headers, stream=True,
+                                        timeout=self.timeout) as response:
+                    if response.status_code != 206:
+                        # content changed (If-Range) or ranges not served.
+                        raise SegmentError('status {} for range {}-{}'.format(
+                                    response.status_code, offset, segment.end))
+                    for chunk in response.iter_content(chunk_size=self.chunk_size):
+                        chunk = chunk[:segment.end + 1 - offset]
+                        _pwrite(fd, chunk, offset, self._lock)
+                        offset += len(chunk)
+                        if offset > segment.end:
+                            break
+                if offset <= segment.end:
+                    raise SegmentError('short read of range {}-{}'.format(
+                                    segment.start, segment.end))
+                return segment.size
+            except (requests.exceptions.RequestException, SegmentError) as e:
+                if attempt >= self.retries:
+                    raise
+                attempt += 1
+                with self._lock:
+                    self.retried += 1
+                logger.debug('retry segment {}-{} from {}: {}',
+                             segment.start, segment.end, offset, e)
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+
+    def download(self,
+        url: str,
+        filename: Union[str, os.PathLike],
+        headers: Optional[dict]=None,
+        checksum: Optional[str]=None,
+        ) ->Optional[int]:
+        """ download url into filename by segments.
+        segments are written into filename + '.part', which replaces
+        filename after size and checksum are verified. the part file is
+        removed on failure, so that filename is never left half written.
+
+        Parameters
+        ----------
+        checksum: Optional[str]
+            if set, verify downloaded file. 'sha256:<hexdigest>'
+
+        Returns
+        -------
+        size: Optional[int]
+            bytes of file. None if server does not support byte ranges,
+            and nothing was written.
+        """
+        probed = self.probe(url, headers)
+        if probed is None:
+            return None
+        size, validator = probed
+        headers = dict(headers or {})
+        # conditional headers of caller are for the whole response.
+        for key in ('If-None-Match', 'If-Modified-Since'):
+            headers.pop(key, None)
+        if validator:
+            headers['If-Range'] = validator
+        headers['Accept-Encoding'] = 'identity'
+
+        segments = split_segments(size, self.segments, self.min_segment_size)
+        partname = '{}.part'.format(os.fspath(filename))
+        try:
+            fd = os.open(partname, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                if hasattr(os, 'posix_fallocate') and size:
+                    try:
+                        os.posix_fallocate(fd, 0, size)
+                    except OSError:
+                        os.ftruncate(fd, size)
+                else:
+                    os.ftruncate(fd, size)
+                with ThreadPoolExecutor(max_workers=len(segments) or 1) as executor:
+                    futures = [ executor.submit(self._fetch, url, fd, x, headers)
+                                for x in segments ]
+                    written = sum(x.result() for x in futures)
+            finally:
+                os.close(fd)
+            if written != size or os.path.getsize(partname) != size:
+                raise SegmentError('size mismatch: {} != {}'.format(written, size))
+            if checksum and not verify_checksum(partname, checksum):
+                raise SegmentError('checksum mismatch: {}'.format(filename))
+            # replacing the name leaves other hardlinks of filename as they are.
+            os.replace(partname, filename)
+        except BaseException:
+            try:
+                os.unlink(partname)
+            except FileNotFoundError:
+                pass
+            raise
+        return size
+
+    def __repr__(self) ->str:
+        return 'SegmentedDownload(segments={}, retries={})'.format(
+                    self.segments, self.retries)
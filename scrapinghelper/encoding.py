@@ -0,0 +1,150 @@
+import zlib
+from typing import Any, Optional
+import brotli
+import zstandard
+from urllib3.response import GzipDecoder, DeflateDecoder
+
+ACCEPT_ENCODING = 'gzip, deflate, br, zstd'
+
+class BrotliDecoder(object):
+    def __init__(self):
+        self._obj = brotli.Decompressor()
+
+    def decompress(self, data: bytes) ->bytes:
+        if not data:
+            return b''
+        return self._obj.process(data)
+
+    def flush(self) ->bytes:
+        return b''
+
+
+class ZstdDecoder(object):
+    def __init__(self):
+        self._obj = zstandard.ZstdDecompressor().decompressobj()
+
+    def decompress(self, data: bytes) ->bytes:
+        if not data:
+            return b''
+        output = [ self._obj.decompress(data) ]
+        # body may have several frames.
+        while self._obj.eof and self._obj.unused_data:
+            unused = self._obj.unused_data
+            self._obj = zstandard.ZstdDecompressor().decompressobj()
+            output.append(self._obj.decompress(unused))
+        return b''.join(output)
+
+    def flush(self) ->bytes:
+        return b''
+
+
+class IdentityDecoder(object):
+    def decompress(self, data: bytes) ->bytes:
+        return data
+
+    def flush(self) ->bytes:
+        return b''
+
+
+_DECODERS = {
+    'gzip': GzipDecoder,
+    'x-gzip': GzipDecoder,
+    'deflate': DeflateDecoder,
+    'br': BrotliDecoder,
+    'zstd': ZstdDecoder,
+    'identity': IdentityDecoder,
+}
+
+class TransferStats(object):
+    def __init__(self, encoding: str=''):
+        """ bytes of response body on the wire and after decoding.
+        updated while body is read, so that streaming downloads are
+        counted too.
+        """
+        self.encoding = encoding
+        self.compressed: int = 0
+        self.decompressed: int = 0
+
+    @property
+    def saved(self) ->int:
+        """ bytes saved by content-encoding. """
+        return self.decompressed - self.compressed
+
+    @property
+    def ratio(self) ->float:
+        """ compressed / decompressed. 1.0 for identity. """
+        if not self.decompressed:
+            return 1.0
+        return self.compressed / self.decompressed
+
+    def as_dict(self) ->dict:
+        return dict(encoding=self.encoding, compressed=self.compressed,
+                    decompressed=self.decompressed, saved=self.saved)
+
+    def __repr__(self) ->str:
+        return ( 'TransferStats(encoding={!r}, compressed={}, decompressed={})'
+                 .format(self.encoding, self.compressed, self.decompressed) )
+
+
+class ContentDecoder(object):
+    def __init__(self, content_encoding: Optional[str]=None):
+        """ Incremental decoder of Content-Encoding for urllib3 response.
+        supports 'gzip', 'deflate', 'br' and 'zstd', and counts
+        bytes before and after decoding in self.stats.
+
+        Parameters
+        ----------
+        content_encoding: Optional[str]
+            value of Content-Encoding header. i.e. 'br', 'gzip, zstd'
+            unknown codings raise ValueError.
+        """
+        encodings = [ x.strip().lower()
+                      for x in (content_encoding or '').split(',')
+                      if x.strip() ]
+        for encoding in encodings:
+            if encoding not in _DECODERS:
+                raise ValueError('Unsupported content-encoding: {}'.format(
+                                    encoding))
+        self.stats = TransferStats(', '.join(encodings) or 'identity')
+        # codings are listed in the order applied.
+        self._decoders = [ _DECODERS[x]() for x in reversed(encodings) ]
+
+    def decompress(self, data: bytes) ->bytes:
+        self.stats.compressed += len(data)
+        try:
+            for decoder in self._decoders:
+                data = decoder.decompress(data)
+        except Exception as e:
+            # urllib3 wraps IOError and zlib.error with DecodeError.
+            if isinstance(e, (IOError, zlib.error)):
+                raise
+            raise IOError(e)
+        self.stats.decompressed += len(data)
+        return data
+
+    def flush(self) ->bytes:
+        data = b''
+        for decoder in self._decoders:
+            data = decoder.decompress(data) + decoder.flush()
+        self.stats.decompressed += len(data)
+        return data
+
+
+def install_decoder(raw: Any) ->Optional[TransferStats]:
+    """ set ContentDecoder to urllib3 HTTPResponse before body is read.
+    Returns
+    -------
+    stats: Optional[TransferStats]
+        None if body was already read or coding is not supported,
+        then urllib3 decodes it.
+    """
+    if raw is None or not hasattr(raw, '_decoder'):
+        return None
+    if getattr(raw, '_fp_bytes_read', 0):
+        return None
+    try:
+        decoder = ContentDecoder(raw.headers.get('content-encoding'))
+    except ValueError:
+        return None
+    raw._decoder = decoder
+    return decoder.stats
@@ -0,0 +1,203 @@
+from typing import (
+    Any, Callable, Iterable, Iterator, Optional, Union, NamedTuple
+)
+import lxml.html
+from lxml import etree
+from lxml.html import HtmlElement
+from cssselect import HTMLTranslator
+import pandas as pd
+from requests_html import HTML
+
+_translator = HTMLTranslator()
+
+class Field(NamedTuple):
+    name: str
+    selector: str
+    attr: Optional[str] = None
+    post: Optional[Callable[[Any], Any]] = None
+    many: bool = False
+    xpath: bool = False
+
+
+def css_to_xpath(selector: str, prefix: str = 'descendant-or-self::') -> str:
+    """ translate CSS selector to XPath expression.
+    Parameters
+    ----------
+    selector: str
+        CSS Selector.
+    prefix: str
+        prefix for XPath expression. default is 'descendant-or-self::'
+
+    Returns
+    -------
+    xpath: str
+    """
+    return _translator.css_to_xpath(selector, prefix=prefix)
+
+
+def parse_html(
+        page: Union[HTML, HtmlElement, str, bytes],
+    ) -> HtmlElement:
+    """ parse page into lxml element tree.
+    Parameters
+    ----------
+    page: Union[HTML, HtmlElement, str, bytes]
+        HTML object of requests_html, lxml element, or raw html.
+
+    Returns
+    -------
+    root: HtmlElement
+    """
+    if isinstance(page, HtmlElement):
+        return page
+    if isinstance(page, HTML):
+        page = page.raw_html
+    return lxml.html.fromstring(page)
+
+
+class ExtractionSchema(object):
+    def __init__(self,
+        fields: Union[dict, list],
+        root: Optional[str] = None,
+        ):
+        """ Declarative extraction schema.
+        all selectors are translated to XPath and compiled once,
+        then evaluated against a single parsed tree per document.
+
+        Parameters
+        ----------
+        fields: Union[dict, list]
+            dict of field name to selector, or list of Field.
+            the value of dict could be selector string,
+            tuple of (selector, attr, post) or Field.
+            if attr is None, text of element is extracted.
+            if attr is 'html', outer html of element is extracted.
+        root: Optional[str]
+            CSS Selector for row containers.
+            if provided, each matched element yields one row and
+            selectors of fields are relative to it.
+            otherwise, each document yields one row.
+
+        Examples
+        --------
+        >>> schema = ExtractionSchema({
+        ...     'title': 'h1',
+        ...     'link': ('a.more', 'href'),
+        ...     'price': ('span.price', None, float),
+        ... })
+        >>> rows = schema.apply_many(pages)
+        """
+        self.fields: list = self._normalize(fields)
+        self.root: Optional[str] = root
+        self._compiled: Optional[list] = None
+        self._root_xpath: Optional[etree.XPath] = None
+        self.compile()
+
+    @staticmethod
+    def _normalize(fields: Union[dict, list]) -> list:
+        if isinstance(fields, dict):
+            normalized = list()
+            for name, spec in fields.items():
+                if isinstance(spec, Field):
+                    normalized.append(spec._replace(name=name))
+                elif isinstance(spec, str):
+                    normalized.append(Field(name, spec))
+                else:
+                    normalized.append(Field(name, *spec))
+            return normalized
+        return [ x if isinstance(x, Field) else Field(*x) for x in fields ]
+
+    @property
+    def columns(self) -> list:
+        return [ x.name for x in self.fields ]
+
+    def compile(self) -> None:
+        """ translate and compile all selectors. """
+        self._compiled = [
+            etree.XPath(field.selector if field.xpath
+                        else css_to_xpath(field.selector))
+            for field in self.fields
+        ]
+        if self.root:
+            self._root_xpath = etree.XPath(css_to_xpath(self.root))
+
+    def __getstate__(self) -> dict:
+        # compiled XPath objects can not be pickled.
+        state = self.__dict__.copy()
+        state['_compiled'] = None
+        state['_root_xpath'] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.compile()
+
+    @staticmethod
+    def _value(node: Any, attr: Optional[str]) -> Any:
+        if not isinstance(node, etree._Element):
+            # XPath returns strings for text() and @attr.
+            return str(node)
+        if attr is None:
+            return node.text_content().strip()
+        if attr == 'html':
+            return lxml.html.tostring(node, encoding='unicode')
+        return node.get(attr)
+
+    def _extract(self, element: HtmlElement) -> dict:
+        row = dict()
+        for field, xpath in zip(self.fields, self._compiled):
+            found = xpath(element)
+            if field.many:
+                value = [ self._value(x, field.attr) for x in found ]
+                if field.post:
+                    value = [ field.post(x) for x in value ]
+            else:
+                value = self._value(found[0], field.attr) if found else None
+                if field.post and value is not None:
+                    value = field.post(value)
+            row[field.name] = value
+        return row
+
+    def apply(self,
+        page: Union[HTML, HtmlElement, str, bytes],
+        ) -> list:
+        """ extract rows from a single document.
+        Parameters
+        ----------
+        page: Union[HTML, HtmlElement, str, bytes]
+            HTML object of requests_html, lxml element, or raw html.
+
+        Returns
+        -------
+        list of row: dict
+        """
+        tree = parse_html(page)
+        if self._root_xpath is None:
+            return [ self._extract(tree) ]
+        return [ self._extract(x) for x in self._root_xpath(tree) ]
+
+    def apply_many(self,
+        pages: Iterable[Union[HTML, HtmlElement, str, bytes]],
+        ) -> Iterator[dict]:
+        """ extract rows from many documents lazily.
+        Parameters
+        ----------
+        pages: Iterable
+            iterable of pages. see also apply().
+
+        Returns
+        -------
+        iterator of row: dict
+        """
+        for page in pages:
+            yield from self.apply(page)
+
+    def to_dataframe(self,
+        pages: Iterable[Union[HTML, HtmlElement, str, bytes]],
+        ) -> pd.DataFrame:
+        """ extract rows from many documents into DataFrame. """
+        return pd.DataFrame(list(self.apply_many(pages)), columns=self.columns)
+
+    def __repr__(self) -> str:
+        return 'ExtractionSchema(fields={}, root={})'.format(
+                    self.columns, self.root)
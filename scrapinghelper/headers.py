@@ -0,0 +1,220 @@
+import re
+import threading
+from types import MappingProxyType
+from typing import Iterable, Mapping, NamedTuple, Optional
+from .encoding import ACCEPT_ENCODING
+
+_EDGE = re.compile(r'\bEdg(?:A|iOS)?/(\d+)')
+_OPERA = re.compile(r'\bOPR/(\d+)')
+_CHROME = re.compile(r'\bChrome/(\d+)')
+_FIREFOX = re.compile(r'\bFirefox/(\d+)')
+_SAFARI = re.compile(r'\bVersion/(\d+).*\bSafari/')
+_IOS = re.compile(r'\b(?:iPhone|iPad|iPod)\b.*\bOS (\d+)_')
+
+_ACCEPT = {
+    'chromium': ( 'text/html,application/xhtml+xml,application/xml;q=0.9,'
+                  'image/avif,image/webp,image/apng,*/*;q=0.8,'
+                  'application/signed-exchange;v=b3;q=0.7' ),
+    'chromium_old': ( 'text/html,application/xhtml+xml,application/xml;q=0.9,'
+                      'image/webp,image/apng,*/*;q=0.8,'
+                      'application/signed-exchange;v=b3;q=0.9' ),
+    'firefox': ( 'text/html,application/xhtml+xml,application/xml;q=0.9,'
+                 'image/avif,image/webp,*/*;q=0.8' ),
+    'document': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+}
+
+class BrowserInfo(NamedTuple):
+    family: str         # 'chrome', 'edge', 'opera', 'firefox', 'safari' or 'other'
+    version: int        # major version of browser, 0 if unknown
+    engine: int         # major version of Chromium, 0 if not Chromium
+    platform: str       # value of Sec-CH-UA-Platform, '' if unknown
+    mobile: bool
+
+    @property
+    def chromium(self) ->bool:
+        return self.engine > 0
+
+
+def _major(pattern: re.Pattern, user_agent: str) ->int:
+    matched = pattern.search(user_agent)
+    return int(matched.group(1)) if matched else 0
+
+def _platform(user_agent: str) ->str:
+    if 'Windows' in user_agent:
+        return 'Windows'
+    if 'Android' in user_agent:
+        return 'Android'
+    if _IOS.search(user_agent):
+        return 'iOS'
+    if 'CrOS' in user_agent:
+        return 'Chrome OS'
+    if 'Macintosh' in user_agent or 'Mac OS X' in user_agent:
+        return 'macOS'
+    if 'Linux' in user_agent or 'X11' in user_agent:
+        return 'Linux'
+    return ''
+
+def parse_user_agent(user_agent: str) ->BrowserInfo:
+    """ Return browser family, versions and platform of user agent. """
+    platform = _platform(user_agent)
+    mobile = 'Mobile' in user_agent or platform == 'iOS'
+    chrome = _major(_CHROME, user_agent)
+    if platform == 'iOS':
+        # every browser of iOS is WebKit.
+        version = _major(_SAFARI, user_agent) or _major(_IOS, user_agent)
+        return BrowserInfo('safari', version, 0, platform, mobile)
+    if chrome:
+        for family, pattern in (('edge', _EDGE), ('opera', _OPERA)):
+            version = _major(pattern, user_agent)
+            if version:
+                return BrowserInfo(family, version, chrome, platform, mobile)
+        return BrowserInfo('chrome', chrome, chrome, platform, mobile)
+    version = _major(_FIREFOX, user_agent)
+    if version:
+        return BrowserInfo('firefox', version, 0, platform, mobile)
+    version = _major(_SAFARI, user_agent)
+    if version:
+        return BrowserInfo('safari', version, 0, platform, mobile)
+    return BrowserInfo('other', 0, 0, platform, mobile)
+
+
+class HeaderProfiles(object):
+    _BRANDS = {
+        'chrome': 'Google Chrome',
+        'edge': 'Microsoft Edge',
+        'opera': 'Opera',
+    }
+
+    def __init__(self,
+        accept_language: str='en-US,en;q=0.9',
+        accept_encoding: Optional[str]=ACCEPT_ENCODING,
+        ):
+        """ Request headers consistent with each user agent.
+        headers of user agent, i.e. Accept, Sec-Fetch-*, Sec-CH-UA* and
+        their order, are built once by browser family and version,
+        and cached, so that rotating user agents is a dict lookup.
+
+        Parameters
+        ----------
+        accept_language: str
+            value of Accept-Language.
+        accept_encoding: Optional[str]
+            value of Accept-Encoding. default is all codings supported
+            by scrapinghelper. if None, codings of the browser are sent,
+            i.e. old browsers do not accept 'br'.
+
+        Examples
+        --------
+        >>> profiles = HeaderProfiles(accept_language='ja,en-US;q=0.9')
+        >>> sc = Scraper(header_profiles=profiles)
+        >>> sc.request(url, user_agent='random')
+        """
+        self.accept_language = accept_language
+        self.accept_encoding = accept_encoding
+        self._profiles: dict = dict()
+        self._lock = threading.Lock()
+
+    def get(self, user_agent: str) ->Mapping:
+        """ Return read-only headers of user agent, in the order to send. """
+        profile = self._profiles.get(user_agent)
+        if profile is None:
+            profile = MappingProxyType(self.build(user_agent))
+            with self._lock:
+                profile = self._profiles.setdefault(user_agent, profile)
+        return profile
+
+    def prepare(self, user_agents: Iterable[str]) ->None:
+        """ build headers of user agents in advance. """
+        for user_agent in user_agents:
+            self.get(user_agent)
+
+    def build(self, user_agent: str) ->dict:
+        """ Return headers of user agent without cache. """
+        info = parse_user_agent(user_agent)
+        if info.chromium:
+            return self._chromium(user_agent, info)
+        if info.family == 'firefox':
+            return self._firefox(user_agent, info)
+        if info.family == 'safari':
+            return self._safari(user_agent, info)
+        return {
+            'Accept': _ACCEPT['chromium_old'],
+            'Accept-Encoding': self._encoding(True, False),
+            'Accept-Language': self.accept_language,
+            'Upgrade-Insecure-Requests': '1',
+            'User-Agent': user_agent,
+            'Connection': 'keep-alive',
+        }
+
+    def _encoding(self, br: bool, zstd: bool) ->str:
+        if self.accept_encoding is not None:
+            return self.accept_encoding
+        return 'gzip, deflate' + (', br' if br else '') + (', zstd' if zstd else '')
+
+    def _sec_ch_ua(self, info: BrowserInfo) ->str:
+        brand = self._BRANDS.get(info.family, 'Google Chrome')
+        return '"{}";v="{}", "Chromium";v="{}", "Not_A Brand";v="24"'.format(
+                    brand, info.version, info.engine)
+
+    def _chromium(self, user_agent: str, info: BrowserInfo) ->dict:
+        headers = { 'Connection': 'keep-alive' }
+        if info.engine >= 89:
+            headers['sec-ch-ua'] = self._sec_ch_ua(info)
+            headers['sec-ch-ua-mobile'] = '?1' if info.mobile else '?0'
+            if info.platform:
+                headers['sec-ch-ua-platform'] = '"{}"'.format(info.platform)
+        headers['Upgrade-Insecure-Requests'] = '1'
+        headers['User-Agent'] = user_agent
+        headers['Accept'] = ( _ACCEPT['chromium'] if info.engine >= 85
+                              else _ACCEPT['chromium_old'] )
+        if info.engine >= 76:
+            headers['Sec-Fetch-Site'] = 'none'
+            headers['Sec-Fetch-Mode'] = 'navigate'
+            headers['Sec-Fetch-User'] = '?1'
+            headers['Sec-Fetch-Dest'] = 'document'
+        headers['Accept-Encoding'] = self._encoding(info.engine >= 50,
+                                                    info.engine >= 123)
+        headers['Accept-Language'] = self.accept_language
+        return headers
+
+    def _firefox(self, user_agent: str, info: BrowserInfo) ->dict:
+        headers = {
+            'User-Agent': user_agent,
+            'Accept': ( _ACCEPT['firefox'] if info.version >= 92
+                        else _ACCEPT['document'] ),
+            'Accept-Language': self.accept_language,
+            'Accept-Encoding': self._encoding(info.version >= 44,
+                                              info.version >= 126),
+            'Connection': 'keep-alive',
+            'Upgrade-Insecure-Requests': '1',
+        }
+        if info.version >= 90:
+            headers['Sec-Fetch-Dest'] = 'document'
+            headers['Sec-Fetch-Mode'] = 'navigate'
+            headers['Sec-Fetch-Site'] = 'none'
+            headers['Sec-Fetch-User'] = '?1'
+        return headers
+
+    def _safari(self, user_agent: str, info: BrowserInfo) ->dict:
+        fetch = info.version >= 16
+        headers = { 'Accept': _ACCEPT['document'] }
+        if fetch:
+            headers['Sec-Fetch-Site'] = 'none'
+            headers['Sec-Fetch-Mode'] = 'navigate'
+        headers['User-Agent'] = user_agent
+        headers['Accept-Language'] = self.accept_language
+        if fetch:
+            headers['Sec-Fetch-Dest'] = 'document'
+        headers['Accept-Encoding'] = self._encoding(info.version >= 11, False)
+        headers['Connection'] = 'keep-alive'
+        return headers
+
+    def __len__(self) ->int:
+        return len(self._profiles)
+
+    def __contains__(self, user_agent: str) ->bool:
+        return user_agent in self._profiles
+
+    def __repr__(self) ->str:
+        return 'HeaderProfiles(profiles={}, accept_language={!r})'.format(
+                    len(self._profiles), self.accept_language)
@@ -0,0 +1,208 @@
+import os
+import json
+import threading
+from time import perf_counter_ns
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional, Union
+
+HOOK_STAGES = ('fetch', 'render', 'get_texts', 'get_links',
+               'extract', 'download_file')
+
+class _NullSpan(object):
+    __slots__ = ()
+
+    def __enter__(self) ->None:
+        return None
+
+    def __exit__(self, *args: Any) ->None:
+        return None
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span(object):
+    __slots__ = ('hooks', 'context')
+
+    def __init__(self, hooks: list, context: dict):
+        self.hooks = hooks
+        self.context = context
+
+    def __enter__(self) ->dict:
+        self.context['start_ns'] = perf_counter_ns()
+        for start, _ in self.hooks:
+            if start:
+                start(self.context)
+        return self.context
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) ->None:
+        end_ns = perf_counter_ns()
+        self.context['end_ns'] = end_ns
+        self.context['duration'] = (end_ns - self.context['start_ns']) / 1e9
+        self.context['error'] = exc
+        for _, end in reversed(self.hooks):
+            if end:
+                end(self.context)
+
+
+class HookRegistry(object):
+    def __init__(self):
+        """ Registry of start/end callbacks around hot stages.
+        stages are 'fetch', 'render', 'get_texts', 'get_links',
+        'extract' and 'download_file'.
+
+        callbacks receive context dict, which has 'stage', 'start_ns'
+        and arguments of the stage such as 'url'. at the end,
+        'end_ns', 'duration' (seconds) and 'error' are added, and
+        stage may add results such as 'status'.
+
+        when no hooks are registered, span() returns shared no-op
+        context manager, so that instrumentation costs nothing.
+
+        Examples
+        --------
+        >>> from scrapinghelper import hook_registry as hooks
+        >>> handle = hooks.register(end=lambda ctx: print(ctx['stage'],
+        ...                                               ctx['duration']))
+        >>> hooks.unregister(handle)
+        """
+        self._hooks: list = list()
+        self._by_stage: dict = dict()
+        self._lock = threading.Lock()
+
+    def register(self,
+        hook: Any=None,
+        *,
+        start: Optional[Callable[[dict], None]]=None,
+        end: Optional[Callable[[dict], None]]=None,
+        stages: Optional[Iterable[str]]=None,
+        ) ->tuple:
+        """ register callbacks.
+        Parameters
+        ----------
+        hook: Any
+            object which has start(context) and/or end(context) methods.
+        start: Optional[Callable[[dict], None]]
+            called when stage starts.
+        end: Optional[Callable[[dict], None]]
+            called when stage ends.
+        stages: Optional[Iterable[str]]
+            stages to hook. default is all stages.
+
+        Returns
+        -------
+        handle: tuple
+            pass to unregister().
+        """
+        if hook is not None:
+            start = start or getattr(hook, 'start', None)
+            end = end or getattr(hook, 'end', None)
+        stages = tuple(stages) if stages else HOOK_STAGES
+        for stage in stages:
+            if stage not in HOOK_STAGES:
+                raise ValueError('Unknown stage: {}'.format(stage))
+        handle = (start, end, stages)
+        with self._lock:
+            self._hooks.append(handle)
+            self._rebuild()
+        return handle
+
+    def unregister(self, handle: tuple) ->None:
+        with self._lock:
+            self._hooks.remove(handle)
+            self._rebuild()
+
+    def clear(self) ->None:
+        with self._lock:
+            self._hooks.clear()
+            self._rebuild()
+
+    def _rebuild(self) ->None:
+        by_stage: dict = dict()
+        for start, end, stages in self._hooks:
+            for stage in stages:
+                by_stage.setdefault(stage, []).append((start, end))
+        # replace, not mutate, so that running spans are not affected.
+        self._by_stage = by_stage
+
+    def __bool__(self) ->bool:
+        return bool(self._by_stage)
+
+    def span(self, stage: str, **context: Any) ->Union[Span, _NullSpan]:
+        """ Return context manager around stage.
+        Examples
+        --------
+        >>> with hooks.span('fetch', url=url) as ctx:
+        ...     response = session.get(url)
+        ...     if ctx is not None:
+        ...         ctx['status'] = response.status_code
+        """
+        hooks = self._by_stage.get(stage)
+        if not hooks:
+            return _NULL_SPAN
+        context['stage'] = stage
+        return Span(hooks, context)
+
+    def __repr__(self) ->str:
+        return 'HookRegistry(hooks={})'.format(len(self._hooks))
+
+
+class ChromeTraceHook(object):
+    def __init__(self,
+        path: Union[str, Path],
+        process_name: str='scrapinghelper',
+        ):
+        """ Write spans as Chrome trace event JSON.
+        load the file with chrome://tracing or https://ui.perfetto.dev/
+
+        Parameters
+        ----------
+        path: Union[str, Path]
+            The filename of trace. written by close().
+        process_name: str
+            The name of process shown in trace viewer.
+
+        Examples
+        --------
+        >>> from scrapinghelper import hook_registry as hooks, ChromeTraceHook
+        >>> trace = ChromeTraceHook('crawl.json')
+        >>> handle = hooks.register(trace)
+        >>> # ... crawl ...
+        >>> hooks.unregister(handle)
+        >>> trace.close()
+        """
+        self.path = Path(path)
+        self.pid = os.getpid()
+        self.events: list = [
+            dict(name='process_name', ph='M', pid=self.pid, tid=0,
+                 args=dict(name=process_name)),
+        ]
+
+    def end(self, context: dict) ->None:
+        args = { k: str(v) for k, v in context.items()
+                 if k not in ('stage', 'start_ns', 'end_ns', 'duration')
+                    and v is not None }
+        self.events.append(dict(
+            name=context['stage'],
+            cat='scrapinghelper',
+            ph='X',
+            ts=context['start_ns'] / 1000,
+            dur=(context['end_ns'] - context['start_ns']) / 1000,
+            pid=self.pid,
+            tid=threading.get_ident(),
+            args=args,
+        ))
+
+    def close(self) ->None:
+        """ write trace file. """
+        with open(self.path, 'w') as fp:
+            json.dump(dict(traceEvents=self.events,
+                           displayTimeUnit='ms'), fp)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args: Any) ->None:
+        self.close()
+
+
+hook_registry = HookRegistry()
@@ -0,0 +1,149 @@
+import ipaddress
+from typing import Iterable, Optional, Union
+import numpy as np
+
+MAX_ROUNDS = 100
+_MASK64 = (1 << 64) - 1
+
+# private, loopback, link-local, multicast, documentation and reserved.
+NON_PUBLIC_IPV4 = tuple( ipaddress.IPv4Network(x) for x in (
+    '0.0.0.0/8', '10.0.0.0/8', '100.64.0.0/10', '127.0.0.0/8',
+    '169.254.0.0/16', '172.16.0.0/12', '192.0.0.0/24', '192.0.2.0/24',
+    '192.88.99.0/24', '192.168.0.0/16', '198.18.0.0/15', '198.51.100.0/24',
+    '203.0.113.0/24', '224.0.0.0/4', '240.0.0.0/4',
+))
+NON_PUBLIC_IPV6 = tuple( ipaddress.IPv6Network(x) for x in (
+    '::/127', '::ffff:0:0/96', '64:ff9b::/96', '100::/64', '2001::/23',
+    '2001:db8::/32', '2002::/16', 'fc00::/7', 'fe80::/10', 'ff00::/8',
+))
+DEFAULT_NETWORKS = {
+    4: (ipaddress.IPv4Network('0.0.0.0/0'),),
+    # global unicast, other blocks are not allocated.
+    6: (ipaddress.IPv6Network('2000::/3'),),
+}
+
+_rng = np.random.default_rng()
+# string of each octet and hextet, indexing is faster than formatting.
+_OCTETS = np.array([ str(x) for x in range(0x100) ])
+_HEXTETS = np.array([ format(x, 'x') for x in range(0x10000) ])
+
+def _networks(networks: Optional[Iterable], version: int) ->list:
+    if not networks:
+        return list(DEFAULT_NETWORKS[version])
+    if isinstance(networks, str):
+        networks = [networks]
+    result = [ ipaddress.ip_network(x, strict=False) for x in networks ]
+    for network in result:
+        if network.version != version:
+            raise ValueError('Not IPv{} network: {}'.format(version, network))
+    return result
+
+def _split(value: int) ->tuple:
+    # 128 bits value to (high, low) of 64 bits.
+    return value >> 64, value & _MASK64
+
+def _draw(rng: np.random.Generator,
+          networks: list,
+          n: int,
+          version: int) ->tuple:
+    """ Return (high, low) uint64 arrays of n addresses in networks. """
+    host_bits = np.array([ network.max_prefixlen - network.prefixlen
+                           for network in networks ])
+    weights = np.exp2(host_bits.astype(float))
+    index = rng.choice(len(networks), size=n, p=weights / weights.sum())
+
+    high = np.zeros(n, dtype=np.uint64)
+    low = rng.integers(0, 2 ** 64, size=n, dtype=np.uint64, endpoint=False)
+    if version == 6:
+        high = rng.integers(0, 2 ** 64, size=n, dtype=np.uint64, endpoint=False)
+    for i, network in enumerate(networks):
+        selected = index == i
+        net_high, net_low = _split(int(network.network_address))
+        mask_high, mask_low = _split(int(network.hostmask))
+        high[selected] = (high[selected] & np.uint64(mask_high)) | np.uint64(net_high)
+        low[selected] = (low[selected] & np.uint64(mask_low)) | np.uint64(net_low)
+    return high, low
+
+def _in_networks(high: np.ndarray, low: np.ndarray, networks: Iterable) ->np.ndarray:
+    matched = np.zeros(len(low), dtype=bool)
+    for network in networks:
+        net_high, net_low = _split(int(network.network_address))
+        mask_high, mask_low = _split(int(network.netmask))
+        matched |= ( ((high & np.uint64(mask_high)) == np.uint64(net_high))
+                     & ((low & np.uint64(mask_low)) == np.uint64(net_low)) )
+    return matched
+
+def _format(high: np.ndarray, low: np.ndarray, version: int) ->np.ndarray:
+    if version == 4:
+        parts = [ _OCTETS[((low >> np.uint64(x)) & np.uint64(0xff)).astype(np.intp)]
+                  for x in (24, 16, 8, 0) ]
+        sep = '.'
+    else:
+        parts = [ _HEXTETS[((value >> np.uint64(x)) & np.uint64(0xffff)).astype(np.intp)]
+                  for value in (high, low) for x in (48, 32, 16, 0) ]
+        sep = ':'
+    result = parts[0]
+    for part in parts[1:]:
+        result = np.char.add(np.char.add(result, sep), part)
+    return result
+
+def random_ips(
+        n: int,
+        version: int=4,
+        networks: Optional[Union[Iterable, str]]=None,
+        exclude_private: bool=True,
+        rng: Optional[np.random.Generator]=None,
+    ) ->np.ndarray:
+    """ generate n random IP addresses at once.
+    Parameters
+    ----------
+    n: int
+        The number of addresses.
+    version: int
+        4 or 6.
+    networks: Optional[Union[Iterable, str]]
+        CIDR blocks to draw addresses from. i.e. ['203.0.113.0/24']
+        addresses are drawn uniformly over all blocks.
+        default is all IPv4 addresses, or global unicast 2000::/3 for IPv6.
+    exclude_private: bool
+        if True, exclude private, loopback, link-local, multicast,
+        documentation and reserved addresses.
+    rng: Optional[np.random.Generator]
+        random generator. i.e. np.random.default_rng(seed)
+
+    Returns
+    -------
+    addresses: np.ndarray
+        array of address strings. IPv6 addresses are not compressed.
+        i.e. '2a03:2880:f12f:83:face:b00c:0:25de'
+
+    Examples
+    --------
+    >>> random_ips(3)
+    array(['52.4.218.7', '181.33.9.150', '95.211.60.22'], dtype='<U15')
+    >>> headers = [ {'X-Forwarded-For': x} for x in random_ips(1_000_000) ]
+    """
+    if version not in DEFAULT_NETWORKS:
+        raise ValueError('version must be 4 or 6: {}'.format(version))
+    rng = rng or _rng
+    networks = _networks(networks, version)
+    excluded = NON_PUBLIC_IPV4 if version == 4 else NON_PUBLIC_IPV6
+
+    if exclude_private:
+        # blocks inside excluded ranges would be drawn again and again.
+        networks = [ x for x in networks
+                     if not any(x.subnet_of(y) for y in excluded) ]
+        if not networks:
+            raise ValueError('networks have no public address.')
+    high, low = _draw(rng, networks, n, version)
+    if exclude_private:
+        for _ in range(MAX_ROUNDS):
+            rejected = np.flatnonzero(_in_networks(high, low, excluded))
+            if not len(rejected):
+                break
+            high[rejected], low[rejected] = _draw(rng, networks,
+                                                  len(rejected), version)
+        else:
+            raise ValueError('networks have no public address: {}'.format(
+                                ', '.join(str(x) for x in networks)))
+    return _format(high, low, version)
@@ -1,4 +1,6 @@
 import sys
+import queue
+import threading
 from pathlib import Path
 from typing import  Union, TextIO, Text
 from dataclasses import dataclass, InitVar, asdict
@@ -14,6 +16,80 @@ LOG_LEVEL=[
     'CRITICAL'
     ]
 
+class BatchedSink(object):
+    def __init__(self,
+        sink: Union[Text, Path, TextIO],
+        batch_size: int=100,
+        flush_interval: float=1.0,
+        ):
+        """ Non-blocking sink writes messages in background thread.
+        messages are queued by logging threads, and written in batches
+        of batch_size, or every flush_interval seconds.
+
+        Parameters
+        ----------
+        sink: Union[Text, Path, TextIO]
+            filename or stream.
+        batch_size: int
+            The maximum number of messages per write.
+        flush_interval: float
+            The maximum seconds to hold messages.
+        """
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval = flush_interval
+        if isinstance(sink, (str, Path)):
+            self._stream = open(sink, 'a', encoding='utf8')
+            self._close_stream = True
+        else:
+            self._stream = sink
+            self._close_stream = False
+        self.encoding = getattr(self._stream, 'encoding', None) or 'utf8'
+        self.name = getattr(self._stream, 'name', repr(self._stream))
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, message: str) ->None:
+        self._queue.put(message)
+
+    def flush(self) ->None:
+        # loguru calls flush() after each write, batches are flushed
+        # by background thread.
+        pass
+
+    def _run(self) ->None:
+        while True:
+            try:
+                message = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = list()
+            while message is not None:
+                batch.append(message)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    message = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._stream.write(''.join(batch))
+                self._stream.flush()
+            if message is None:
+                return
+
+    def stop(self) ->None:
+        """ write all queued messages and stop thread. """
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        if self._close_stream:
+            self._stream.close()
+
+    def __repr__(self) ->str:
+        return 'BatchedSink({})'.format(self.name)
+
+
 @dataclass
 class LogConfig(object):
     level: InitVar[str]='DEBUG'
@@ -21,6 +97,9 @@ class LogConfig(object):
     file: Union[Text, Path, TextIO]=None
     colorize: bool=True
     serialize: bool=False
+    enqueue: bool=False
+    batch_size: int=0
+    flush_interval: float=1.0
 
     def __post_init__(self, level):
         if level in LOG_LEVEL:
@@ -29,13 +108,23 @@ class LogConfig(object):
             self.level = 'DEBUG' # fallback to default
 
     def config(self):
+        """ Return configuration for loguru.
+        if enqueue is True, messages are passed to sink through
+        a queue of loguru, so that logging never blocks caller.
+        if batch_size is set, messages are written in batches
+        by background thread. see also BatchedSink.
+        """
+        sink = self.file or sys.stdout
+        if self.batch_size:
+            sink = BatchedSink(sink, self.batch_size, self.flush_interval)
         d = dict( handlers=[
                     dict(
-                        sink=self.file or sys.stdout,
+                        sink=sink,
                         level=self.level,
                         format=self.format,
                         colorize=self.colorize,
                         serialize=self.serialize,
+                        enqueue=self.enqueue,
                     ),
                   ])
         return d
@@ -46,5 +135,7 @@ class LogConfig(object):
               f", format={self.format}"
               f", colorize={self.colorize}"
               f", serialize={self.serialize}"
+              f", enqueue={self.enqueue}"
+              f", batch_size={self.batch_size}"
               )
         return d
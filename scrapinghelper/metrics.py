@@ -0,0 +1,259 @@
+import time
+import threading
+from collections import deque
+from typing import Any, Optional, NamedTuple
+import numpy as np
+import requests
+from .ratelimit import hostname
+
+LATENCY_PHASES = ('dns', 'connect', 'tls', 'ttfb',
+                  'download', 'render', 'total')
+QUANTILES = (0.5, 0.95, 0.99)
+
+class FetchTiming(NamedTuple):
+    url: str
+    host: str
+    proxy: Optional[str]
+    status: Optional[int]
+    dns: float = 0.0
+    connect: float = 0.0
+    tls: float = 0.0
+    ttfb: float = 0.0
+    download: float = 0.0
+    render: float = 0.0
+    total: float = 0.0
+    bytes: int = 0
+    timestamp: float = 0.0
+    wire_bytes: int = 0
+
+
+def fetch_timing(
+        url: Any,
+        response: Optional[requests.Response]=None,
+        elapsed: float=0.0,
+        proxy: Optional[str]=None,
+        **kwargs: Any,
+    ) ->FetchTiming:
+    """ Make FetchTiming from response.
+    Parameters
+    ----------
+    url: Any
+        URL object or url string.
+    response: Optional[requests.Response]
+        response of PooledAdapter. None if request failed.
+    elapsed: float
+        seconds of whole fetch including body download.
+        'download' is elapsed time not spent in other phases.
+    proxy: Optional[str]
+        proxy used.
+    **kwargs:
+        override fields of FetchTiming. i.e.: render=1.2
+    """
+    phases = dict.fromkeys(('dns', 'connect', 'tls', 'ttfb'), 0.0)
+    status, size, wire = None, 0, None
+    if response is not None:
+        status = response.status_code
+        content = getattr(response, '_content', None)
+        size = len(content) if isinstance(content, bytes) else 0
+        for r in list(response.history) + [response]:
+            for key, val in getattr(r, 'timings', {}).items():
+                phases[key] += val
+            transfer = getattr(r, 'transfer', None)
+            if transfer is not None:
+                wire = (wire or 0) + transfer.compressed
+    download = max(elapsed - sum(phases.values()), 0.0)
+    values = dict(phases, download=download, bytes=size)
+    values.update(kwargs)
+    # bytes on the wire are bytes of body if not counted.
+    values.setdefault('wire_bytes', values['bytes'] if wire is None else wire)
+    values.setdefault('total', elapsed + values.get('render', 0.0))
+    return FetchTiming(url=str(url), host=hostname(url), proxy=proxy,
+                       status=status, timestamp=time.time(), **values)
+
+
+class _Series(object):
+    __slots__ = ('requests', 'errors', 'bytes', 'wire_bytes', 'sums', 'samples')
+
+    def __init__(self, window: int):
+        self.requests: int = 0
+        self.errors: int = 0
+        self.bytes: int = 0
+        self.wire_bytes: int = 0
+        self.sums: dict = dict.fromkeys(LATENCY_PHASES, 0.0)
+        self.samples: deque = deque(maxlen=window)
+
+    def add(self, timing: FetchTiming) ->None:
+        self.requests += 1
+        if timing.status is None or timing.status >= 400:
+            self.errors += 1
+        self.bytes += timing.bytes
+        self.wire_bytes += timing.wire_bytes
+        for phase in LATENCY_PHASES:
+            self.sums[phase] += getattr(timing, phase)
+        self.samples.append([ getattr(timing, x) for x in LATENCY_PHASES ])
+
+    def quantiles(self) ->dict:
+        if not self.samples:
+            return { x: dict.fromkeys(QUANTILES, 0.0) for x in LATENCY_PHASES }
+        values = np.percentile(np.array(self.samples),
+                               [ x * 100 for x in QUANTILES ], axis=0)
+        return { phase: { q: float(values[n][i])
+                          for n, q in enumerate(QUANTILES) }
+                 for i, phase in enumerate(LATENCY_PHASES) }
+
+
+def _escape(value: Any) ->str:
+    return ( str(value).replace('\\', '\\\\')
+                       .replace('"', '\\"').replace('\n', '\\n') )
+
+
+class Metrics(object):
+    def __init__(self, window: int=1024, keep_records: int=1024):
+        """ Aggregate FetchTiming records per host and per proxy.
+        Parameters
+        ----------
+        window: int
+            The number of latest samples to compute quantiles.
+        keep_records: int
+            The number of latest records to keep.
+        """
+        self.window = window
+        self.records: deque = deque(maxlen=keep_records)
+        self._series: dict = dict()
+        self._values: dict = dict()
+        self._lock = threading.Lock()
+
+    def record(self, timing: FetchTiming) ->None:
+        with self._lock:
+            self.records.append(timing)
+            keys = [('host', timing.host)]
+            keys.append(('proxy', timing.proxy or 'direct'))
+            for key in keys:
+                series = self._series.get(key)
+                if series is None:
+                    series = self._series[key] = _Series(self.window)
+                series.add(timing)
+
+    def set_value(self,
+        name: str,
+        value: float,
+        kind: str='gauge',
+        help_text: str='',
+        ) ->None:
+        """ set value of metric which is not per fetch.
+        i.e.: metrics.set_value('browser_rss_bytes', rss)
+        """
+        with self._lock:
+            self._values[name] = (kind, help_text, value)
+
+    def inc(self, name: str, value: float=1, help_text: str='') ->None:
+        """ increase counter of metric which is not per fetch. """
+        with self._lock:
+            _, _, current = self._values.get(name, (None, None, 0))
+            self._values[name] = ('counter', help_text, current + value)
+
+    def value(self, name: str, default: Any=None) ->Any:
+        with self._lock:
+            if name not in self._values:
+                return default
+            return self._values[name][2]
+
+    def clear(self) ->None:
+        with self._lock:
+            self.records.clear()
+            self._series.clear()
+            self._values.clear()
+
+    def summary(self) ->dict:
+        """ Return counters and latency quantiles.
+        Returns
+        -------
+        summary: dict
+            {'host': {hostname: {'requests': int, 'errors': int,
+                                 'bytes': int,
+                                 'wire_bytes': int,
+                                 'latency': {phase: {0.5: float,
+                                                     0.95: float,
+                                                     0.99: float}}}},
+             'proxy': {proxy: {...}}}
+            proxy is 'direct' if no proxy used.
+            values of set_value() and inc() are in summary['values'].
+        """
+        summary: dict = {'host': dict(), 'proxy': dict(), 'values': dict()}
+        with self._lock:
+            for name, (_, _, value) in self._values.items():
+                summary['values'][name] = value
+            for (kind, name), series in self._series.items():
+                summary[kind][name] = dict(
+                    requests=series.requests,
+                    errors=series.errors,
+                    bytes=series.bytes,
+                    wire_bytes=series.wire_bytes,
+                    latency=series.quantiles(),
+                )
+        return summary
+
+    # alias name
+    to_dict = summary
+
+    def to_prometheus(self, prefix: str='scrapinghelper') ->str:
+        """ Return metrics in Prometheus text exposition format.
+        series by proxy are named '<prefix>_proxy_*', so that sum() of
+        a metric counts each fetch once.
+        """
+        lines = list()
+        with self._lock:
+            items = sorted(self._series.items())
+            counters = (
+                ('requests_total', 'counter', 'requests', 'Number of fetches.'),
+                ('errors_total', 'counter', 'errors',
+                 'Number of failed fetches or status >= 400.'),
+                ('response_bytes_total', 'counter', 'bytes',
+                 'Bytes of response bodies.'),
+                ('response_wire_bytes_total', 'counter', 'wire_bytes',
+                 'Bytes of response bodies before content decoding.'),
+            )
+            families = (
+                ('host', prefix, ''),
+                ('proxy', '{}_proxy'.format(prefix), ' by proxy'),
+            )
+            for group, group_prefix, suffix in families:
+                group_items = [ ((label, value), series)
+                                for (label, value), series in items
+                                if label == group ]
+                for name, kind, attr, help_text in counters:
+                    metric = '{}_{}'.format(group_prefix, name)
+                    lines.append('# HELP {} {}'.format(
+                                    metric, help_text[:-1] + suffix + '.'))
+                    lines.append('# TYPE {} {}'.format(metric, kind))
+                    for (label, value), series in group_items:
+                        lines.append('{}{{{}="{}"}} {}'.format(
+                            metric, label, _escape(value), getattr(series, attr)))
+
+                metric = '{}_fetch_seconds'.format(group_prefix)
+                lines.append('# HELP {} Latency of fetch phases{}.'.format(
+                                metric, suffix))
+                lines.append('# TYPE {} summary'.format(metric))
+                for (label, value), series in group_items:
+                    quantiles = series.quantiles()
+                    for phase in LATENCY_PHASES:
+                        labels = '{}="{}",phase="{}"'.format(
+                                    label, _escape(value), phase)
+                        for q, val in quantiles[phase].items():
+                            lines.append('{}{{{},quantile="{}"}} {}'.format(
+                                            metric, labels, q, val))
+                        lines.append('{}_sum{{{}}} {}'.format(
+                                        metric, labels, series.sums[phase]))
+                        lines.append('{}_count{{{}}} {}'.format(
+                                        metric, labels, series.requests))
+
+            for name, (kind, help_text, value) in sorted(self._values.items()):
+                metric = '{}_{}'.format(prefix, name)
+                lines.append('# HELP {} {}'.format(metric, help_text or name))
+                lines.append('# TYPE {} {}'.format(metric, kind))
+                lines.append('{} {}'.format(metric, value))
+        return '\n'.join(lines) + '\n'
+
+    def __repr__(self) ->str:
+        return 'Metrics(records={}, series={})'.format(
+                    len(self.records), len(self._series))
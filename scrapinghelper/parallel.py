@@ -0,0 +1,255 @@
+import os
+import posixpath
+import multiprocessing
+from functools import partial
+from concurrent.futures import Future, ProcessPoolExecutor
+from urllib.parse import urljoin, urlparse, unquote
+from typing import Any, Callable, Iterable, Iterator, Optional, Union
+import lxml.html
+from lxml import etree
+from lxml.html import HtmlElement
+from pyquery import PyQuery
+import requests
+from requests_html import HTML
+from .extract import ExtractionSchema, css_to_xpath
+
+def _as_list(value: Optional[Union[list, str]]) ->Optional[list]:
+    if value and isinstance(value, str):
+        return [value]
+    return value
+
+def _parse(raw: bytes) ->Optional[HtmlElement]:
+    try:
+        return lxml.html.fromstring(raw)
+    except (etree.ParserError, etree.XMLSyntaxError, ValueError):
+        # empty or broken document.
+        return None
+
+def _base_url(root: HtmlElement, url: Optional[str]) ->Optional[str]:
+    base = root.xpath('//base/@href')
+    if base and base[0].strip():
+        return urljoin(url or '', base[0].strip())
+    return url
+
+def parse_links(
+        raw: bytes,
+        url: Optional[str]=None,
+        selector: str='a',
+        startswith: Optional[Union[list,str]]=None,
+        endswith: Optional[Union[list,str]]=None,
+        containing: Optional[Union[list,str]]=None,
+    ) ->list:
+    """ extract links from raw html. same filters as Scraper.get_links().
+    Returns
+    -------
+    links: list
+        list of tuple (text, link).
+        link is absolute if url is provided.
+    """
+    root = _parse(raw)
+    if root is None:
+        return []
+    startswith = _as_list(startswith)
+    endswith = _as_list(endswith)
+    containing = _as_list(containing)
+    base = _base_url(root, url)
+    links = list()
+    for e in root.xpath(css_to_xpath(selector)):
+        text = PyQuery(e).text()
+        hrefs = dict.fromkeys(
+                    x.strip() for x in e.xpath('descendant-or-self::a/@href'))
+        for href in hrefs:
+            if ( not href or href.startswith('#')
+                 or href.startswith(('javascript:', 'mailto:')) ):
+                continue
+            link = urljoin(base, href) if base else href
+            path = urlparse(link).path
+            basename = posixpath.basename(path)
+            if startswith and not any(basename.startswith(x) for x in startswith):
+                continue
+            if endswith and not any(basename.endswith(x) for x in endswith):
+                continue
+            if containing and not any(x in unquote(link) for x in containing):
+                continue
+            links.append((text, link))
+    return links
+
+def parse_texts(
+        raw: bytes,
+        url: Optional[str]=None,
+        selector: Union[list, str]=['table', 'tr'],
+        split: str='\n',
+    ) ->list:
+    """ extract texts from raw html. same as Scraper.get_texts().
+    Returns
+    -------
+    texts: list
+        list of splitted text of elements.
+    """
+    root = _parse(raw)
+    if root is None:
+        return []
+    if isinstance(selector, str):
+        selector = [selector]
+    elements = root.xpath(css_to_xpath(selector[0]))
+    for select in selector[-1:]:
+        if select == selector[0] or not elements:
+            continue
+        elements = elements[0].xpath(css_to_xpath(select,
+                                                  prefix='descendant::'))
+    return [ PyQuery(x).text().split(split) for x in elements ]
+
+def parse_tables(
+        raw: bytes,
+        url: Optional[str]=None,
+        selector: str='table',
+    ) ->list:
+    """ extract cells of tables from raw html.
+    Returns
+    -------
+    tables: list
+        list of table, table is list of row, row is list of cell text.
+    """
+    root = _parse(raw)
+    if root is None:
+        return []
+    tables = list()
+    for table in root.xpath(css_to_xpath(selector)):
+        rows = list()
+        for tr in table.xpath('.//tr'):
+            rows.append([ ' '.join(x.text_content().split())
+                          for x in tr.xpath('./th|./td') ])
+        tables.append(rows)
+    return tables
+
+def parse_schema(
+        raw: bytes,
+        url: Optional[str]=None,
+        schema: Optional[ExtractionSchema]=None,
+    ) ->list:
+    """ apply ExtractionSchema to raw html. """
+    if schema is None:
+        raise ValueError('schema is required.')
+    return schema.apply(raw)
+
+PARSERS = {
+    'links': parse_links,
+    'texts': parse_texts,
+    'tables': parse_tables,
+    'extract': parse_schema,
+}
+
+def parser(kind: str) ->Callable:
+    """ Return parser function of kind. """
+    if kind not in PARSERS:
+        raise ValueError('Unknown kind: {}'.format(kind))
+    return PARSERS[kind]
+
+def _run(func: Callable, page: tuple) ->list:
+    raw, url = page
+    return func(raw, url)
+
+def raw_page(page: Any) ->tuple:
+    """ Return (raw bytes, url) of page.
+    page could be response, HTML object of requests_html,
+    str or bytes, or tuple of (raw, url).
+    """
+    if isinstance(page, tuple):
+        raw, url = page
+    elif isinstance(page, requests.Response):
+        # rendered html of HTMLResponse if exists.
+        html = getattr(page, '_html', None)
+        if isinstance(html, HTML):
+            raw, url = html.raw_html, page.url
+        else:
+            raw, url = page.content, page.url
+    elif isinstance(page, HTML):
+        raw, url = page.raw_html, page.url
+    else:
+        raw, url = page, None
+    if isinstance(raw, str):
+        raw = raw.encode('utf8')
+    return raw, (str(url) if url else None)
+
+
+class ParsePool(object):
+    def __init__(self,
+        workers: Optional[int]=None,
+        chunksize: int=4,
+        mp_context: Optional[str]=None,
+        ):
+        """ Parse HTML pages in worker processes.
+        raw bytes of pages are sent to workers, which run lxml and
+        return compact results, so that parsing runs on all cores
+        while the main process keeps fetching.
+
+        Parameters
+        ----------
+        workers: Optional[int]
+            The number of worker processes. default is os.cpu_count()
+        chunksize: int
+            The number of pages sent to a worker at once by map().
+        mp_context: Optional[str]
+            start method of worker processes.
+            'fork', 'spawn' or 'forkserver'. default is the platform's.
+
+        Examples
+        --------
+        >>> with ParsePool(workers=4) as pool:
+        ...     future = pool.submit('links', response, endswith='.csv')
+        ...     # ... continue fetching ...
+        ...     links = future.result()
+        ...     for texts in pool.map('texts', responses, selector='tr'):
+        ...         pass
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.chunksize = max(chunksize, 1)
+        context = multiprocessing.get_context(mp_context) if mp_context else None
+        self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                             mp_context=context)
+
+    @staticmethod
+    def _parser(kind: str, **kwargs: Any) ->Callable:
+        return partial(_run, partial(parser(kind), **kwargs))
+
+    def submit(self, kind: str, page: Any, **kwargs: Any) ->Future:
+        """ parse page in worker process.
+        Parameters
+        ----------
+        kind: str
+            'links', 'texts', 'tables' or 'extract'.
+            'extract' requires keyword argument schema.
+        page: Any
+            response, HTML object, raw html or tuple of (raw, url).
+        **kwargs:
+            arguments of parse_links(), parse_texts(), parse_tables()
+            or parse_schema().
+
+        Returns
+        -------
+        future: Future
+            result of parser.
+        """
+        return self._executor.submit(self._parser(kind, **kwargs),
+                                     raw_page(page))
+
+    def map(self, kind: str, pages: Iterable, **kwargs: Any) ->Iterator:
+        """ parse pages in worker processes, chunksize pages per task.
+        results are yielded in order of pages.
+        """
+        return self._executor.map(self._parser(kind, **kwargs),
+                                  (raw_page(x) for x in pages),
+                                  chunksize=self.chunksize)
+
+    def close(self, wait: bool=True) ->None:
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args: Any) ->None:
+        self.close()
+
+    def __repr__(self) ->str:
+        return 'ParsePool(workers={}, chunksize={})'.format(
+                    self.workers, self.chunksize)
@@ -0,0 +1,352 @@
+import os
+import mmap
+import time
+import struct
+import random
+import asyncio
+import hashlib
+import threading
+from pathlib import Path
+from urllib.parse import urlparse
+from typing import Any, Callable, Optional, Union
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+def hostname(value: Any) ->str:
+    """ Return hostname of URL object, url string or hostname. """
+    if hasattr(value, 'hostname'):
+        value = value.hostname or ''
+    else:
+        value = str(value)
+        if '://' in value:
+            value = urlparse(value).hostname or ''
+    return value.lower()
+
+
+class TokenBucket(object):
+    __slots__ = ('rate', 'burst', 'jitter', 'tokens', 'updated',
+                 'blocked_until')
+
+    def __init__(self,
+        rate: float=0.0,
+        burst: int=1,
+        jitter: float=0.0,
+        ):
+        """ Token bucket.
+        Parameters
+        ----------
+        rate: float
+            The number of tokens added per second.
+            if 0 passed, the bucket never throttles.
+        burst: int
+            The capacity of bucket.
+        jitter: float
+            The maximum random seconds added to each delay.
+        """
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.jitter = jitter
+        self.tokens: float = float(self.burst)
+        self.updated: float = time.monotonic()
+        self.blocked_until: float = 0.0
+
+    def cooldown(self, seconds: float, now: Optional[float]=None) ->None:
+        """ Block the bucket for seconds. """
+        if now is None:
+            now = time.monotonic()
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+    def reserve(self, now: Optional[float]=None) ->float:
+        """ Take a token and return seconds to wait before using it.
+        tokens may go negative, so that concurrent callers are queued
+        without blocking each other.
+        """
+        if now is None:
+            now = time.monotonic()
+        if not self.rate:
+            return max(self.blocked_until - now, 0.0)
+        self.tokens = min(self.burst,
+                          self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        delay = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        delay = max(delay, self.blocked_until - now)
+        if self.jitter:
+            delay += random.uniform(0, self.jitter)
+        return delay
+
+
+class RateLimiter(object):
+    def __init__(self,
+        rate: float=0.0,
+        burst: int=1,
+        jitter: float=0.0,
+        domains: Optional[dict]=None,
+        ):
+        """ Per-domain token bucket rate limiter.
+        only requests to a throttled host wait,
+        requests to other hosts proceed at full speed.
+
+        Parameters
+        ----------
+        rate: float
+            default requests per second for each domain.
+            if 0 passed, no limit.
+        burst: int
+            default burst size for each domain.
+        jitter: float
+            default maximum random seconds added to each wait.
+        domains: Optional[dict]
+            per-domain settings. i.e.:
+            {'example.com': {'rate': 0.5, 'burst': 2}}
+
+        Examples
+        --------
+        >>> limiter = RateLimiter(rate=1.0, burst=2, jitter=0.5)
+        >>> limiter.wait('https://example.com/page1')
+        >>> await limiter.wait_async('https://example.com/page2')
+        """
+        self.rate = rate
+        self.burst = burst
+        self.jitter = jitter
+        self._settings: dict = dict()
+        self._buckets: dict = dict()
+        self._lock = threading.Lock()
+        for domain, setting in (domains or {}).items():
+            self.configure(domain, **setting)
+
+    def configure(self,
+        domain: str,
+        rate: Optional[float]=None,
+        burst: Optional[int]=None,
+        jitter: Optional[float]=None,
+        ) ->None:
+        """ set rate/burst/jitter for domain. """
+        domain = hostname(domain)
+        with self._lock:
+            self._configure(domain, rate=rate, burst=burst, jitter=jitter)
+
+    def _configure(self, domain: str, **values: Any) ->None:
+        """ update settings of domain. must hold the lock. """
+        setting = dict(self._settings.get(domain, {}))
+        setting.update({ k: v for k, v in values.items() if v is not None })
+        if self._settings.get(domain) == setting:
+            return
+        self._settings[domain] = setting
+        self._buckets.pop(domain, None)
+
+    def throttle(self, domain: str, rate: float) ->None:
+        """ lower rate of domain to rate. faster rate is not raised,
+        i.e. for Crawl-delay of robots.txt.
+        """
+        domain = hostname(domain)
+        with self._lock:
+            current = self._settings.get(domain, {}).get('rate', self.rate)
+            if rate > 0 and (not current or rate < current):
+                self._configure(domain, rate=rate)
+
+    def _bucket(self, domain: str) ->TokenBucket:
+        bucket = self._buckets.get(domain)
+        if bucket is None:
+            setting = self._settings.get(domain, {})
+            bucket = TokenBucket(setting.get('rate', self.rate),
+                                 setting.get('burst', self.burst),
+                                 setting.get('jitter', self.jitter))
+            self._buckets[domain] = bucket
+        return bucket
+
+    def cooldown(self, url: Any, seconds: float) ->None:
+        """ Hold all requests to host of url for seconds.
+        i.e. after '429 Too Many Requests' or 'Retry-After' header.
+        """
+        domain = hostname(url)
+        with self._lock:
+            self._bucket(domain).cooldown(seconds)
+
+    def reserve(self, url: Any) ->float:
+        """ Reserve a request slot for host of url without blocking.
+        Parameters
+        ----------
+        url: Any
+            URL object, url string or hostname.
+
+        Returns
+        -------
+        delay: float
+            seconds to wait before sending request.
+        """
+        domain = hostname(url)
+        with self._lock:
+            return self._bucket(domain).reserve()
+
+    def wait(self, url: Any) ->float:
+        """ Block calling thread until request to host of url is allowed.
+        Returns
+        -------
+        delay: float
+            seconds waited.
+        """
+        delay = self.reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    async def wait_async(self, url: Any) ->float:
+        """ Async version of wait(). other tasks keep running. """
+        delay = self.reserve(url)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+    def __repr__(self) ->str:
+        return 'RateLimiter(rate={}, burst={}, jitter={}, domains={})'.format(
+                    self.rate, self.burst, self.jitter, self._settings)
+
+
+class SharedRateLimiter(RateLimiter):
+    _magic = b'SHRL0001'
+    _header = struct.Struct('<8sQ')
+    # key, tokens, updated, blocked_until
+    _slot = struct.Struct('<Qddd')
+
+    def __init__(self,
+        path: Union[str, Path],
+        rate: float=0.0,
+        burst: int=1,
+        jitter: float=0.0,
+        domains: Optional[dict]=None,
+        slots: int=4096,
+        ):
+        """ Per-domain token bucket rate limiter shared by processes.
+        the state of buckets and cooldowns lives in a memory mapped file
+        guarded by a file lock, so that all processes on a node which
+        open the same path respect one global budget per domain.
+        rate/burst/jitter are settings of each process, so that
+        all processes should be configured the same.
+        a limiter inherited by fork() opens its own lock file in the
+        child, so that workers forked from one parent also exclude
+        each other.
+
+        Parameters
+        ----------
+        path: Union[str, Path]
+            The state file. created if not exists.
+        rate: float
+            default requests per second for each domain.
+        burst: int
+            default burst size for each domain.
+        jitter: float
+            default maximum random seconds added to each wait.
+        domains: Optional[dict]
+            per-domain settings. see also RateLimiter.
+        slots: int
+            The maximum number of domains. ignored if file exists.
+            RuntimeError is raised for new domains when all are used.
+
+        Examples
+        --------
+        >>> limiter = SharedRateLimiter('/tmp/scrapinghelper.ratelimit',
+        ...                             rate=1.0)
+        >>> scraper = Scraper(rate_limiter=limiter)
+        """
+        if fcntl is None:
+            raise RuntimeError('SharedRateLimiter requires fcntl (POSIX).')
+        super().__init__(rate, burst, jitter, domains)
+        self.path = Path(path)
+        self._fd = os.open(str(self.path), os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            size = os.fstat(self._fd).st_size
+            if size < self._header.size:
+                size = self._header.size + self._slot.size * slots
+                os.ftruncate(self._fd, size)
+                os.pwrite(self._fd, self._header.pack(self._magic, slots), 0)
+            magic, self.slots = self._header.unpack(
+                                    os.pread(self._fd, self._header.size, 0))
+            if magic != self._magic:
+                raise RuntimeError('Invalid state file: {}'.format(path))
+            self._mm = mmap.mmap(self._fd, size)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._pid = os.getpid()
+        self._offsets: dict = dict()
+
+    def _lock_fd(self) ->int:
+        """ Return fd to flock, opened by this process.
+        flock belongs to open file description, which is shared with
+        parent after fork(), so that child must open the file again.
+        must hold the lock.
+        """
+        if self._pid != os.getpid():
+            os.close(self._fd)
+            self._fd = os.open(str(self.path), os.O_RDWR)
+            self._pid = os.getpid()
+        return self._fd
+
+    @staticmethod
+    def _key(domain: str) ->int:
+        digest = hashlib.blake2b(domain.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, 'little') or 1
+
+    def _offset(self, domain: str) ->int:
+        """ find slot of domain with linear probing. must hold the lock. """
+        offset = self._offsets.get(domain)
+        if offset is not None:
+            return offset
+        key = self._key(domain)
+        home = key % self.slots
+        for n in range(self.slots):
+            offset = ( self._header.size
+                       + ((home + n) % self.slots) * self._slot.size )
+            slot_key, _, _, _ = self._slot.unpack_from(self._mm, offset)
+            if slot_key in (0, key):
+                break
+        else:
+            # sharing a slot would mix rates of two domains.
+            raise RuntimeError('All {} slots are used, {} is not limited. '
+                               'use new state file with more slots: {}'.format(
+                                    self.slots, domain, self.path))
+        if slot_key != key:
+            self._slot.pack_into(self._mm, offset,
+                                 key, float(self._bucket(domain).burst),
+                                 0.0, 0.0)
+        self._offsets[domain] = offset
+        return offset
+
+    def _update(self, url: Any, func: Callable) ->Any:
+        domain = hostname(url)
+        with self._lock:
+            fd = self._lock_fd()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                now = time.time()
+                offset = self._offset(domain)
+                bucket = self._bucket(domain)
+                _, bucket.tokens, bucket.updated, bucket.blocked_until = (
+                    self._slot.unpack_from(self._mm, offset) )
+                result = func(bucket, now)
+                self._slot.pack_into(self._mm, offset, self._key(domain),
+                                     bucket.tokens, bucket.updated,
+                                     bucket.blocked_until)
+                return result
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def reserve(self, url: Any) ->float:
+        return self._update(url, lambda bucket, now: bucket.reserve(now))
+
+    def cooldown(self, url: Any, seconds: float) ->None:
+        self._update(url,
+                     lambda bucket, now: bucket.cooldown(seconds, now))
+
+    def close(self) ->None:
+        if self._fd is not None:
+            self._mm.close()
+            os.close(self._fd)
+            self._fd = None
+
+    def __repr__(self) ->str:
+        return 'SharedRateLimiter(path={}, rate={}, burst={}, jitter={})'.format(
+                    self.path, self.rate, self.burst, self.jitter)
@@ -0,0 +1,517 @@
+import re
+import time
+import asyncio
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Iterable, Optional, Union
+import pyppeteer.errors
+from requests_html import HTML, MaxRetries, DEFAULT_ENCODING, DEFAULT_URL
+
+DEFAULT_BLOCKED_RESOURCES = ('image', 'media', 'font')
+MAX_BROWSERS = 4
+# url patterns of popular analytics and ad networks.
+TRACKER_PATTERNS = (
+    r'google-analytics\.com', r'googletagmanager\.com',
+    r'googlesyndication\.com', r'doubleclick\.net',
+    r'connect\.facebook\.net', r'hotjar\.com', r'scorecardresearch\.com',
+    r'amazon-adsystem\.com', r'criteo\.(com|net)', r'adservice\.google\.',
+)
+
+class ResourceBlocker(object):
+    def __init__(self,
+        resource_types: Iterable[str]=DEFAULT_BLOCKED_RESOURCES,
+        patterns: Iterable[str]=(),
+        ):
+        """ Abort requests of browser by resource type and URL pattern.
+        request interception is enabled for every page opened by browser,
+        so that render does not download resources not needed for DOM.
+        the main document is never blocked.
+
+        Parameters
+        ----------
+        resource_types: Iterable[str]
+            resource types of Chrome DevTools Protocol to abort.
+            i.e. 'image', 'media', 'font', 'stylesheet', 'script',
+            'xhr', 'fetch', 'websocket'.
+            default is ('image', 'media', 'font')
+        patterns: Iterable[str]
+            regular expressions of URL to abort.
+            see also TRACKER_PATTERNS.
+
+        Examples
+        --------
+        >>> blocker = ResourceBlocker(
+        ...     resource_types=('image', 'media', 'font', 'stylesheet'),
+        ...     patterns=TRACKER_PATTERNS)
+        >>> scraper = Scraper(resource_blocker=blocker)
+        >>> blocker.stats()
+        {'blocked': 120, 'allowed': 14, 'by_type': {'image': 97, ...}}
+        """
+        self.resource_types = frozenset(resource_types)
+        self.patterns = tuple(patterns)
+        self._pattern = ( re.compile('|'.join(self.patterns))
+                          if self.patterns else None )
+        self.blocked: Counter = Counter()
+        self.allowed: int = 0
+        self._lock = threading.Lock()
+
+    def is_blocked(self, url: str, resource_type: str) ->bool:
+        if resource_type == 'document':
+            return False
+        if resource_type in self.resource_types:
+            return True
+        return bool(self._pattern and self._pattern.search(url))
+
+    async def _intercept(self, request: Any) ->None:
+        resource_type = request.resourceType
+        blocked = self.is_blocked(request.url, resource_type)
+        with self._lock:
+            if blocked:
+                self.blocked[resource_type] += 1
+            else:
+                self.allowed += 1
+        try:
+            if blocked:
+                await request.abort()
+            else:
+                await request.continue_()
+        except Exception:
+            # request was already handled or page was closed.
+            pass
+
+    async def attach(self, page: Any) ->Any:
+        """ enable request interception of page. """
+        await page.setRequestInterception(True)
+        page.on('request',
+                lambda request: asyncio.ensure_future(self._intercept(request)))
+        return page
+
+    def install(self, browser: Any) ->Any:
+        """ attach to every page opened by browser.newPage(). """
+        if getattr(browser, '_resource_blocker', None) is self:
+            return browser
+        new_page = browser.newPage
+
+        async def newPage() ->Any:
+            return await self.attach(await new_page())
+
+        browser.newPage = newPage
+        browser._resource_blocker = self
+        return browser
+
+    def stats(self) ->dict:
+        """ Return counters of intercepted requests. """
+        with self._lock:
+            return dict(blocked=sum(self.blocked.values()),
+                        allowed=self.allowed,
+                        by_type=dict(self.blocked))
+
+    def __repr__(self) ->str:
+        return 'ResourceBlocker(resource_types={}, patterns={})'.format(
+                    sorted(self.resource_types), len(self.patterns))
+
+
+class WaitStrategy(object):
+    def __init__(self, timeout: float=10.0):
+        """ Base class of render waits.
+        prepare() is called before page is loaded, and
+        wait() after, until page is ready or timeout.
+        if timeout is reached, page is rendered as it is.
+
+        Parameters
+        ----------
+        timeout: float
+            The maximum seconds to wait.
+        """
+        self.timeout = timeout
+
+    async def prepare(self, page: Any) ->Any:
+        return None
+
+    async def wait(self, page: Any, state: Any=None) ->bool:
+        """ Return True if page became ready, False if timed out. """
+        raise NotImplementedError
+
+    def __repr__(self) ->str:
+        return '{}(timeout={})'.format(self.__class__.__name__, self.timeout)
+
+
+class WaitForSelector(WaitStrategy):
+    def __init__(self,
+        selector: str,
+        visible: bool=False,
+        timeout: float=10.0,
+        ):
+        """ wait until element of CSS selector appears.
+        Parameters
+        ----------
+        selector: str
+            CSS Selector to wait for.
+        visible: bool
+            if True, wait until element is also visible.
+        timeout: float
+            The maximum seconds to wait.
+        """
+        super().__init__(timeout)
+        self.selector = selector
+        self.visible = visible
+
+    async def wait(self, page: Any, state: Any=None) ->bool:
+        try:
+            await page.waitForSelector(self.selector, {
+                        'visible': self.visible,
+                        'timeout': int(self.timeout * 1000)})
+        except pyppeteer.errors.TimeoutError:
+            return False
+        return True
+
+    def __repr__(self) ->str:
+        return 'WaitForSelector(selector={!r}, timeout={})'.format(
+                    self.selector, self.timeout)
+
+
+class WaitForFunction(WaitStrategy):
+    def __init__(self,
+        expression: str,
+        polling: Union[str, int]='raf',
+        timeout: float=10.0,
+        ):
+        """ wait until JavaScript predicate returns truthy value.
+        Parameters
+        ----------
+        expression: str
+            JavaScript expression or function.
+            i.e. 'document.querySelectorAll("tr.item").length >= 50'
+        polling: Union[str, int]
+            'raf' (every animation frame), 'mutation' (on DOM mutation)
+            or interval in milliseconds.
+        timeout: float
+            The maximum seconds to wait.
+        """
+        super().__init__(timeout)
+        self.expression = expression
+        self.polling = polling
+
+    async def wait(self, page: Any, state: Any=None) ->bool:
+        try:
+            await page.waitForFunction(self.expression, {
+                        'polling': self.polling,
+                        'timeout': int(self.timeout * 1000)})
+        except pyppeteer.errors.TimeoutError:
+            return False
+        return True
+
+    def __repr__(self) ->str:
+        return 'WaitForFunction(expression={!r}, timeout={})'.format(
+                    self.expression, self.timeout)
+
+
+class _Inflight(object):
+    __slots__ = ('requests', 'changed')
+
+    def __init__(self):
+        self.requests: set = set()
+        self.changed: float = time.monotonic()
+
+    def start(self, request: Any) ->None:
+        self.requests.add(request)
+        self.changed = time.monotonic()
+
+    def finish(self, request: Any) ->None:
+        self.requests.discard(request)
+        self.changed = time.monotonic()
+
+
+class WaitForNetworkIdle(WaitStrategy):
+    def __init__(self,
+        max_inflight: int=0,
+        idle_time: float=0.5,
+        timeout: float=10.0,
+        interval: float=0.05,
+        ):
+        """ wait until network is idle.
+        network is idle when no more than max_inflight requests are
+        in flight for idle_time seconds.
+
+        Parameters
+        ----------
+        max_inflight: int
+            The number of requests allowed in flight.
+        idle_time: float
+            seconds that network must stay idle.
+        timeout: float
+            The maximum seconds to wait.
+        interval: float
+            seconds between checks.
+        """
+        super().__init__(timeout)
+        self.max_inflight = max_inflight
+        self.idle_time = idle_time
+        self.interval = interval
+
+    async def prepare(self, page: Any) ->_Inflight:
+        inflight = _Inflight()
+        page.on('request', inflight.start)
+        page.on('requestfinished', inflight.finish)
+        page.on('requestfailed', inflight.finish)
+        return inflight
+
+    async def wait(self, page: Any, state: Any=None) ->bool:
+        inflight = state or _Inflight()
+        deadline = time.monotonic() + self.timeout
+        while True:
+            now = time.monotonic()
+            if ( len(inflight.requests) <= self.max_inflight
+                 and now - inflight.changed >= self.idle_time ):
+                return True
+            if now >= deadline:
+                return False
+            await asyncio.sleep(min(self.interval, deadline - now))
+
+    def __repr__(self) ->str:
+        return ( 'WaitForNetworkIdle(max_inflight={}, idle_time={}'
+                 ', timeout={})'.format(self.max_inflight, self.idle_time,
+                                        self.timeout) )
+
+
+async def render_page(
+        browser: Any,
+        html: HTML,
+        *,
+        wait_for: Optional[Union[WaitStrategy, list]]=None,
+        retries: int=8,
+        script: Optional[str]=None,
+        wait: float=0.2,
+        scrolldown: Union[int, bool]=False,
+        sleep: float=0,
+        reload: bool=True,
+        timeout: float=8.0,
+        keep_page: bool=False,
+    ) ->Any:
+    """ render html with browser, and replace content of html.
+    same as HTML.arender(), but waits for wait strategies
+    after page is loaded instead of fixed sleep.
+
+    Parameters
+    ----------
+    browser: Any
+        browser of pyppeteer.
+    html: HTML
+        HTML object to render.
+    wait_for: Optional[Union[WaitStrategy, list]]
+        wait strategy or list of strategies, waited in order.
+    **kwargs:
+        see also HTML.render() of requests_html.
+
+    Returns
+    -------
+    result: Any
+        result of script if passed.
+    """
+    if html.url == DEFAULT_URL:
+        reload = False
+    if wait_for is None:
+        strategies: list = []
+    elif isinstance(wait_for, WaitStrategy):
+        strategies = [wait_for]
+    else:
+        strategies = list(wait_for)
+
+    content, result, page = None, None, None
+    for _ in range(retries):
+        page = await browser.newPage()
+        try:
+            states = [ await x.prepare(page) for x in strategies ]
+            await asyncio.sleep(wait)
+            options = {'timeout': int(timeout * 1000)}
+            if reload:
+                await page.goto(html.url, options=options)
+            else:
+                await page.goto(f'data:text/html,{html.html}', options=options)
+            for strategy, state in zip(strategies, states):
+                await strategy.wait(page, state)
+
+            if script:
+                result = await page.evaluate(script)
+            if scrolldown:
+                for _ in range(scrolldown):
+                    await page._keyboard.down('PageDown')
+                    await asyncio.sleep(sleep)
+                await page._keyboard.up('PageDown')
+            elif sleep:
+                await asyncio.sleep(sleep)
+            content = await page.content()
+        except pyppeteer.errors.TimeoutError:
+            await page.close()
+            page = None
+            continue
+        if not keep_page:
+            await page.close()
+            page = None
+        break
+
+    if not content:
+        raise MaxRetries("Unable to render the page. Try increasing timeout")
+
+    rendered = HTML(session=html.session, url=html.url,
+                    html=content.encode(DEFAULT_ENCODING),
+                    default_encoding=DEFAULT_ENCODING)
+    html.__dict__.update(rendered.__dict__)
+    html.page = page
+    return result
+
+
+class RenderLoop(object):
+    def __init__(self,
+        browser_args: Optional[str]=None,
+        resource_blocker: Optional[ResourceBlocker]=None,
+        browser_service: Any=None,
+        browser_recycler: Any=None,
+        max_browsers: int=MAX_BROWSERS,
+        ):
+        """ Render pages on one event loop thread shared by all threads.
+        browsers are launched lazily on the loop, one per proxy server,
+        and each render opens its own page, so that worker threads
+        could render concurrently without owning a browser.
+        at most max_browsers sessions are kept, the least recently used
+        one is closed when its renders are finished. to rotate many
+        proxies, pass browser_service, which renders each proxy in
+        incognito context of one browser.
+
+        Parameters
+        ----------
+        browser_args: Optional[str]
+            arguments for browser. default is DEFAULT_BROWSER_ARGS
+        resource_blocker: Optional[ResourceBlocker]
+            if provided, abort requests of browser with it.
+        browser_service: Optional[BrowserService]
+            if provided, render in contexts of the shared browser.
+        browser_recycler: Optional[BrowserRecycler]
+            if provided, restart browsers by renders and RSS.
+        max_browsers: int
+            The maximum number of browsers or contexts kept open.
+        """
+        self.browser_args = browser_args
+        self.resource_blocker = resource_blocker
+        self.browser_service = browser_service
+        self.browser_recycler = browser_recycler
+        self.max_browsers = max(max_browsers, 1)
+        self.renders: int = 0
+        self.evicted: int = 0
+        self._sessions: OrderedDict = OrderedDict()
+        self._active: Counter = Counter()
+        self._lock = threading.Lock()
+        self._loop = asyncio.new_event_loop()
+        self._browser_lock: Optional[asyncio.Lock] = None
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name='scrapinghelper-render')
+        self._thread.start()
+
+    def _run(self) ->None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def _new_session(self, proxy_server: Optional[str]) ->Any:
+        # imported here, scraper imports this module.
+        from .scraper import AsyncHTMLSession, DEFAULT_BROWSER_ARGS
+        return AsyncHTMLSession(
+                    browser_args=self.browser_args or DEFAULT_BROWSER_ARGS,
+                    proxy_server=proxy_server,
+                    resource_blocker=self.resource_blocker,
+                    browser_service=self.browser_service,
+                    browser_recycler=self.browser_recycler)
+
+    async def _session(self, proxy_server: Optional[str]) ->Any:
+        """ Return session of proxy_server, and count it as in use. """
+        if self._browser_lock is None:
+            self._browser_lock = asyncio.Lock()
+        async with self._browser_lock:
+            session = self._sessions.get(proxy_server)
+            if session is None:
+                session = self._new_session(proxy_server)
+                self._sessions[proxy_server] = session
+            self._sessions.move_to_end(proxy_server)
+            # launch browser once, before concurrent renders use it.
+            await session.browser
+            self._active[proxy_server] += 1
+            await self._evict()
+        return session
+
+    async def _release(self, proxy_server: Optional[str]) ->None:
+        async with self._browser_lock:
+            self._active[proxy_server] -= 1
+            if self._active[proxy_server] <= 0:
+                del self._active[proxy_server]
+            await self._evict()
+
+    async def _evict(self) ->None:
+        """ close least recently used sessions over max_browsers,
+        which have no render in flight. must hold _browser_lock.
+        """
+        over = len(self._sessions) - self.max_browsers
+        idle = [ x for x in self._sessions if not self._active[x] ][:max(over, 0)]
+        for proxy_server in idle:
+            session = self._sessions.pop(proxy_server)
+            self.evicted += 1
+            await session.close()
+
+    async def _render(self,
+        html: HTML,
+        proxy_server: Optional[str],
+        render_kwargs: dict,
+        ) ->Any:
+        session = await self._session(proxy_server)
+        try:
+            html.session = session
+            return await session.arender(html, **render_kwargs)
+        finally:
+            await self._release(proxy_server)
+
+    def render(self,
+        html: HTML,
+        proxy_server: Optional[str]=None,
+        **render_kwargs: Any,
+        ) ->Any:
+        """ render html on the loop thread and wait for the result.
+        html is updated in place as HTML.render() does.
+
+        Parameters
+        ----------
+        html: HTML
+            HTML object to render. must not be shared with other threads.
+        proxy_server: Optional[str]
+            proxy server of browser.
+        **render_kwargs:
+            arguments of render_page().
+
+        Returns
+        -------
+        result: Any
+            result of script if passed.
+        """
+        if threading.current_thread() is self._thread:
+            raise RuntimeError('Cannot render from the render loop thread.')
+        with self._lock:
+            self.renders += 1
+        future = asyncio.run_coroutine_threadsafe(
+                    self._render(html, proxy_server, render_kwargs), self._loop)
+        return future.result()
+
+    async def _close(self) ->None:
+        for session in self._sessions.values():
+            await session.close()
+        self._sessions.clear()
+        self._active.clear()
+
+    def close(self) ->None:
+        """ close browsers and stop loop thread. """
+        if not self._loop.is_running():
+            return
+        asyncio.run_coroutine_threadsafe(self._close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __repr__(self) ->str:
+        return 'RenderLoop(browsers={}, renders={})'.format(
+                    len(self._sessions), self.renders)
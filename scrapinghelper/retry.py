@@ -0,0 +1,309 @@
+import time
+import heapq
+import inspect
+import random
+import itertools
+import threading
+from email.utils import parsedate_to_datetime
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Optional
+import requests
+
+DEFAULT_RETRY_STATUSES = (408, 425, 429, 500, 502, 503, 504)
+DEFAULT_RETRY_EXCEPTIONS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+class RetryBudget(object):
+    def __init__(self, retries: int):
+        """ The number of retries allowed for a whole job.
+        shared by all requests of the job, thread-safe.
+        Parameters
+        ----------
+        retries: int
+            total retries allowed.
+        """
+        self.retries = retries
+        self.used: int = 0
+        self._lock = threading.Lock()
+
+    @property
+    def remaining(self) ->int:
+        return max(self.retries - self.used, 0)
+
+    def acquire(self) ->bool:
+        """ consume one retry. return False if budget is exhausted. """
+        with self._lock:
+            if self.used >= self.retries:
+                return False
+            self.used += 1
+            return True
+
+    def __repr__(self) ->str:
+        return 'RetryBudget(retries={}, used={})'.format(
+                    self.retries, self.used)
+
+
+def parse_retry_after(value: Optional[str]) ->Optional[float]:
+    """ parse Retry-After header.
+    Parameters
+    ----------
+    value: str
+        delay-seconds or HTTP-date.
+    Returns
+    -------
+    seconds: Optional[float]
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(date.timestamp() - time.time(), 0.0)
+
+
+class RetryPolicy(object):
+    def __init__(self,
+        max_retries: int=3,
+        statuses: Iterable[int]=DEFAULT_RETRY_STATUSES,
+        exceptions: tuple=DEFAULT_RETRY_EXCEPTIONS,
+        backoff: float=0.5,
+        backoff_max: float=60.0,
+        budget: Optional[RetryBudget]=None,
+        retry_after: bool=True,
+        retry_after_max: float=600.0,
+        rotate_proxy: bool=True,
+        ):
+        """ Retry policy with exponential backoff and full jitter.
+        Parameters
+        ----------
+        max_retries: int
+            The maximum number of retries per request.
+        statuses: Iterable[int]
+            HTTP status codes to retry.
+        exceptions: tuple
+            exception classes to retry.
+        backoff: float
+            base seconds of backoff.
+            the delay of n-th retry is random between 0 and
+            min(backoff_max, backoff * 2 ** n).
+        backoff_max: float
+            The maximum seconds of backoff.
+        budget: Optional[RetryBudget]
+            if provided, retries are also limited by budget of the job.
+        retry_after: bool
+            if True, honour 'Retry-After' header of response.
+        retry_after_max: float
+            give up if 'Retry-After' is longer than this seconds.
+        rotate_proxy: bool
+            if True, retry with next proxy when proxy is used.
+        """
+        self.max_retries = max_retries
+        self.statuses = frozenset(statuses)
+        self.exceptions = exceptions
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.budget = budget
+        self.retry_after = retry_after
+        self.retry_after_max = retry_after_max
+        self.rotate_proxy = rotate_proxy
+
+    def is_retryable(self,
+        response: Optional[requests.Response]=None,
+        exception: Optional[BaseException]=None,
+        ) ->bool:
+        """ classify result of request. """
+        if exception is not None:
+            return isinstance(exception, self.exceptions)
+        status = getattr(response, 'status_code', None)
+        return status in self.statuses
+
+    def throttles_host(self, response: Optional[requests.Response]=None) ->bool:
+        """ Return True if host asked to slow down, by 429 or 'Retry-After'.
+        such delay is for all requests to the host, other backoffs
+        are for the request being retried.
+        """
+        if response is None:
+            return False
+        return ( response.status_code == 429
+                 or (self.retry_after and 'Retry-After' in response.headers) )
+
+    def backoff_delay(self, attempt: int) ->float:
+        """ full jitter backoff for attempt (0 origin). """
+        return random.uniform(0, min(self.backoff_max,
+                                     self.backoff * (2 ** attempt)))
+
+    def delay(self,
+        attempt: int,
+        response: Optional[requests.Response]=None,
+        ) ->Optional[float]:
+        """ Return seconds to wait before retry,
+        or None if request should not be retried.
+        """
+        if attempt >= self.max_retries:
+            return None
+        delay = self.backoff_delay(attempt)
+        if self.retry_after and response is not None:
+            retry_after = parse_retry_after(
+                            response.headers.get('Retry-After'))
+            if retry_after is not None:
+                if retry_after > self.retry_after_max:
+                    return None
+                delay = retry_after
+        if self.budget is not None and not self.budget.acquire():
+            return None
+        return delay
+
+    def __repr__(self) ->str:
+        return ( 'RetryPolicy(max_retries={}, backoff={}, backoff_max={}'
+                 ', budget={})'.format(self.max_retries, self.backoff,
+                                       self.backoff_max, self.budget) )
+
+
+def _accepts_attempt(func: Callable) ->bool:
+    """ Return True if func has parameter 'attempt'.
+    **kwargs does not count, it may be passed on to requests.
+    """
+    try:
+        param = inspect.signature(func).parameters.get('attempt')
+    except (TypeError, ValueError):
+        return False
+    return param is not None and param.kind in (
+                    inspect.Parameter.POSITIONAL_OR_KEYWORD,
+                    inspect.Parameter.KEYWORD_ONLY)
+
+
+class _Job(object):
+    __slots__ = ('func', 'args', 'kwargs', 'future', 'attempt',
+                 'pass_attempt')
+
+    def __init__(self, func: Callable, args: tuple, kwargs: dict,
+                 future: Future):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.future = future
+        self.attempt = 0
+        self.pass_attempt = _accepts_attempt(func)
+
+    def __call__(self) ->Any:
+        if self.pass_attempt:
+            return self.func(*self.args, attempt=self.attempt, **self.kwargs)
+        return self.func(*self.args, **self.kwargs)
+
+
+class RetryScheduler(object):
+    def __init__(self,
+        policy: Optional[RetryPolicy]=None,
+        workers: int=8,
+        ):
+        """ Run jobs on thread pool and retry failed jobs.
+        backoff waits are scheduled on a timer heap instead of sleeping
+        in workers, so that other jobs keep flowing while waiting.
+
+        Parameters
+        ----------
+        policy: Optional[RetryPolicy]
+            retry policy. default is RetryPolicy()
+        workers: int
+            The number of worker threads.
+
+        Examples
+        --------
+        >>> scheduler = RetryScheduler(RetryPolicy(max_retries=5))
+        >>> futures = [ scheduler.submit(fetch, url) for url in urls ]
+        >>> results = [ x.result() for x in futures ]
+
+        if func has parameter ``attempt``, it is called with the number
+        of attempt (0 origin), so that it could rotate proxy for retries.
+        """
+        self.policy = policy or RetryPolicy()
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._heap: list = list()
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._dispatcher = threading.Thread(target=self._dispatch,
+                                            daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, func: Callable, *args: Any, **kwargs: Any) ->Future:
+        """ submit func(*args, **kwargs), or func(*args, attempt=n, **kwargs)
+        if func has parameter ``attempt``.
+        Returns
+        -------
+        future: Future
+            result of the last attempt.
+        """
+        job = _Job(func, args, kwargs, Future())
+        self._executor.submit(self._run, job)
+        return job.future
+
+    def _run(self, job: _Job) ->None:
+        response, error = None, None
+        try:
+            response = job()
+        except BaseException as e:
+            error = e
+
+        delay = None
+        if self.policy.is_retryable(response, error):
+            delay = self.policy.delay(job.attempt, response)
+
+        if delay is None:
+            if error is not None:
+                job.future.set_exception(error)
+            else:
+                job.future.set_result(response)
+            return
+
+        job.attempt += 1
+        with self._cond:
+            if self._closed:
+                job.future.cancel()
+                return
+            heapq.heappush(self._heap, (time.monotonic() + delay,
+                                        next(self._counter), job))
+            self._cond.notify()
+
+    def _dispatch(self) ->None:
+        with self._cond:
+            while not self._closed:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                due, _, job = self._heap[0]
+                timeout = due - time.monotonic()
+                if timeout > 0:
+                    self._cond.wait(timeout)
+                    continue
+                heapq.heappop(self._heap)
+                self._executor.submit(self._run, job)
+
+    @property
+    def pending(self) ->int:
+        """ The number of jobs waiting for retry. """
+        return len(self._heap)
+
+    def close(self, wait: bool=True) ->None:
+        """ stop scheduler. jobs waiting for retry are cancelled. """
+        with self._cond:
+            self._closed = True
+            jobs = [ x[2] for x in self._heap ]
+            self._heap.clear()
+            self._cond.notify()
+        for job in jobs:
+            job.future.cancel()
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args: Any) ->None:
+        self.close()
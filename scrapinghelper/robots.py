@@ -0,0 +1,360 @@
+import re
+import time
+import asyncio
+import threading
+from functools import partial
+from urllib.parse import urlsplit, quote, unquote
+from typing import Any, Iterable, NamedTuple, Optional
+import requests
+from .logging import logger
+from .store import freshness
+
+ROBOTS_MAX_SIZE = 500 * 1024
+_SAFE = "/%*$?=&;:@+,!~'()[]"
+_RATE = re.compile(r'^\s*(\d+)\s*/\s*(\d+)\s*([smhd]?)', re.I)
+_UNITS = { '': 1, 's': 1, 'm': 60, 'h': 3600, 'd': 86400 }
+
+def _normalize(path: str) ->str:
+    """ percent-encode path the same way for rules and URLs. """
+    return quote(unquote(path), safe=_SAFE)
+
+
+class _Node(object):
+    __slots__ = ('children', 'allow')
+
+    def __init__(self):
+        self.children: dict = dict()
+        self.allow: Optional[bool] = None
+
+
+class RuleTrie(object):
+    def __init__(self, rules: Iterable=()):
+        """ Allow/Disallow rules of robots.txt compiled for matching.
+        literal rules are kept in a trie of characters, so that a path
+        is matched by one walk of its characters. rules with '*' or '$'
+        are compiled to regular expressions.
+        the longest matching rule wins, and Allow wins ties (RFC 9309).
+
+        Parameters
+        ----------
+        rules: Iterable
+            (allow, pattern) pairs. i.e. [(False, '/private/')]
+        """
+        self.root = _Node()
+        self.patterns: list = list()
+        self.size: int = 0
+        for allow, pattern in rules:
+            self.add(allow, pattern)
+
+    def add(self, allow: bool, pattern: str) ->None:
+        if not pattern:
+            # empty Disallow allows everything.
+            return
+        pattern = _normalize(pattern)
+        self.size += 1
+        if '*' in pattern or pattern.endswith('$'):
+            end = pattern.endswith('$')
+            body = pattern[:-1] if end else pattern
+            regex = '.*'.join(re.escape(x) for x in body.split('*'))
+            self.patterns.append((len(pattern), allow,
+                                  re.compile(regex + ('$' if end else ''))))
+            return
+        node = self.root
+        for char in pattern:
+            node = node.children.setdefault(char, _Node())
+        node.allow = allow or bool(node.allow)
+
+    def match(self, path: str) ->Optional[tuple]:
+        """ Return (length, allow) of the longest matching rule. """
+        best = None
+        node, depth = self.root, 0
+        for char in path:
+            node = node.children.get(char)
+            if node is None:
+                break
+            depth += 1
+            if node.allow is not None:
+                best = (depth, node.allow)
+        for length, allow, regex in self.patterns:
+            if regex.match(path) and (best is None or (length, allow) > best):
+                best = (length, allow)
+        return best
+
+    def allowed(self, path: str) ->bool:
+        matched = self.match(path)
+        return matched is None or matched[1]
+
+    def __len__(self) ->int:
+        return self.size
+
+
+class RobotsRules(object):
+    def __init__(self,
+        rules: Optional[RuleTrie]=None,
+        crawl_delay: Optional[float]=None,
+        request_rate: Optional[float]=None,
+        sitemaps: Optional[list]=None,
+        allow_all: bool=False,
+        disallow_all: bool=False,
+        ):
+        """ rules of robots.txt for one user agent.
+        use RobotsRules.parse().
+        """
+        self.rules = rules or RuleTrie()
+        self.crawl_delay = crawl_delay
+        self.request_rate = request_rate
+        self.sitemaps = sitemaps or list()
+        self.allow_all = allow_all
+        self.disallow_all = disallow_all
+
+    @classmethod
+    def parse(cls, text: str, user_agent: str='*') ->'RobotsRules':
+        """ parse robots.txt for user_agent.
+        the group of the longest user-agent token in user_agent is used,
+        or group of '*'. groups of the same user agent are merged.
+        """
+        agent = user_agent.lower()
+        groups: dict = dict()
+        sitemaps: list = list()
+        current: list = list()
+        in_rules = False
+        for line in text.splitlines():
+            key, sep, value = line.split('#', 1)[0].partition(':')
+            if not sep:
+                continue
+            key, value = key.strip().lower(), value.strip()
+            if key == 'sitemap':
+                sitemaps.append(value)
+                continue
+            if key == 'user-agent':
+                if in_rules:
+                    current, in_rules = list(), False
+                groups.setdefault(value.lower(), {'rules': [], 'extensions': {}})
+                current.append(groups[value.lower()])
+                continue
+            if key in ('allow', 'disallow'):
+                in_rules = True
+                for group in current:
+                    group['rules'].append((key == 'allow', value))
+            elif key in ('crawl-delay', 'request-rate'):
+                in_rules = True
+                for group in current:
+                    group['extensions'].setdefault(key, value)
+
+        tokens = [ x for x in groups if x != '*' and x in agent ]
+        if tokens:
+            group = groups[max(tokens, key=len)]
+        else:
+            group = groups.get('*', {'rules': [], 'extensions': {}})
+        extensions = group['extensions']
+        return cls(RuleTrie(group['rules']),
+                   crawl_delay=_crawl_delay(extensions.get('crawl-delay')),
+                   request_rate=_request_rate(extensions.get('request-rate')),
+                   sitemaps=sitemaps)
+
+    def allowed(self, path: str) ->bool:
+        if self.disallow_all:
+            return path == '/robots.txt'
+        if self.allow_all:
+            return True
+        return self.rules.allowed(path)
+
+    @property
+    def rate(self) ->Optional[float]:
+        """ requests per second by Crawl-delay or Request-rate. """
+        rates = [ x for x in (self.crawl_delay and 1.0 / self.crawl_delay,
+                              self.request_rate) if x ]
+        return min(rates) if rates else None
+
+    def __repr__(self) ->str:
+        return 'RobotsRules(rules={}, crawl_delay={}, request_rate={})'.format(
+                    len(self.rules), self.crawl_delay, self.request_rate)
+
+
+def _crawl_delay(value: Optional[str]) ->Optional[float]:
+    try:
+        delay = float(value) if value else None
+    except ValueError:
+        return None
+    return delay if delay and delay > 0 else None
+
+def _request_rate(value: Optional[str]) ->Optional[float]:
+    """ 'Request-rate: 1/5' means 1 request per 5 seconds. """
+    matched = _RATE.match(value or '')
+    if not matched:
+        return None
+    count, seconds = int(matched.group(1)), int(matched.group(2))
+    seconds *= _UNITS[matched.group(3).lower()]
+    return count / seconds if count and seconds else None
+
+
+class RobotsEntry(NamedTuple):
+    rules: RobotsRules
+    expires: float
+
+
+class RobotsCache(object):
+    def __init__(self,
+        user_agent: str='*',
+        ttl: float=86400.0,
+        error_ttl: float=600.0,
+        timeout: float=10.0,
+        rate_limiter: Any=None,
+        ):
+        """ Per-host cache of robots.txt.
+        robots.txt is requested once per host and kept until it expires,
+        so that can_fetch() is a dict lookup and a walk of path in
+        precompiled rules.
+
+        Parameters
+        ----------
+        user_agent: str
+            product token to select group of robots.txt. i.e. 'mybot'
+            default is the group of '*'.
+        ttl: float
+            The maximum seconds to keep robots.txt. max-age or Expires
+            of response shortens it.
+        error_ttl: float
+            seconds to keep result of server errors, which disallow all.
+        timeout: float
+            timeout of requests of robots.txt.
+        rate_limiter: RateLimiter
+            if provided, Crawl-delay and Request-rate of robots.txt
+            lower rate of the host. Scraper sets its rate_limiter.
+
+        Examples
+        --------
+        >>> robots = RobotsCache(user_agent='mybot')
+        >>> sc = Scraper(robots=robots)
+        >>> sc.request('https://example.com/private/')
+        WebScraperDisallowed: https://example.com/private/
+        >>> robots.can_fetch('https://example.com/public/')
+        True
+        """
+        self.user_agent = user_agent
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.requests: int = 0
+        self._entries: dict = dict()
+        self._locks: dict = dict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _split(url: Any) ->tuple:
+        """ Return (origin, path) of url. """
+        parts = urlsplit(str(url))
+        origin = '{}://{}'.format(parts.scheme.lower(), parts.netloc.lower())
+        path = _normalize(parts.path or '/')
+        if parts.query:
+            path += '?' + parts.query
+        return origin, path
+
+    def is_fresh(self, url: Any, now: Optional[float]=None) ->bool:
+        """ Return True if robots.txt of host of url is cached. """
+        entry = self._entries.get(self._split(url)[0])
+        return entry is not None and entry.expires > (now or time.time())
+
+    def rules(self,
+        url: Any,
+        session: Optional[requests.Session]=None,
+        ) ->RobotsRules:
+        """ Return rules of host of url, request robots.txt if expired. """
+        origin = self._split(url)[0]
+        entry = self._entries.get(origin)
+        if entry is not None and entry.expires > time.time():
+            return entry.rules
+        with self._lock:
+            lock = self._locks.setdefault(origin, threading.Lock())
+        with lock:
+            # other thread may have loaded it.
+            entry = self._entries.get(origin)
+            if entry is None or entry.expires <= time.time():
+                entry = self._load(origin, session)
+                self._entries[origin] = entry
+            return entry.rules
+
+    def _load(self,
+        origin: str,
+        session: Optional[requests.Session]=None,
+        ) ->RobotsEntry:
+        now = time.time()
+        self.requests += 1
+        url = origin + '/robots.txt'
+        try:
+            if session is None:
+                response = requests.get(url, timeout=self.timeout)
+            else:
+                response = session.get(url, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            logger.debug('robots.txt unreachable, disallow all: {}: {}', url, e)
+            return RobotsEntry(RobotsRules(disallow_all=True),
+                               now + self.error_ttl)
+        status = response.status_code
+        if status >= 500 or status == 429:
+            logger.debug('robots.txt status {}, disallow all: {}', status, url)
+            return RobotsEntry(RobotsRules(disallow_all=True),
+                               now + self.error_ttl)
+        expires = min(freshness(response.headers, now) or now + self.ttl,
+                      now + self.ttl)
+        if status >= 400:
+            # robots.txt is unavailable.
+            return RobotsEntry(RobotsRules(allow_all=True), expires)
+        text = response.content[:ROBOTS_MAX_SIZE].decode('utf-8', errors='replace')
+        rules = RobotsRules.parse(text, self.user_agent)
+        if rules.rate and self.rate_limiter is not None:
+            self.rate_limiter.throttle(origin, rules.rate)
+        logger.debug('robots.txt loaded: {} {}', url, rules)
+        return RobotsEntry(rules, expires)
+
+    def can_fetch(self,
+        url: Any,
+        session: Optional[requests.Session]=None,
+        ) ->bool:
+        """ Return True if robots.txt allows to fetch url.
+        Parameters
+        ----------
+        url: Any
+            URL object or url string.
+        session: Optional[requests.Session]
+            session to request robots.txt.
+        """
+        path = self._split(url)[1]
+        return self.rules(url, session).allowed(path)
+
+    async def can_fetch_async(self,
+        url: Any,
+        session: Optional[requests.Session]=None,
+        ) ->bool:
+        """ Async version of can_fetch().
+        robots.txt is requested in executor, cached rules are
+        answered on event loop.
+        """
+        if self.is_fresh(url):
+            return self.can_fetch(url)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None,
+                                          partial(self.can_fetch, url, session))
+
+    def crawl_delay(self, url: Any) ->Optional[float]:
+        entry = self._entries.get(self._split(url)[0])
+        return entry.rules.crawl_delay if entry else None
+
+    def request_rate(self, url: Any) ->Optional[float]:
+        entry = self._entries.get(self._split(url)[0])
+        return entry.rules.request_rate if entry else None
+
+    def invalidate(self, url: Optional[Any]=None) ->None:
+        """ drop cache of host of url, or all hosts. """
+        if url is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(self._split(url)[0], None)
+
+    def __len__(self) ->int:
+        return len(self._entries)
+
+    def __repr__(self) ->str:
+        return 'RobotsCache(user_agent={!r}, hosts={}, requests={})'.format(
+                    self.user_agent, len(self._entries), self.requests)
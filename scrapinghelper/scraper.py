@@ -1,15 +1,20 @@
 import os
 import time
 import asyncio
-import ipaddress
 import pyppeteer
 from pathlib import Path
 import itertools
-from typing import Any, Optional, Union, NamedTuple
+import threading
+from time import perf_counter
+from types import MappingProxyType
+from functools import partial
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Iterable, Mapping, Optional, Union, NamedTuple
 #
 import numpy as np
 import pandas as pd
 import requests
+from requests.structures import CaseInsensitiveDict
 from requests_html import (
     HTML, HTMLResponse, Element, MaxRetries, PyQuery
 )
@@ -19,9 +24,29 @@ from .url import URL
 from .proxy import ProxyManager, ProxyRotate, PROXY
 from .user_agents import UserAgent
 from .user_agents import user_agent as useragent_manager
+from .extract import ExtractionSchema
+from .connection import PooledAdapter, DNSCache, mount_adapter, unmount_adapter
+from .ratelimit import RateLimiter
+from .retry import RetryPolicy
+from .metrics import Metrics, FetchTiming, fetch_timing
+from .hooks import HookRegistry
+from .hooks import hook_registry
+from .parallel import ParsePool, raw_page, parser
+from .sink import ResultSink
+from .render import RenderLoop, ResourceBlocker, render_page
+from .render import WaitForNetworkIdle
+from .browser import BrowserService, BrowserRecycler
+from .store import DownloadStore
+from .download import SegmentedDownload, verify_checksum, unlink_shared
+from .transport import AiohttpTransport
+from .headers import HeaderProfiles
+from .robots import RobotsCache
+from .iptools import random_ips
 
 DEFAULT_USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_12_6) AppleWebKit/603.3.8 (KHTML, like Gecko) Version/10.1.2 Safari/603.3.8'
 DEFAULT_BROWSER_ARGS = '--no-sandbox -ignore-certificate-errors'
+CHUNK_SIZE = 64 * 1024
+DEFAULT_WAIT_TIMEOUT = 10.0
 
 class WebScraperException(BaseException):
     pass
@@ -29,10 +54,44 @@ class WebScraperException(BaseException):
 class WebScraperNotFound(WebScraperException):
     pass
 
+class WebScraperDisallowed(WebScraperException):
+    """ URL is disallowed by robots.txt. """
+    pass
+
 class TAG_LINK(NamedTuple):
     text: str
     link: Union[URL,str]
 
+class FetchResult(NamedTuple):
+    url: str
+    status_code: Optional[int]
+    headers: Mapping
+    content: bytes
+    encoding: Optional[str]
+    rendered: Optional[str] = None
+    proxy: Optional[str] = None
+    timing: Optional[FetchTiming] = None
+    history: tuple = ()
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) ->bool:
+        return ( self.error is None and self.status_code is not None
+                 and self.status_code < 400 )
+
+    @property
+    def text(self) ->str:
+        if self.rendered is not None:
+            return self.rendered
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+    @property
+    def html(self) ->HTML:
+        """ Return new HTML object of rendered html or content. """
+        return HTML(url=self.url, html=self.text if self.rendered is not None
+                                       else self.content,
+                    default_encoding=self.encoding or 'utf-8')
+
 def user_agent(style:Optional[str]=None) ->str:
     # style is always ignore. just for compatibility.
     try:
@@ -60,9 +119,15 @@ class HTMLSession(requests_html.BaseSession):
     def __init__(self,
             proxy_server: Optional[str]=None,
             browser_args: str = DEFAULT_BROWSER_ARGS,
+            resource_blocker: Optional[ResourceBlocker]=None,
+            browser_service: Optional[BrowserService]=None,
+            browser_recycler: Optional[BrowserRecycler]=None,
             **kwargs:Any
         )->None:
         self._proxy_server = None
+        self.resource_blocker = resource_blocker
+        self.browser_service = browser_service
+        self.browser_recycler = browser_recycler
 
         if proxy_server:
             self.proxy_server = proxy_server
@@ -86,9 +151,33 @@ class HTMLSession(requests_html.BaseSession):
             self.loop = asyncio.get_event_loop()
             if self.loop.is_running():
                 raise RuntimeError("Cannot use HTMLSession within an existing event loop. Use AsyncHTMLSession instead.")
-            self._browser = self.loop.run_until_complete(super().browser)
+            if self.browser_service:
+                self._browser = self.loop.run_until_complete(
+                        self.browser_service.open_context(self.proxy_server))
+            else:
+                self._browser = self.loop.run_until_complete(super().browser)
+            if self.resource_blocker:
+                self.resource_blocker.install(self._browser)
         return self._browser
 
+    def render(self, html: HTML, **render_kwargs: Any) ->Any:
+        """ render html with browser of session.
+        see also scrapinghelper.render.render_page()
+        """
+        browser = self.browser
+        recycler = self.browser_recycler
+        if recycler is not None:
+            if recycler.due(browser):
+                # renders run one by one, nothing is in flight.
+                logger.debug('restart browser: {}', recycler)
+                self.loop.run_until_complete(self._browser.close())
+                del self._browser
+                recycler.restarted()
+                browser = self.browser
+            recycler.count(browser)
+        return self.loop.run_until_complete(
+                    render_page(browser, html, **render_kwargs))
+
     def close(self) ->None:
         """ If a browser was created close it first. """
         if hasattr(self, "_browser"):
@@ -102,6 +191,10 @@ class AsyncHTMLSession(requests_html.BaseSession):
             mock_browser: bool = True,
             browser_args: str = DEFAULT_BROWSER_ARGS,
             proxy_server: Optional[str]=None,
+            resource_blocker: Optional[ResourceBlocker]=None,
+            browser_service: Optional[BrowserService]=None,
+            browser_recycler: Optional[BrowserRecycler]=None,
+            transport: Optional[AiohttpTransport]=None,
             *args:Any, **kwargs:Any
         )-> None:
         """ Set or create an event loop and a thread pool.
@@ -109,8 +202,17 @@ class AsyncHTMLSession(requests_html.BaseSession):
             :param loop: Asyncio loop to use.
             :param workers: Amount of threads to use for executing async calls.
                 If not pass it will default to the number of processors on the
-                machine, multiplied by 5. """
+                machine, multiplied by 5.
+            :param transport: if provided, requests are sent by the native
+                asyncio transport instead of threads. """
         self._proxy_server = None
+        self.transport = transport
+        self.resource_blocker = resource_blocker
+        self.browser_service = browser_service
+        self.browser_recycler = browser_recycler
+        self._browser_lock: Optional[asyncio.Lock] = None
+        self._inflight: dict = dict()
+        self._retired: list = list()
 
         if proxy_server:
             self.proxy_server = proxy_server
@@ -119,6 +221,10 @@ class AsyncHTMLSession(requests_html.BaseSession):
 
         super().__init__(*args, **kwargs)
 
+        self.loop = loop or asyncio.get_event_loop()
+        self.thread_pool = ( ThreadPoolExecutor(max_workers=workers)
+                             if transport is None else None )
+
     @property
     def proxy_server(self):
         return self._proxy_server
@@ -128,8 +234,66 @@ class AsyncHTMLSession(requests_html.BaseSession):
         if self._proxy_server != val:
             self._proxy_server = val
 
+    @property
+    async def browser(self):
+        if not hasattr(self, "_browser"):
+            if self.browser_service:
+                self._browser = await self.browser_service.open_context(
+                                                        self.proxy_server)
+                browser = self._browser
+            else:
+                browser = await super().browser
+            if self.resource_blocker:
+                self.resource_blocker.install(browser)
+        return self._browser
+
+    async def arender(self, html: HTML, **render_kwargs: Any) ->Any:
+        """ render html with browser of session.
+        see also scrapinghelper.render.render_page()
+        """
+        browser = await self._acquire_browser()
+        try:
+            return await render_page(browser, html, **render_kwargs)
+        finally:
+            await self._release_browser(browser)
+
+    async def _acquire_browser(self) ->Any:
+        if self._browser_lock is None:
+            self._browser_lock = asyncio.Lock()
+        async with self._browser_lock:
+            browser = await self.browser
+            recycler = self.browser_recycler
+            if recycler is not None:
+                if recycler.due(browser):
+                    # new renders go to new browser, old one is closed
+                    # when its in-flight renders are finished.
+                    logger.debug('restart browser: {}', recycler)
+                    del self._browser
+                    recycler.restarted()
+                    if self._inflight.get(browser):
+                        self._retired.append(browser)
+                    else:
+                        await browser.close()
+                    browser = await self.browser
+                recycler.count(browser)
+            self._inflight[browser] = self._inflight.get(browser, 0) + 1
+        return browser
+
+    async def _release_browser(self, browser: Any) ->None:
+        self._inflight[browser] -= 1
+        if self._inflight[browser] > 0:
+            return
+        del self._inflight[browser]
+        if browser in self._retired:
+            self._retired.remove(browser)
+            await browser.close()
+
     def request(self, *args, **kwargs):
-        """ Partial original request func and run it in a thread. """
+        """ Partial original request func and run it in a thread.
+        with transport, return coroutine of the transport.
+        """
+        if self.transport is not None:
+            return self.transport.request(self, *args, **kwargs)
         func = partial(super().request, *args, **kwargs)
         return self.loop.run_in_executor(self.thread_pool, func)
 
@@ -137,6 +301,40 @@ class AsyncHTMLSession(requests_html.BaseSession):
         """ If a browser was created close it first. """
         if hasattr(self, "_browser"):
             await self._browser.close()
+            del self._browser
+        while self._retired:
+            await self._retired.pop().close()
+        self._close_session()
+
+    def close_sync(self) ->None:
+        """ close session from synchronous code.
+        close() runs on loop of session. if the loop was closed,
+        i.e. after asyncio.run(), browsers are killed.
+        if called in running event loop, close() is scheduled on it,
+        await close() instead to wait for it.
+        """
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is not None:
+            self._closing = running.create_task(self.close())
+        elif not self.loop.is_closed():
+            self.loop.run_until_complete(self.close())
+        else:
+            browsers = self._retired + [ getattr(self, '_browser', None) ]
+            for browser in browsers:
+                # contexts of BrowserService have no process.
+                process = getattr(browser, 'process', None)
+                if process is not None:
+                    process.kill()
+            self._retired = list()
+            self.__dict__.pop('_browser', None)
+            self._close_session()
+
+    def _close_session(self) ->None:
+        if self.thread_pool is not None:
+            self.thread_pool.shutdown(wait=False)
         super().close()
 
     def run(self, *coros):
@@ -144,10 +342,9 @@ class AsyncHTMLSession(requests_html.BaseSession):
             in a task, run it and wait for the result. Return a list with all
             results, this is returned in the same order coros are passed in. """
         tasks = [
-            asyncio.ensure_future(coro()) for coro in coros
+            asyncio.ensure_future(coro(), loop=self.loop) for coro in coros
         ]
-        done, _ = self.loop.run_until_complete(asyncio.wait(tasks))
-        return [t.result() for t in done]
+        return self.loop.run_until_complete(asyncio.gather(*tasks))
 
 
 class Scraper(object):
@@ -161,6 +358,23 @@ class Scraper(object):
                  headers: Optional[dict]=None,
                  proxies: Optional[Union[list,str]]=None,
                  logconfig: Optional[LogConfig]=None,
+                 pool_connections: int=10,
+                 pool_maxsize: int=10,
+                 max_retries: int=0,
+                 rate_limiter: Optional[RateLimiter]=None,
+                 retry: Optional[RetryPolicy]=None,
+                 hooks: Optional[HookRegistry]=None,
+                 parse_pool: Optional[ParsePool]=None,
+                 sink: Optional[ResultSink]=None,
+                 resource_blocker: Optional[ResourceBlocker]=None,
+                 block_resources: bool=True,
+                 browser_service: Optional[BrowserService]=None,
+                 browser_recycler: Optional[BrowserRecycler]=None,
+                 store: Optional[DownloadStore]=None,
+                 transport: Optional[AiohttpTransport]=None,
+                 dns_cache: Optional[DNSCache]=None,
+                 header_profiles: Optional[HeaderProfiles]=None,
+                 robots: Optional[RobotsCache]=None,
         ):
         """
         Pameters
@@ -169,7 +383,8 @@ class Scraper(object):
             if provided, of how many long to wait after initial render.
 
         sleep: int
-            if provided, of how many long to sleep after initial render.
+            if provided, the maximum seconds to wait for network idle
+            after initial render.
 
         browser_args: str
             browser lunch option.
@@ -191,6 +406,72 @@ class Scraper(object):
         logconfig: LogConfig
             if provided, configure for loguru.
 
+        pool_connections: int
+            The number of hosts to keep keep-alive connection pools for.
+
+        pool_maxsize: int
+            The maximum number of pooled connections per host.
+
+        max_retries: int
+            The number of retries at the connection adapter level.
+            default is 0 (no retry).
+
+        rate_limiter: RateLimiter
+            if provided, pace requests per domain with it.
+            default is no limit.
+
+        retry: RetryPolicy
+            if provided, retry failed requests with the policy.
+            default is no retry.
+
+        hooks: HookRegistry
+            hooks around fetch, render, parse and download stages.
+            default is scrapinghelper.hook_registry
+
+        parse_pool: ParsePool
+            if provided, parse() runs in worker processes.
+            default is to parse in calling thread.
+
+        sink: ResultSink
+            if provided, rows of extract() are appended to sink.
+
+        resource_blocker: ResourceBlocker
+            abort requests of browser while rendering.
+            default is to abort images, media and fonts.
+
+        block_resources: bool
+            if False, browser downloads all resources.
+
+        browser_service: BrowserService
+            if provided, render with incognito contexts of the shared
+            browser instead of launching browser per session.
+
+        browser_recycler: BrowserRecycler
+            restart browser by the number of renders and RSS.
+            default is to restart after 1000 renders or 2GiB RSS.
+
+        store: DownloadStore
+            if provided, download_file() stores files by hash of content,
+            and skips download of URLs which are not modified.
+
+        transport: AiohttpTransport
+            if provided, request_async() sends requests by aiohttp
+            on the event loop instead of threads.
+
+        dns_cache: DNSCache
+            if provided, new connections resolve hosts with the cache.
+            default is to resolve for every new connection.
+
+        header_profiles: HeaderProfiles
+            headers sent with each user agent. unless headers passed,
+            requests send headers consistent with the user agent,
+            i.e. Accept, Sec-Fetch-* and Sec-CH-UA*.
+
+        robots: RobotsCache
+            if provided, URLs disallowed by robots.txt are not requested
+            and raise WebScraperDisallowed. Crawl-delay and Request-rate
+            lower rate of the host in rate_limiter.
+
     If just ``sleep`` is provided, the rendering will wait *n* seconds, before
     returning.
         """
@@ -204,50 +485,144 @@ class Scraper(object):
         self.session: Union[HTMLSession, AsyncHTMLSession] = None
         self.response: HTMLResponse = None
         self.proxy_manager: ProxyManager = ProxyManager(proxies)
+        self.rate_limiter: RateLimiter = rate_limiter or RateLimiter()
+        self.retry: Optional[RetryPolicy] = retry
+        self.metrics: Metrics = Metrics()
+        self.hooks: HookRegistry = hooks if hooks is not None else hook_registry
+        self.parse_pool: Optional[ParsePool] = parse_pool
+        self.sink: Optional[ResultSink] = sink
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # monotonic time of next download paced by sleep, per host.
+        self._download_due: dict = dict()
+        self._render_loop: Optional[RenderLoop] = None
+        self.resource_blocker: Optional[ResourceBlocker] = (
+            resource_blocker or (ResourceBlocker() if block_resources else None) )
+        self.browser_service: Optional[BrowserService] = browser_service
+        self.browser_recycler: BrowserRecycler = (
+            browser_recycler or BrowserRecycler(metrics=self.metrics) )
+        self.store: Optional[DownloadStore] = store
+        self.transport: Optional[AiohttpTransport] = transport
+        self.robots: Optional[RobotsCache] = robots
+        if robots is not None and robots.rate_limiter is None:
+            robots.rate_limiter = self.rate_limiter
+        self.adapter: PooledAdapter = PooledAdapter(
+                                        pool_connections=pool_connections,
+                                        pool_maxsize=pool_maxsize,
+                                        max_retries=max_retries,
+                                        dns_cache=dns_cache )
 
         self.user_agent = useragent_manager
         self.user_agent.load_datafile(keep_user_agents, datapath)
-        self.headers = headers or {
-                "Accept": (
-                    "text/html,application/xhtml+xml,"
-                    "application/xml;q=0.9,"
-                    "image/webp,image/apng,*/*;q=0.8,"
-                    "application/signed-exchange;v=b3;q=0.9"),
-                "Accept-Encoding": "gzip, deflate, br",
-                "Accept-Language": "en",
-                "Upgrade-Insecure-Requests": "1",
-                "User-Agent": self.user_agent.get_random_user_agent(),
-            }
+        self.header_profiles: HeaderProfiles = header_profiles or HeaderProfiles()
+        self._custom_headers = bool(headers)
+        if not headers:
+            self.header_profiles.prepare(self.user_agent.user_agents.user_agent)
+            headers = dict(self.header_profiles.get(
+                                self.user_agent.get_random_user_agent()))
+        self.headers = headers
+        self.http: requests.Session = mount_adapter(requests.Session(),
+                                                    self.adapter)
+        self._use_headers(self.http, self.headers)
 
         if logconfig:
             logger.remove()
             logger.configure(**(logconfig.config()))
-            logger.debug('LOG configure: {}'.format(logconfig))
+            logger.enable('scrapinghelper')
+            logger.debug('LOG configure: {}', logconfig)
         else:
-            logger.disable(__name__)
+            logger.disable('scrapinghelper')
 
     def __enter__(self):
         return self
 
     def __exit__(self, *args, **kwargs):
-        del self
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args, **kwargs):
+        await self.aclose()
+
+    def close(self) ->None:
+        """ close session and all pooled connections.
+        buffered rows of sink are flushed.
+        """
+        self.session_close()
+        self.http.close()
+        if self._render_loop is not None:
+            self._render_loop.close()
+            self._render_loop = None
+        if self.sink is not None:
+            self.sink.flush()
+
+    async def aclose(self) ->None:
+        """ async version of close(), which awaits close of
+        AsyncHTMLSession and its browser.
+        """
+        await self.asession_close()
+        self.close()
 
     def get_random_user_agent(self) -> str:
         return self.user_agent.get_random_user_agent()
 
+    def get_headers(self, user_agent: Optional[str]=None) ->Mapping:
+        """ Return request headers of user_agent.
+        Parameters
+        ----------
+        user_agent: Optional[str]
+            if not set, headers of session.
+            if set as 'random', headers of random user agent.
+
+        Returns
+        -------
+        headers: Mapping
+            headers consistent with user_agent from header_profiles.
+            if headers were passed to Scraper, only User-Agent is changed.
+        """
+        if not user_agent:
+            return self.headers
+        if user_agent == 'random':
+            user_agent = self.get_random_user_agent()
+        if self._custom_headers:
+            return dict(self.headers, **{'User-Agent': user_agent})
+        return self.header_profiles.get(user_agent)
+
+    def _use_headers(self, session: requests.Session, headers: Mapping) ->None:
+        """ set headers of session for next requests.
+        profiles replace all headers, so that no header of other
+        user agent is left and headers are sent in order of profile.
+        """
+        if self._custom_headers:
+            session.headers.update(headers)
+        else:
+            session.headers = CaseInsensitiveDict(headers)
+
+    @staticmethod
+    def _override_headers(session: requests.Session, headers: Mapping) ->dict:
+        """ Return request headers to send headers instead of headers
+        of session, which may be shared by concurrent requests.
+        headers only of session are removed by None.
+        """
+        override = dict.fromkeys(session.headers)
+        override.update(headers)
+        return override
+
+    def _check_robots(self, url: Union[URL, str]) ->None:
+        if self.robots is not None and not self.robots.can_fetch(url, self.http):
+            raise WebScraperDisallowed('Disallowed by robots.txt: {}'.format(url))
+
     def get_random_ipv4(self) ->str:
-        MAX_IPV4 = ipaddress.IPv4Address._ALL_ONES  # 2 ** 32 - 1
-        return  ipaddress.IPv4Address._string_from_ip_int(
-            np.random.randint(0, MAX_IPV4)
-        )
+        return random_ips(1, version=4, exclude_private=False)[0]
 
     def get_random_ipv6(self) ->str:
-        MAX_IPV6 = ipaddress.IPv6Address._ALL_ONES  # 2 ** 128 - 1
-        return ipaddress.IPv6Address._string_from_ip_int(
-            np.random.randint(0, MAX_IPV6)
-        )
+        return random_ips(1, version=6, networks='::/0', exclude_private=False)[0]
 
     def random_wait(self, sleep: int=0):
+        """ sleep random seconds, blocking calling thread.
+        Prefer rate_limiter, which only waits for throttled hosts.
+        """
         sleep = sleep or self.sleep
         time.sleep(np.random.randint(2,sleep))
 
@@ -261,11 +636,97 @@ class Scraper(object):
         """
         _ = self.proxy_manager.load_proxies(proxies)
 
+    def _rotate_session(self,
+        proxy_server: Optional[str],
+        render: bool,
+        ) ->None:
+        if self._session_stale(proxy_server, render):
+            self.session_close()
+
+    def _session_stale(self,
+        proxy_server: Optional[str],
+        render: bool,
+        ) ->bool:
+        # connections per proxy are kept by the shared adapter,
+        # only browser of session is bound to proxy.
+        return bool( self.session and render
+                     and self.session.proxy_server != proxy_server )
+
     def session_close(self) ->None:
         if self.session:
-            self.session.close()
+            # keep pooled connections of shared adapter alive.
+            unmount_adapter(self.session, self.adapter)
+            if isinstance(self.session, AsyncHTMLSession):
+                self.session.close_sync()
+            else:
+                self.session.close()
             self.session = None
 
+    async def asession_close(self) ->None:
+        """ async version of session_close(). """
+        if isinstance(self.session, AsyncHTMLSession):
+            session, self.session = self.session, None
+            unmount_adapter(session, self.adapter)
+            await session.close()
+        else:
+            self.session_close()
+
+    def connection_stats(self) ->dict:
+        """ Return connection reuse statistics of pooled connections.
+        see also PooledAdapter.stats()
+        """
+        return self.adapter.stats()
+
+    def prewarm(self,
+        hosts: Iterable[Union[URL, str]],
+        connections: int=1,
+        timeout: float=10.0,
+        workers: int=16,
+        ) ->dict:
+        """ resolve hosts and open keep-alive connections before batch,
+        so that first request to each host does not wait for DNS,
+        TCP and TLS handshake.
+
+        Parameters
+        ----------
+        hosts: Iterable[Union[URL, str]]
+            hostnames or URLs. hostnames are connected by https.
+            i.e. ['example.com', 'http://example.org:8080/']
+        connections: int
+            The number of connections per host.
+            more than pool_maxsize are not kept.
+        timeout: float
+            timeout seconds to connect.
+        workers: int
+            The number of hosts to connect concurrently.
+
+        Returns
+        -------
+        result: dict
+            {host: the number of connections opened, or exception}
+        """
+        urls = dict()
+        for host in hosts:
+            url = str(host)
+            urls[url] = url if '://' in url else 'https://{}/'.format(url)
+
+        def connect(url: str) ->Union[int, Exception]:
+            # same pool key as requests, which is given by environment.
+            settings = self.http.merge_environment_settings(
+                            url, {}, None, None, None)
+            try:
+                return self.adapter.prewarm(url, connections,
+                                            proxies=settings['proxies'],
+                                            verify=settings['verify'],
+                                            timeout=timeout)
+            except Exception as e:
+                logger.debug('prewarm failed: {} {}', url, e)
+                return e
+
+        with ThreadPoolExecutor(max_workers=max(min(workers, len(urls)), 1)) as executor:
+            results = executor.map(connect, urls.values())
+            return dict(zip(urls.keys(), results))
+
     async def request_async(self,
                 url: URL,
                 timeout: int=0,
@@ -274,43 +735,96 @@ class Scraper(object):
                 proxy_rotate: ProxyRotate=ProxyRotate.NO_PROXY,
                 render: bool=True,
                 render_kwargs: dict={'keep_page': False},
+                retry: Optional[RetryPolicy]=None,
                 **kwargs: Any,
         ) ->HTMLResponse:
         self.timeout = timeout or self.timeout
         self.sleep = sleep or self.sleep
         self.url = url
+        if ( self.robots is not None
+             and not await self.robots.can_fetch_async(url, self.http) ):
+            raise WebScraperDisallowed('Disallowed by robots.txt: {}'.format(url))
 
-        if not user_agent:
-            headers = self.headers
-        elif user_agent == 'random':
-            headers = {'User-Agent': self.get_random_user_agent() }
-
-        if proxy_rotate != ProxyRotate.NO_PROXY:
+        proxy_server = self.proxy_manager.get_proxy(proxy_rotate)
+        proxy_server = proxy_server.proxy_map['https'] if proxy_server else None
+        if not isinstance(self.session, (AsyncHTMLSession, type(None))):
             self.session_close()
+        if ( proxy_rotate != ProxyRotate.NO_PROXY
+             and self._session_stale(proxy_server, render) ):
+            await self.asession_close()
 
         if not self.session:
-            proxy_server = self.proxy_manager.get_proxy(proxy_rotate)
-            proxy_server = proxy_server.proxy_map['https'] if proxy_server else None
             self.session = AsyncHTMLSession( browser_args = self.browser_args,
-                                             proxy_server=proxy_server )
-
-        self.session.headers.update(self.headers)
-        logger.debug('URL: {}'.format(url))
+                                             proxy_server=proxy_server,
+                                             resource_blocker=self.resource_blocker,
+                                             browser_service=self.browser_service,
+                                             browser_recycler=self.browser_recycler,
+                                             transport=self.transport )
+            mount_adapter(self.session, self.adapter)
+
+        self._use_headers(self.session, self.headers)
+        if user_agent:
+            # concurrent requests share headers of session.
+            kwargs['headers'] = dict(
+                        self._override_headers(self.session,
+                                               self.get_headers(user_agent)),
+                        **kwargs.get('headers', None) or {})
+        logger.debug('URL: {}', url)
+        await self.rate_limiter.wait_async(url)
+
+        retry = retry or self.retry
 
         async def get_page():
-            proxy = self.proxy_manager.get_proxy(proxy_rotate)
-            proxy_map = proxy.proxy_map if proxy else None
-            response = await self.session.get(url, proxies=proxy_map, **kwargs)
-            logger.debug('response status_code: {}'.format(response.status_code))
+            rotate = proxy_rotate
+            attempt = 0
+            while True:
+                proxy = self.proxy_manager.get_proxy(rotate)
+                proxy_map = proxy.proxy_map if proxy else None
+                proxy_url = proxy.proxy_url if proxy else None
+                response, error = None, None
+                start = perf_counter()
+                try:
+                    with self.hooks.span('fetch', url=str(url),
+                                         proxy=proxy_url) as ctx:
+                        response = await self.session.get(url, proxies=proxy_map,
+                                                          **kwargs)
+                        if ctx is not None:
+                            ctx['status'] = response.status_code
+                except requests.exceptions.RequestException as e:
+                    error = e
+                timing = fetch_timing(url, response, perf_counter() - start,
+                                      proxy_url)
+                delay = None
+                if retry and retry.is_retryable(response, error):
+                    delay = retry.delay(attempt, response)
+                if delay is None:
+                    break
+                self.metrics.record(timing)
+                logger.debug('retry {} after {:.2f} seconds: {}',
+                             attempt + 1, delay, url)
+                await self._backoff_async(url, delay, response, retry)
+                attempt += 1
+                if retry.rotate_proxy and rotate != ProxyRotate.NO_PROXY:
+                    rotate = ProxyRotate.NEXT
+            if error is not None:
+                self.metrics.record(timing)
+                raise error
+            logger.debug('response status_code: {}', response.status_code)
+            render_time = 0.0
             if render:
-                await response.html.arender(
-                                timeout=self.timeout,
-                                sleep=np.random.randint(0,self.sleep),
-                                **render_kwargs,
-                                )
+                start = perf_counter()
+                with self.hooks.span('render', url=str(url)):
+                    await self.session.arender(
+                                response.html,
+                                **self._render_kwargs(render_kwargs,
+                                                      self.timeout, self.sleep))
+                render_time = perf_counter() - start
+            response.timing = timing._replace(render=render_time,
+                                              total=timing.total + render_time)
+            self.metrics.record(response.timing)
             return response
 
-        self.response = self.session.run(get_page)[0]
+        self.response = await get_page()
         return self.response
 
     def request(self,
@@ -321,46 +835,322 @@ class Scraper(object):
                 proxy_rotate: ProxyRotate=ProxyRotate.NO_PROXY,
                 render: bool=True,
                 render_kwargs: dict={'keep_page': False},
+                retry: Optional[RetryPolicy]=None,
                 **kwargs: Any,
         ) ->HTMLResponse:
         """request get page from URL
+        Parameters
+        ----------
+        render_kwargs: dict
+            arguments of render. see also HTML.render()
+            'wait_for' could be WaitForSelector, WaitForNetworkIdle,
+            WaitForFunction or list of them. default is to wait for
+            network idle at most ``sleep`` seconds.
+        retry: RetryPolicy
+            if provided, retry failed requests with the policy.
+            default is retry policy of session.
+            retries use next proxy when proxy_rotate is not NO_PROXY.
+            backoff sleeps in calling thread. on 429 or 'Retry-After',
+            all requests to the host wait instead.
+
+        raises WebScraperDisallowed if robots of Scraper disallows url.
         """
         self.timeout = timeout or self.timeout
         self.sleep = sleep or self.sleep
         self.url = url
+        self._check_robots(url)
+        headers = self.get_headers(user_agent)
 
-        if not user_agent:
-            headers = self.headers
-        elif user_agent == 'random':
-            headers = {'User-Agent': self.get_random_user_agent() }
+        retry = retry or self.retry
+        attempt = 0
+        while True:
+            response, error = None, None
+            try:
+                response = self._get(url, proxy_rotate, render=render,
+                                     session_headers=headers, **kwargs)
+            except requests.exceptions.RequestException as e:
+                error = e
+
+            delay = None
+            if retry and retry.is_retryable(response, error):
+                delay = retry.delay(attempt, response)
+            if delay is None:
+                break
+
+            logger.debug('retry {} after {:.2f} seconds: {}',
+                         attempt + 1, delay, url)
+            self._backoff(url, delay, response, retry)
+            attempt += 1
+            if retry.rotate_proxy and proxy_rotate != ProxyRotate.NO_PROXY:
+                proxy_rotate = ProxyRotate.NEXT
+
+        if error is not None:
+            logger.opt(exception=error).error("request failed")
+            return None
+
+        self.response = response
+        render_time = 0.0
+        if render:
+            render_kwargs = self._render_kwargs(render_kwargs,
+                                                self.timeout, self.sleep)
+            start = perf_counter()
+            with self.hooks.span('render', url=str(url)):
+                self.session.render(self.response.html, **render_kwargs)
+            render_time = perf_counter() - start
+        response.timing = response.timing._replace(
+                            render=render_time,
+                            total=response.timing.total + render_time)
+        self.metrics.record(response.timing)
+        return self.response
+
+    def fetch(self,
+                url: Union[URL, str],
+                *,
+                timeout: Optional[float]=None,
+                user_agent: Optional[str]=None,
+                headers: Optional[dict]=None,
+                proxy_rotate: ProxyRotate=ProxyRotate.NO_PROXY,
+                render: bool=False,
+                render_kwargs: Optional[dict]=None,
+                retry: Optional[RetryPolicy]=None,
+                **kwargs: Any,
+        ) ->FetchResult:
+        """reentrant version of request().
+        all options are per call and the state of Scraper is not changed,
+        so that one Scraper could be shared by threads of a thread pool.
+        each thread uses its own session over the shared connection pool,
+        and pages are rendered on one browser of the shared render loop.
+
+        Parameters
+        ----------
+        url: Union[URL, str]
+            URL to fetch.
+        timeout: Optional[float]
+            timeout of request and render. default is timeout of Scraper.
+        user_agent: Optional[str]
+            User-Agent of this request. if 'random' passed,
+            random user agent is used.
+        headers: Optional[dict]
+            headers to add for this request.
+        proxy_rotate: ProxyRotate
+            proxy to use. default is ProxyRotate.NO_PROXY
+        render: bool
+            if True, render page with browser. default is False.
+        render_kwargs: Optional[dict]
+            arguments of HTML.render()
+        retry: RetryPolicy
+            default is retry policy of Scraper.
+            backoff sleeps in calling thread, submit fetch() to
+            RetryScheduler to keep workers busy while waiting.
+            on 429 or 'Retry-After', all requests to the host wait.
+        **kwargs:
+            arguments of requests.Session.get()
 
+        Returns
+        -------
+        result: FetchResult
+            immutable result. error is set if request failed,
+            or WebScraperDisallowed if robots of Scraper disallows url.
+
+        Examples
+        --------
+        >>> with ThreadPoolExecutor(32) as executor:
+        ...     results = list(executor.map(scraper.fetch, urls))
+        """
+        timeout = timeout or self.timeout or None
         try:
-            if proxy_rotate != ProxyRotate.NO_PROXY:
-                self.session_close()
-
-            if not self.session:
-                proxy_server = self.proxy_manager.get_proxy(proxy_rotate)
-                proxy_server = proxy_server.proxy_map['https'] if proxy_server else None
-                self.session = HTMLSession( browser_args = self.browser_args,
-                                            proxy_server=proxy_server )
-
-            self.session.headers.update(self.headers)
-            logger.debug('URL: {}'.format(url))
-            proxy= self.proxy_manager.get_proxy(proxy_rotate)
+            self._check_robots(url)
+        except WebScraperDisallowed as e:
+            return FetchResult(url=str(url), status_code=None,
+                               headers=MappingProxyType({}), content=b'',
+                               encoding=None, error=e)
+        retry = retry or self.retry
+        session = self._thread_session()
+        # session is of calling thread.
+        self._use_headers(session, self.get_headers(user_agent))
+
+        attempt = 0
+        while True:
+            with self._lock:
+                proxy = self.proxy_manager.get_proxy(proxy_rotate)
             proxy_map = proxy.proxy_map if proxy else None
-            self.response = self.session.get(url, proxies=proxy_map, **kwargs)
-            logger.debug('response status_code: {}'.format(self.response.status_code))
-            if render:
-                render_kwargs['timeout'] = render_kwargs.get('timtout',
-                                                              self.timeout )
-                sleep = render_kwargs.get('sleep', self.sleep)
-                if sleep:
-                    render_kwargs['sleep'] = np.random.randint(0,sleep)
-                self.response.html.render( **render_kwargs )
-            return self.response
+            proxy_url = proxy.proxy_url if proxy else None
+            response, error = None, None
+            logger.debug('URL: {}', url)
+            self.rate_limiter.wait(url)
+            start = perf_counter()
+            try:
+                with self.hooks.span('fetch', url=str(url),
+                                     proxy=proxy_url) as ctx:
+                    response = session.get(str(url), headers=headers,
+                                           proxies=proxy_map,
+                                           timeout=timeout, **kwargs)
+                    if ctx is not None:
+                        ctx['status'] = response.status_code
+            except requests.exceptions.RequestException as e:
+                error = e
+            timing = fetch_timing(url, response, perf_counter() - start,
+                                  proxy_url)
+
+            delay = None
+            if retry and retry.is_retryable(response, error):
+                delay = retry.delay(attempt, response)
+            if delay is None:
+                break
+            self.metrics.record(timing)
+            logger.debug('retry {} after {:.2f} seconds: {}',
+                         attempt + 1, delay, url)
+            self._backoff(url, delay, response, retry)
+            attempt += 1
+            if retry.rotate_proxy and proxy_rotate != ProxyRotate.NO_PROXY:
+                proxy_rotate = ProxyRotate.NEXT
+
+        if error is not None:
+            self.metrics.record(timing)
+            logger.opt(exception=error).error("request failed")
+            return FetchResult(url=str(url), status_code=None,
+                               headers=MappingProxyType({}), content=b'',
+                               encoding=None, proxy=proxy_url,
+                               timing=timing, error=error)
+
+        encoding = response.encoding or response.apparent_encoding
+        rendered = None
+        if render:
+            render_kwargs = self._render_kwargs(render_kwargs, timeout or 8.0)
+            html = HTML(url=response.url, html=response.content,
+                        default_encoding=encoding or 'utf-8')
+            start = perf_counter()
+            with self.hooks.span('render', url=str(url)):
+                self.render_loop.render(
+                    html,
+                    proxy_map.get('https') if proxy_map else None,
+                    **render_kwargs)
+            render_time = perf_counter() - start
+            rendered = html.html
+            timing = timing._replace(render=render_time,
+                                     total=timing.total + render_time)
+        self.metrics.record(timing)
+        return FetchResult(
+                url=response.url,
+                status_code=response.status_code,
+                headers=MappingProxyType(response.headers.copy()),
+                content=response.content,
+                encoding=encoding,
+                rendered=rendered,
+                proxy=proxy_url,
+                timing=timing,
+                history=tuple(x.url for x in response.history),
+            )
+
+    def _backoff(self,
+                url: Union[URL, str],
+                delay: float,
+                response: Optional[requests.Response],
+                retry: RetryPolicy,
+        ) ->None:
+        """ wait delay seconds before retry.
+        if host asked to slow down, requests to the host are held on
+        rate_limiter, which is waited before next attempt. otherwise
+        only calling thread sleeps. to keep workers serving other jobs
+        while waiting, submit fetch() to RetryScheduler instead.
+        """
+        if retry.throttles_host(response):
+            self.rate_limiter.cooldown(url, delay)
+        else:
+            time.sleep(delay)
+
+    async def _backoff_async(self,
+                url: Union[URL, str],
+                delay: float,
+                response: Optional[requests.Response],
+                retry: RetryPolicy,
+        ) ->None:
+        """ async version of _backoff(), waits without blocking loop. """
+        if retry.throttles_host(response):
+            self.rate_limiter.cooldown(url, delay)
+            await self.rate_limiter.wait_async(url)
+        else:
+            await asyncio.sleep(delay)
+
+    def _render_kwargs(self,
+                render_kwargs: Optional[dict],
+                timeout: float,
+                sleep: float=0,
+        ) ->dict:
+        """ copy render_kwargs with defaults.
+        unless 'sleep' or 'wait_for' passed, render waits until network
+        is idle, for at most sleep seconds.
+        """
+        render_kwargs = dict(render_kwargs or {})
+        render_kwargs.setdefault('timeout', timeout)
+        if 'sleep' not in render_kwargs and 'wait_for' not in render_kwargs:
+            render_kwargs['wait_for'] = WaitForNetworkIdle(
+                                    timeout=sleep or DEFAULT_WAIT_TIMEOUT)
+        return render_kwargs
+
+    def _thread_session(self) ->requests.Session:
+        """ Return session of calling thread over the shared adapter. """
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = mount_adapter(requests.Session(), self.adapter)
+            self._use_headers(session, self.headers)
+            self._local.session = session
+        return session
+
+    @property
+    def render_loop(self) ->RenderLoop:
+        """ render loop shared by threads, created on first use. """
+        with self._lock:
+            if self._render_loop is None:
+                self._render_loop = RenderLoop(self.browser_args,
+                                               self.resource_blocker,
+                                               self.browser_service,
+                                               self.browser_recycler)
+            return self._render_loop
+
+    def _get(self,
+                url: URL,
+                proxy_rotate: ProxyRotate=ProxyRotate.NO_PROXY,
+                render: bool=True,
+                session_headers: Optional[Mapping]=None,
+                **kwargs: Any,
+        ) ->HTMLResponse:
+        proxy = self.proxy_manager.get_proxy(proxy_rotate)
+        proxy_map = proxy.proxy_map if proxy else None
+        proxy_server = proxy_map.get('https') if proxy_map else None
 
-        except requests.exceptions.RequestException as e:
-            logger.exception("request failed")
+        if isinstance(self.session, AsyncHTMLSession):
+            self.session_close()
+        if proxy_rotate != ProxyRotate.NO_PROXY:
+            self._rotate_session(proxy_server, render)
+
+        if not self.session:
+            self.session = HTMLSession( browser_args = self.browser_args,
+                                        proxy_server=proxy_server,
+                                        resource_blocker=self.resource_blocker,
+                                        browser_service=self.browser_service,
+                                        browser_recycler=self.browser_recycler )
+            mount_adapter(self.session, self.adapter)
+
+        self._use_headers(self.session, session_headers or self.headers)
+        logger.debug('URL: {}', url)
+        self.rate_limiter.wait(url)
+        proxy_url = proxy.proxy_url if proxy_map else None
+        start = perf_counter()
+        try:
+            with self.hooks.span('fetch', url=str(url), proxy=proxy_url) as ctx:
+                response = self.session.get(url, proxies=proxy_map, **kwargs)
+                if ctx is not None:
+                    ctx['status'] = response.status_code
+        except requests.exceptions.RequestException:
+            self.metrics.record(fetch_timing(url, None,
+                                             perf_counter() - start,
+                                             proxy_url))
+            raise
+        response.timing = fetch_timing(url, response,
+                                       perf_counter() - start, proxy_url)
+        logger.debug('response status_code: {}', response.status_code)
+        return response
 
     def get_texts(self,
         selector: Union[list, str]=['table', 'tr'],
@@ -385,17 +1175,18 @@ class Scraper(object):
 
         html = html or self.response.html
 
-        elements = html.find(selector[0], **kwargs)
-        for select in selector[-1:]:
-            if select == selector[0]:
-                continue
-            elements = elements[0].find(select, **kwargs)
+        with self.hooks.span('get_texts', url=html.url, selector=selector):
+            elements = html.find(selector[0], **kwargs)
+            for select in selector[-1:]:
+                if select == selector[0]:
+                    continue
+                elements = elements[0].find(select, **kwargs)
 
-        if hasattr(elements, '__iter__'):
-            contents = [ x.text.split(split) for x in elements ]
-        else:
-            contents = [ elements.text.split(split) ]
-        return contents
+            if hasattr(elements, '__iter__'):
+                contents = [ x.text.split(split) for x in elements ]
+            else:
+                contents = [ elements.text.split(split) ]
+            return contents
 
 
     def get_links(self,
@@ -438,22 +1229,78 @@ class Scraper(object):
         if containing and isinstance(containing, str):
             containing = [containing]
         links = list()
-        for e in html.find(selector, **kwargs):
-            for link in e.links:
-                url = URL(link)
-                if startswith and not any(url.basename.startswith(x) for x in startswith):
-                    continue
-                if endswith and not any(url.basename.endswith(x) for x in endswith):
-                    continue
-                if containing and not any(x in url.decode() for x in containing):
-                    continue
-                try:
-                    links.append(TAG_LINK(text=e.text, link=URL(link)))
-                except:
-                    pass
+        with self.hooks.span('get_links', url=html.url, selector=selector):
+            for e in html.find(selector, **kwargs):
+                for link in e.links:
+                    url = URL(link)
+                    if startswith and not any(url.basename.startswith(x) for x in startswith):
+                        continue
+                    if endswith and not any(url.basename.endswith(x) for x in endswith):
+                        continue
+                    if containing and not any(x in url.decode() for x in containing):
+                        continue
+                    try:
+                        links.append(TAG_LINK(text=e.text, link=URL(link)))
+                    except:
+                        pass
 
         return links
 
+    def extract(self,
+        schema: ExtractionSchema,
+        html: Optional[HTML]=None,
+        ) -> list:
+        """extract rows from contents of HTML object using schema.
+        Parameters
+        ----------
+        schema: ExtractionSchema
+            compiled extraction schema.
+        html: HTML
+            HTML object of requests_html
+        Returns
+        ------
+        list of row: dict
+            rows are also appended to sink if provided.
+        """
+        html = html or self.response.html
+        with self.hooks.span('extract', url=html.url):
+            rows = schema.apply(html)
+        if self.sink is not None:
+            self.sink.extend(rows)
+        return rows
+
+    def parse(self,
+        kind: str,
+        page: Any=None,
+        **kwargs: Any,
+        ) -> Future:
+        """parse raw bytes of page in parse_pool.
+        the main thread could keep fetching while parsing.
+        Parameters
+        ----------
+        kind: str
+            'links', 'texts', 'tables' or 'extract'.
+        page: Any
+            response, HTML object or raw html.
+            default is the last response.
+        **kwargs:
+            arguments of parser. see also scrapinghelper.parallel
+        Returns
+        ------
+        future: Future
+            compact result. i.e. list of (text, link) for 'links'.
+        """
+        page = page if page is not None else self.response
+        if self.parse_pool is not None:
+            return self.parse_pool.submit(kind, page, **kwargs)
+        future: Future = Future()
+        try:
+            raw, url = raw_page(page)
+            future.set_result(parser(kind)(raw, url, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
     def get_filename(self,
         url: Union[URL, str],
         replace: dict={},
@@ -479,6 +1326,9 @@ class Scraper(object):
         filename: str='',
         sleep: int=0,
         user_agent: Optional[str]=None,
+        store: Optional[DownloadStore]=None,
+        segments: int=0,
+        checksum: Optional[str]=None,
         ) -> bool:
         """download file from url
         Parameters
@@ -488,10 +1338,24 @@ class Scraper(object):
         filename: str
             if not set, using basename of deccoded url.
         sleep: int
-            if not set, using sleep time of session.
+            if set, start this download at least ``sleep`` seconds
+            after the last download from the host which passed sleep.
+            rate_limiter of session is waited in any case, and is not
+            changed by sleep.
         user_agent: str
             if not set, using user_agent of session.
             if set as 'random', using random user_agent.
+        store: DownloadStore
+            if not set, using store of session.
+            if store is available, content is hashed into store and
+            linked or copied to filename. fresh URLs are not requested,
+            and others are requested with validators of last download.
+        segments: int
+            if more than 1, download byte ranges concurrently by
+            this number of connections. fall back to single stream
+            if server does not support ranges.
+        checksum: str
+            if set, verify downloaded file. 'sha256:<hexdigest>'
 
         Return
         download status: bool
@@ -506,20 +1370,106 @@ class Scraper(object):
         if not filename:
             filename = url.basename
 
-        if not user_agent:
-            headers = self.headers
-        elif user_agent == 'random':
-            headers = {'User-Agent': self.get_random_user_agent() }
-        else:
-            headers = {'User-Agent': user_agent }
+        headers = self.get_headers(user_agent)
+        if user_agent:
+            headers = self._override_headers(self.http, headers)
+
+        store = store or self.store
+        entry = store.lookup(url.url) if store is not None else None
+        if entry is not None and store.is_fresh(entry):
+            logger.debug('download from store: {}', url.url)
+            store.hit(entry, filename)
+            return True
+        self._check_robots(url.url)
+        if entry is not None:
+            headers = dict(headers, **store.validators(entry))
 
-        sleep = sleep or self.sleep
         try:
-            if sleep:
-                time.sleep(sleep)
-            data = requests.get(url.url, headers=headers)
-            with open(filename, 'wb') as fp:
-                fp.write(data.content)
+            self._pace_download(url, sleep)
+            self.rate_limiter.wait(url)
+            start = perf_counter()
+            data, size = None, None
+            with self.hooks.span('download_file', url=url.url,
+                                 filename=filename) as ctx:
+                if segments > 1:
+                    data, size = self._download_segments(url, filename, headers,
+                                                         segments, store, checksum)
+                if size is None:
+                    data, size = self._download_stream(url, filename, headers,
+                                                       store, entry)
+                if ctx is not None:
+                    ctx['status'] = data.status_code
+                    ctx['bytes'] = size
+            if checksum and not verify_checksum(filename, checksum):
+                raise WebScraperException('checksum mismatch: {}'.format(filename))
+            self.metrics.record(fetch_timing(url, data,
+                                             perf_counter() - start,
+                                             bytes=size))
             return True
+        except WebScraperException:
+            raise
         except:
             raise WebScraperException('download failed')
+
+    def _pace_download(self, url: URL, sleep: float) ->None:
+        """ wait until sleep seconds passed since last paced download. """
+        if not sleep:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._download_due.get(url.hostname, 0.0))
+            self._download_due[url.hostname] = start + sleep
+        if start > now:
+            time.sleep(start - now)
+
+    def _download_stream(self,
+        url: URL,
+        filename: str,
+        headers: dict,
+        store: Optional[DownloadStore],
+        entry: Optional[Any],
+        ) ->tuple:
+        size = 0
+        with self.http.get(url.url, headers=headers, stream=True) as data:
+            if store is None:
+                unlink_shared(filename)
+                with open(filename, 'wb') as fp:
+                    for chunk in data.iter_content(chunk_size=CHUNK_SIZE):
+                        size += len(chunk)
+                        fp.write(chunk)
+            elif entry is not None and data.status_code == 304:
+                store.refresh(entry, data.headers)
+                store.materialize(entry.digest, filename)
+            else:
+                data.raise_for_status()
+                with store.writer() as blob:
+                    for chunk in data.iter_content(chunk_size=CHUNK_SIZE):
+                        blob.write(chunk)
+                    digest = blob.commit()
+                size = blob.size
+                store.record(url.url, digest, size, data.headers)
+                store.materialize(digest, filename)
+        return data, size
+
+    def _download_segments(self,
+        url: URL,
+        filename: str,
+        headers: dict,
+        segments: int,
+        store: Optional[DownloadStore],
+        checksum: Optional[str]=None,
+        ) ->tuple:
+        downloader = SegmentedDownload(self._thread_session,
+                                       segments=segments,
+                                       chunk_size=CHUNK_SIZE)
+        if store is None:
+            size = downloader.download(url.url, filename, headers, checksum)
+            return downloader.response, size
+        with store.writer() as blob:
+            size = downloader.download(url.url, blob.filename, headers, checksum)
+            if size is None:
+                return None, None
+            digest = blob.commit_file()
+        store.record(url.url, digest, size, downloader.response.headers)
+        store.materialize(digest, filename)
+        return downloader.response, size
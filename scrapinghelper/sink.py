@@ -0,0 +1,217 @@
+import os
+import csv
+import json
+import threading
+from pathlib import Path
+from typing import Any, Iterable, Optional, Union
+import pandas as pd
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+SINK_FORMATS = ('csv', 'jsonl', 'parquet')
+_SUFFIXES = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl',
+             '.json': 'jsonl', '.parquet': 'parquet'}
+
+def _fsync_dir(path: Path) ->None:
+    try:
+        fd = os.open(str(path), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class ResultSink(object):
+    def __init__(self,
+        path: Union[str, Path],
+        format: Optional[str]=None,
+        batch_size: int=1000,
+        columns: Optional[list]=None,
+        fsync: bool=True,
+        ):
+        """ Stream extracted rows to file in batches.
+        rows are buffered as column batches and flushed every
+        batch_size rows, so that memory stays bounded and rows already
+        flushed survive a crash of the crawl.
+
+        Parameters
+        ----------
+        path: Union[str, Path]
+            filename for 'csv' and 'jsonl'. rows are appended.
+            directory for 'parquet', each batch is written as
+            a parquet file 'part-NNNNN.parquet' of one row group.
+        format: Optional[str]
+            'csv', 'jsonl' or 'parquet'. default is guessed by suffix.
+        batch_size: int
+            The number of rows to buffer before flush.
+        columns: Optional[list]
+            column names. default is keys of first row.
+            new keys of later rows are appended as columns, but
+            'csv' could not add columns after header was written.
+        fsync: bool
+            if True, fsync files after each flush.
+
+        Examples
+        --------
+        >>> with ResultSink('items.parquet', batch_size=5000) as sink:
+        ...     for response in responses:
+        ...         sink.extend(schema.apply(response.html))
+        >>> df = ResultSink('items.parquet').read()
+        """
+        self.path = Path(path)
+        self.format = format or _SUFFIXES.get(self.path.suffix.lower())
+        if self.format not in SINK_FORMATS:
+            raise ValueError('Unknown format: {}'.format(format or path))
+        if self.format == 'parquet' and pa is None:
+            raise RuntimeError("ResultSink requires pyarrow for 'parquet'.")
+        self.batch_size = max(batch_size, 1)
+        self.fsync = fsync
+        self.columns: list = list(columns or [])
+        self.rows: int = 0
+        self.batches: int = 0
+        self._buffer: dict = { x: [] for x in self.columns }
+        self._buffered: int = 0
+        self._fp: Any = None
+        self._writer: Any = None
+        self._header: bool = False
+        self._schema: Any = None
+        self._lock = threading.RLock()
+        if self.format == 'parquet':
+            self.path.mkdir(parents=True, exist_ok=True)
+            self._part = len(list(self.path.glob('part-*.parquet')))
+
+    def append(self, row: dict) ->None:
+        """ append one row. flushed when batch_size rows are buffered. """
+        with self._lock:
+            for key in row.keys():
+                if key not in self._buffer:
+                    self._add_column(key)
+            for key, values in self._buffer.items():
+                values.append(row.get(key))
+            self._buffered += 1
+            if self._buffered >= self.batch_size:
+                self.flush()
+
+    def extend(self, rows: Iterable[dict]) ->None:
+        """ append rows. """
+        for row in rows:
+            self.append(row)
+
+    def _add_column(self, key: str) ->None:
+        if self._header:
+            raise ValueError('Could not add column after header was written:'
+                             ' {}'.format(key))
+        self.columns.append(key)
+        self._buffer[key] = [None] * self._buffered
+
+    def flush(self) ->None:
+        """ write buffered rows. """
+        with self._lock:
+            if not self._buffered:
+                return
+            getattr(self, '_write_{}'.format(self.format))()
+            self.rows += self._buffered
+            self.batches += 1
+            self._buffer = { x: [] for x in self.columns }
+            self._buffered = 0
+
+    def _sync(self, fp: Any) ->None:
+        fp.flush()
+        if self.fsync:
+            os.fsync(fp.fileno())
+
+    def _open(self) ->Any:
+        if self._fp is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fp = open(self.path, 'a', newline='', encoding='utf8')
+        return self._fp
+
+    def _write_csv(self) ->None:
+        fp = self._open()
+        if self._writer is None:
+            self._writer = csv.writer(fp)
+        if not self._header:
+            if fp.tell() == 0:
+                self._writer.writerow(self.columns)
+            self._header = True
+        self._writer.writerows(zip(*self._buffer.values()))
+        self._sync(fp)
+
+    def _write_jsonl(self) ->None:
+        fp = self._open()
+        columns = list(self._buffer.keys())
+        for values in zip(*self._buffer.values()):
+            fp.write(json.dumps(dict(zip(columns, values)),
+                                ensure_ascii=False, default=str))
+            fp.write('\n')
+        self._sync(fp)
+
+    def _write_parquet(self) ->None:
+        table = pa.Table.from_pydict(self._buffer)
+        if self._schema is not None:
+            # keep types of first batch, fill types of all-null columns.
+            fields = list()
+            for field in table.schema:
+                if field.name in self._schema.names:
+                    known = self._schema.field(field.name)
+                    if not pa.types.is_null(known.type):
+                        field = known
+                fields.append(field)
+            table = table.cast(pa.schema(fields))
+        self._schema = table.schema
+        filename = self.path / 'part-{:05d}.parquet'.format(self._part)
+        tmpfile = filename.with_suffix('.tmp')
+        pq.write_table(table, tmpfile)
+        if self.fsync:
+            with open(tmpfile, 'rb') as fp:
+                os.fsync(fp.fileno())
+        # rename is atomic, a crash never leaves broken part.
+        os.replace(tmpfile, filename)
+        if self.fsync:
+            _fsync_dir(self.path)
+        self._part += 1
+
+    def read(self) ->pd.DataFrame:
+        """ Return all flushed rows as DataFrame. """
+        self.flush()
+        if self.format == 'parquet':
+            files = sorted(self.path.glob('part-*.parquet'))
+            if not files:
+                return pd.DataFrame(columns=self.columns)
+            return pd.concat([ pd.read_parquet(x) for x in files ],
+                             ignore_index=True)
+        if not self.path.exists() or not self.path.stat().st_size:
+            return pd.DataFrame(columns=self.columns)
+        if self.format == 'csv':
+            return pd.read_csv(self.path)
+        return pd.read_json(self.path, lines=True)
+
+    def close(self) ->None:
+        """ flush and close file. """
+        with self._lock:
+            self.flush()
+            if self._fp is not None:
+                self._fp.close()
+                self._fp = None
+                self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args: Any) ->None:
+        self.close()
+
+    def __len__(self) ->int:
+        return self.rows + self._buffered
+
+    def __repr__(self) ->str:
+        return 'ResultSink(path={}, format={}, batch_size={}, rows={})'.format(
+                    self.path, self.format, self.batch_size, len(self))
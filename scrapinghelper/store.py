@@ -0,0 +1,276 @@
+import os
+import re
+import time
+import shutil
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from email.utils import parsedate_to_datetime
+from typing import Any, Mapping, NamedTuple, Optional, Union
+from requests.structures import CaseInsensitiveDict
+from .download import file_digest
+
+_MAX_AGE = re.compile(r'(?:^|,)\s*(?:s-maxage|max-age)\s*=\s*"?(\d+)', re.I)
+_NO_CACHE = re.compile(r'(?:^|,)\s*(?:no-cache|no-store)\b', re.I)
+
+class StoreEntry(NamedTuple):
+    url: str
+    digest: str
+    size: int
+    etag: Optional[str]
+    last_modified: Optional[str]
+    expires: float
+    fetched: float
+
+
+def freshness(headers: Mapping, now: Optional[float]=None) ->float:
+    """ Return epoch seconds until response is fresh.
+    by Cache-Control max-age or Expires header. 0.0 if not cacheable.
+    """
+    now = now or time.time()
+    cache_control = headers.get('Cache-Control') or ''
+    if _NO_CACHE.search(cache_control):
+        return 0.0
+    matched = _MAX_AGE.search(cache_control)
+    if matched:
+        return now + int(matched.group(1))
+    expires = headers.get('Expires')
+    if expires:
+        try:
+            return parsedate_to_datetime(expires).timestamp()
+        except (TypeError, ValueError, IndexError):
+            return 0.0
+    return 0.0
+
+
+class BlobWriter(object):
+    def __init__(self, store: 'DownloadStore'):
+        """ write blob to temporary file while hashing it.
+        use DownloadStore.writer().
+        """
+        self.store = store
+        self.size: int = 0
+        self.digest: Optional[str] = None
+        self._hash = hashlib.new(store.algorithm)
+        fd, self.filename = tempfile.mkstemp(dir=str(store.tmpdir))
+        self._fp = os.fdopen(fd, 'wb')
+
+    def write(self, chunk: bytes) ->None:
+        self._hash.update(chunk)
+        self._fp.write(chunk)
+        self.size += len(chunk)
+
+    def commit(self) ->str:
+        """ move blob into store. Returns digest of content. """
+        self._fp.close()
+        return self._commit(self._hash.hexdigest())
+
+    def commit_file(self) ->str:
+        """ move blob into store, which was written to filename
+        by others than write(). i.e. positional writes.
+        """
+        self._fp.close()
+        self.size = os.path.getsize(self.filename)
+        return self._commit(file_digest(self.filename, self.store.algorithm))
+
+    def _commit(self, digest: str) ->str:
+        self.digest = digest
+        self.store._count('downloads')
+        path = self.store.blob_path(self.digest)
+        if path.exists():
+            # same content is already stored.
+            os.unlink(self.filename)
+            self.store._count('dedup', self.size)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(self.filename, path)
+            # blobs are shared by hardlinks, never written in place.
+            os.chmod(path, 0o444)
+        return self.digest
+
+    def abort(self) ->None:
+        self._fp.close()
+        if os.path.exists(self.filename):
+            os.unlink(self.filename)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type: Any, *args: Any) ->None:
+        if exc_type is not None or self.digest is None:
+            self.abort()
+
+
+class DownloadStore(object):
+    def __init__(self,
+        root: Union[str, Path],
+        algorithm: str='sha256',
+        link: bool=True,
+        ):
+        """ Content-addressed store of downloaded files.
+        blobs are named by hash of content, and index of URL to hash
+        keeps validators of response, so that same bytes are stored
+        once and unchanged URLs are not downloaded again.
+
+        Parameters
+        ----------
+        root: Union[str, Path]
+            directory of store. blobs are 'objects/ab/cdef...',
+            index is 'index.sqlite'.
+        algorithm: str
+            hash algorithm of hashlib.
+        link: bool
+            if True, hardlink blob to filename, copy if link failed.
+            linked files are read-only. download_file() replaces them,
+            others must not write them in place.
+            if False, always copy.
+
+        Examples
+        --------
+        >>> store = DownloadStore('/data/store')
+        >>> sc = Scraper(store=store)
+        >>> sc.download_file('https://example.com/a.csv?v=1', 'a.csv')
+        >>> sc.download_file('https://mirror.example.com/a.csv', 'b.csv')
+        >>> store.stats()
+        {'hits': 0, 'not_modified': 0, 'downloads': 2, 'dedup': 1, 'dedup_bytes': 1024}
+        """
+        self.root = Path(root)
+        self.algorithm = algorithm
+        self.link = link
+        self.tmpdir = self.root / 'tmp'
+        self.tmpdir.mkdir(parents=True, exist_ok=True)
+        (self.root / 'objects').mkdir(exist_ok=True)
+        self._stats: dict = dict(hits=0, not_modified=0, downloads=0,
+                                 dedup=0, dedup_bytes=0)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.root / 'index.sqlite'),
+                                   check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS urls ('
+                ' url TEXT PRIMARY KEY, digest TEXT NOT NULL,'
+                ' size INTEGER, etag TEXT, last_modified TEXT,'
+                ' expires REAL, fetched REAL)')
+
+    def _count(self, key: str, size: int=0) ->None:
+        with self._lock:
+            self._stats[key] += 1
+            if key == 'dedup':
+                self._stats['dedup_bytes'] += size
+
+    def blob_path(self, digest: str) ->Path:
+        return self.root / 'objects' / digest[:2] / digest[2:]
+
+    def lookup(self, url: str) ->Optional[StoreEntry]:
+        """ Return entry of url if its blob exists. """
+        with self._lock:
+            row = self._db.execute(
+                    'SELECT url, digest, size, etag, last_modified,'
+                    ' expires, fetched FROM urls WHERE url = ?',
+                    (url,)).fetchone()
+        if row is None:
+            return None
+        entry = StoreEntry(*row)
+        if not self.blob_path(entry.digest).exists():
+            return None
+        return entry
+
+    @staticmethod
+    def is_fresh(entry: StoreEntry, now: Optional[float]=None) ->bool:
+        return entry.expires > (now or time.time())
+
+    @staticmethod
+    def validators(entry: Optional[StoreEntry]) ->dict:
+        """ Return headers of conditional request for entry. """
+        headers = dict()
+        if entry is None:
+            return headers
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def writer(self) ->BlobWriter:
+        """ Return writer of new blob.
+        Examples
+        --------
+        >>> with store.writer() as blob:
+        ...     for chunk in response.iter_content(65536):
+        ...         blob.write(chunk)
+        ...     digest = blob.commit()
+        """
+        return BlobWriter(self)
+
+    def record(self,
+        url: str,
+        digest: str,
+        size: int,
+        headers: Optional[Mapping]=None,
+        ) ->StoreEntry:
+        """ update index of url with validators of response headers. """
+        headers = CaseInsensitiveDict(headers or dict())
+        now = time.time()
+        entry = StoreEntry(url=url, digest=digest, size=size,
+                           etag=headers.get('ETag'),
+                           last_modified=headers.get('Last-Modified'),
+                           expires=freshness(headers, now), fetched=now)
+        with self._lock, self._db:
+            self._db.execute(
+                'INSERT OR REPLACE INTO urls VALUES (?, ?, ?, ?, ?, ?, ?)',
+                entry)
+        return entry
+
+    def refresh(self, entry: StoreEntry, headers: Mapping) ->StoreEntry:
+        """ update entry by headers of 304 Not Modified response. """
+        self._count('not_modified')
+        merged = CaseInsensitiveDict({ 'ETag': entry.etag,
+                                       'Last-Modified': entry.last_modified })
+        merged.update({ k: v for k, v in headers.items() if v })
+        return self.record(entry.url, entry.digest, entry.size, merged)
+
+    def hit(self, entry: StoreEntry, filename: Union[str, Path]) ->Path:
+        """ materialize fresh entry without request. """
+        self._count('hits')
+        return self.materialize(entry.digest, filename)
+
+    def materialize(self, digest: str, filename: Union[str, Path]) ->Path:
+        """ link or copy blob to filename. """
+        source, filename = self.blob_path(digest), Path(filename)
+        if filename.exists():
+            if filename.samefile(source):
+                return filename
+            filename.unlink()
+        if self.link:
+            try:
+                os.link(source, filename)
+                return filename
+            except OSError:
+                # other filesystem, or links are not supported.
+                pass
+        shutil.copyfile(source, filename)
+        return filename
+
+    def stats(self) ->dict:
+        with self._lock:
+            return dict(self._stats)
+
+    def close(self) ->None:
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args: Any) ->None:
+        self.close()
+
+    def __len__(self) ->int:
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM urls').fetchone()[0]
+
+    def __repr__(self) ->str:
+        return 'DownloadStore(root={}, algorithm={})'.format(
+                    self.root, self.algorithm)
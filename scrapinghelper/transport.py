@@ -0,0 +1,222 @@
+import os
+import ssl
+import zlib
+import asyncio
+import datetime
+from time import perf_counter
+from typing import Any, Optional
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers, select_proxy
+from requests_html import HTMLResponse
+from .encoding import ContentDecoder
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+class AiohttpTransport(object):
+    def __init__(self,
+        limit: int=1000,
+        limit_per_host: int=10,
+        ttl_dns_cache: Optional[int]=300,
+        keepalive_timeout: float=15.0,
+        ):
+        """ Native asyncio transport of AsyncHTMLSession by aiohttp.
+        requests are coroutines instead of threads of executor,
+        and returns HTMLResponse as requests does.
+        connections are pooled per (host, port, ssl, proxy), so that
+        fetches through different proxies do not share connections.
+
+        Parameters
+        ----------
+        limit: int
+            The maximum number of connections of pool.
+        limit_per_host: int
+            The maximum number of connections per host and proxy.
+            0 means no limit.
+        ttl_dns_cache: Optional[int]
+            seconds to cache DNS lookups. None means forever.
+        keepalive_timeout: float
+            seconds to keep idle connections.
+
+        Examples
+        --------
+        >>> transport = AiohttpTransport(limit_per_host=20)
+        >>> sc = Scraper(transport=transport)
+        >>> responses = await asyncio.gather(*[
+        ...                 sc.request_async(url, render=False) for url in urls ])
+        >>> await transport.close()
+        """
+        if aiohttp is None:
+            raise RuntimeError('AiohttpTransport requires aiohttp.')
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.ttl_dns_cache = ttl_dns_cache
+        self.keepalive_timeout = keepalive_timeout
+        self.requests: int = 0
+        # ClientSession is bound to event loop.
+        self._clients: dict = dict()
+        # SSLContext of CA bundles, loading them is not cheap.
+        self._ssl_contexts: dict = dict()
+
+    def client(self) ->'aiohttp.ClientSession':
+        """ Return ClientSession of running event loop. """
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.closed:
+            connector = aiohttp.TCPConnector(
+                            limit=self.limit,
+                            limit_per_host=self.limit_per_host,
+                            ttl_dns_cache=self.ttl_dns_cache,
+                            keepalive_timeout=self.keepalive_timeout)
+            client = aiohttp.ClientSession(
+                            connector=connector,
+                            # cookies are kept by requests session.
+                            cookie_jar=aiohttp.DummyCookieJar(),
+                            # body is decoded by ContentDecoder, which
+                            # supports br and zstd on every aiohttp.
+                            auto_decompress=False)
+            self._clients[loop] = client
+        return client
+
+    async def request(self,
+        session: requests.Session,
+        method: str,
+        url: str,
+        params: Any=None,
+        data: Any=None,
+        headers: Optional[dict]=None,
+        cookies: Any=None,
+        files: Any=None,
+        auth: Any=None,
+        timeout: Any=None,
+        allow_redirects: bool=True,
+        proxies: Optional[dict]=None,
+        hooks: Any=None,
+        stream: Optional[bool]=None,
+        verify: Optional[bool]=None,
+        cert: Any=None,
+        json: Any=None,
+        ) ->HTMLResponse:
+        """ send request of session by aiohttp.
+        arguments are same as requests.Session.request().
+        files, auth, hooks and cert are not supported.
+        SOCKS proxies are not supported, and raise InvalidProxyURL.
+        """
+        if files or auth or cert:
+            raise ValueError('files, auth and cert are not supported by '
+                             'AiohttpTransport.')
+        prepared = session.prepare_request(requests.Request(
+                        method=method.upper(), url=url, headers=headers,
+                        params=params or {}, cookies=cookies,
+                        data=data or {}, json=json))
+        proxies = proxies or dict()
+        proxy = select_proxy(prepared.url, proxies) if proxies else None
+        if proxy and not proxy.startswith(('http://', 'https://')):
+            raise requests.exceptions.InvalidProxyURL(
+                        'Unsupported proxy of AiohttpTransport: {}'.format(proxy),
+                        request=prepared)
+        if isinstance(timeout, tuple):
+            timeout = aiohttp.ClientTimeout(sock_connect=timeout[0],
+                                            sock_read=timeout[1])
+        elif timeout:
+            timeout = aiohttp.ClientTimeout(total=timeout)
+        verify = session.verify if verify is None else verify
+
+        start = perf_counter()
+        self.requests += 1
+        try:
+            async with self.client().request(
+                        prepared.method, prepared.url,
+                        headers=dict(prepared.headers),
+                        data=prepared.body,
+                        allow_redirects=allow_redirects,
+                        proxy=proxy,
+                        timeout=timeout or aiohttp.ClientTimeout(total=None),
+                        ssl=self._ssl(verify)) as resp:
+                content = await resp.read()
+                content, transfer = self._decode(prepared, resp, content)
+                response = self._build(session, prepared, resp, content)
+                response.transfer = transfer
+                response.history = [ self._build(session, prepared, x, b'')
+                                     for x in resp.history ]
+        except asyncio.TimeoutError as e:
+            raise requests.exceptions.Timeout(e, request=prepared)
+        except aiohttp.ClientPayloadError as e:
+            raise requests.exceptions.ChunkedEncodingError(e, request=prepared)
+        except aiohttp.ClientProxyConnectionError as e:
+            raise requests.exceptions.ProxyError(e, request=prepared)
+        except aiohttp.ClientConnectionError as e:
+            raise requests.exceptions.ConnectionError(e, request=prepared)
+        except aiohttp.ClientError as e:
+            raise requests.exceptions.RequestException(e, request=prepared)
+        response.elapsed = datetime.timedelta(seconds=perf_counter() - start)
+        session.cookies.update(response.cookies)
+        return response
+
+    def _ssl(self, verify: Any) ->Any:
+        """ Return ssl argument of aiohttp for verify of requests.
+        verify is bool, or path to CA bundle file or directory.
+        """
+        if not isinstance(verify, (str, os.PathLike)):
+            return None if verify else False
+        path = os.fspath(verify)
+        context = self._ssl_contexts.get(path)
+        if context is None:
+            if os.path.isdir(path):
+                context = ssl.create_default_context(capath=path)
+            else:
+                context = ssl.create_default_context(cafile=path)
+            self._ssl_contexts[path] = context
+        return context
+
+    @staticmethod
+    def _decode(prepared: requests.PreparedRequest,
+                resp: 'aiohttp.ClientResponse',
+                content: bytes) ->tuple:
+        """ Return (content, TransferStats) decoded by Content-Encoding.
+        unknown codings are left as sent, and stats is None.
+        """
+        try:
+            decoder = ContentDecoder(resp.headers.get('Content-Encoding'))
+        except ValueError:
+            return content, None
+        try:
+            content = decoder.decompress(content) + decoder.flush()
+        except (IOError, zlib.error) as e:
+            raise requests.exceptions.ContentDecodingError(e, request=prepared)
+        return content, decoder.stats
+
+    @staticmethod
+    def _build(session: requests.Session,
+               prepared: requests.PreparedRequest,
+               resp: 'aiohttp.ClientResponse',
+               content: bytes) ->HTMLResponse:
+        response = HTMLResponse(session=session)
+        response.status_code = resp.status
+        response.reason = resp.reason
+        response.headers = CaseInsensitiveDict(resp.headers)
+        response.url = str(resp.url)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = content
+        response._content_consumed = True
+        response.request = prepared
+        for key, morsel in resp.cookies.items():
+            response.cookies.set(key, morsel.value, domain=morsel['domain'],
+                                 path=morsel['path'] or '/')
+        return response
+
+    async def close(self) ->None:
+        """ close connection pool of running event loop.
+        pools of other event loops are dropped.
+        """
+        loop = asyncio.get_running_loop()
+        clients, self._clients = self._clients, dict()
+        client = clients.get(loop)
+        if client is not None and not client.closed:
+            await client.close()
+
+    def __repr__(self) ->str:
+        return 'AiohttpTransport(limit={}, limit_per_host={}, requests={})'.format(
+                    self.limit, self.limit_per_host, self.requests)
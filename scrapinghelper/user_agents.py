@@ -53,13 +53,13 @@ class UserAgent(object):
             self.user_agents = df.copy()
 
         self.keep_user_agents = len(self.user_agents)
+        self._user_agent_list = self.user_agents.user_agent.to_list()
         self.user_agent_pool = cycle(self.user_agents.user_agent.to_list())
         self.first_user_agent = next(self.user_agent_pool)
 
     def get_random_user_agent(self) ->str:
-        user_agent = np.random.choice(self.user_agents.user_agent.to_list(),
-                                      replace=True, size=1)
-        return list(user_agent)[0]
+        return self._user_agent_list[
+                    np.random.randint(len(self._user_agent_list))]
 
     def get_next_user_agent(self) ->str:
         return next(self.user_agent_pool)
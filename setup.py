@@ -26,6 +26,8 @@ setup(
     extras_require={
         "socks": ["PySocks>=1.5.6, !=1.5.7"],
         "converter": [ "multimethod>=1.8" ],
+        "parquet": [ "pyarrow" ],
+        "aiohttp": [ "aiohttp>=3.8" ],
     },
     author="Goichi (Iisaka) Yukawa",
     author_email="iisaka51@gmail.com",
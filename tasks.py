@@ -25,3 +25,15 @@ def upload(c):
 def test_upload(c):
     cmd = 'twine upload --repository testpypi dist/*'
     c.run(cmd)
+
+@task
+def bench(c, compare=False):
+    """ run benchmarks and save results as version of scrapinghelper.
+    saved results are in benchmarks/.benchmarks/
+    pass --compare to compare with the last saved results.
+    """
+    from scrapinghelper.versions import __VERSION__
+    cmd = 'cd benchmarks && pytest --benchmark-save={}'.format(__VERSION__)
+    if compare:
+        cmd += ' --benchmark-compare --benchmark-compare-fail=mean:10%'
+    c.run(cmd)
@@ -0,0 +1,45 @@
+import threading
+import functools
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+import pytest
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    """ serve files, or scripted responses of server.routes.
+    server.routes[path] is list of (status, headers, body),
+    consumed one by one for each request.
+    (path, headers) of requests are recorded in server.requests.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.requests.append((self.path, list(self.headers.items())))
+        responses = self.server.routes.get(self.path)
+        if not responses:
+            return super().do_GET()
+        status, headers, body = responses.pop(0)
+        self.send_response(status)
+        for key, val in headers.items():
+            self.send_header(key, val)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def http_server(tmp_path):
+    """ serve files of tmp_path/'www' on localhost with keep-alive. """
+    docroot = tmp_path / 'www'
+    docroot.mkdir()
+    handler = functools.partial(QuietHandler, directory=str(docroot))
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.routes = dict()
+    server.requests = list()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.docroot = docroot
+    server.url = 'http://localhost:{}'.format(server.server_port)
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,196 @@
+import os
+import sys
+import json
+import asyncio
+sys.path.insert(0,"../scrapinghelper")
+
+from scrapinghelper import Scraper, BrowserService, BrowserRecycler, Metrics
+from scrapinghelper import HTML
+from scrapinghelper.browser import ServiceContext, process_rss
+from scrapinghelper.render import RenderLoop
+from scrapinghelper.scraper import AsyncHTMLSession
+
+class LaunchCounter(BrowserService):
+    launched = 0
+
+    def _launch(self):
+        LaunchCounter.launched += 1
+        return 'ws://127.0.0.1:1/devtools/browser/launched'
+
+class FakeContext(object):
+    closed = False
+
+    async def newPage(self):
+        return 'page'
+
+    async def close(self):
+        self.closed = True
+
+    @property
+    def browserContextId(self):
+        return 'context-1'
+
+class FakeBrowser(object):
+    disconnected = False
+
+    async def disconnect(self):
+        self.disconnected = True
+
+class FakeProcess(object):
+    pid = os.getpid()
+
+class SlowPage(object):
+    async def goto(self, url, options=None):
+        await asyncio.sleep(0.05)
+
+    async def content(self):
+        return '<html><body>rendered</body></html>'
+
+    async def close(self):
+        pass
+
+class RenderBrowser(object):
+    process = FakeProcess()
+
+    def __init__(self):
+        self.closed = False
+        self.renders = 0
+
+    async def newPage(self):
+        assert not self.closed
+        self.renders += 1
+        return SlowPage()
+
+    async def close(self):
+        self.closed = True
+
+class FakeSession(AsyncHTMLSession):
+    @property
+    async def browser(self):
+        if not hasattr(self, '_browser'):
+            self._browser = RenderBrowser()
+            self.browsers.append(self._browser)
+        return self._browser
+
+class FakeRenderLoop(RenderLoop):
+    def _new_session(self, proxy_server):
+        session = FakeSession(loop=self._loop)
+        session.browsers = list()
+        self.created.append(session)
+        return session
+
+
+class TestClass:
+    def test_is_alive(self, http_server):
+        endpoint = 'ws://{}/devtools/browser/abc'.format(
+                        http_server.url.split('://')[1])
+        version = json.dumps({'webSocketDebuggerUrl': endpoint}).encode()
+        http_server.routes['/json/version'] = [(200, {}, version)]
+        assert BrowserService.is_alive(endpoint)
+        assert not BrowserService.is_alive('ws://127.0.0.1:9/devtools/browser/x')
+        assert not BrowserService.is_alive(None)
+
+    def test_attach_from_endpoint_file(self, http_server, tmp_path):
+        endpoint = 'ws://{}/devtools/browser/abc'.format(
+                        http_server.url.split('://')[1])
+        version = json.dumps({'webSocketDebuggerUrl': endpoint}).encode()
+        http_server.routes['/json/version'] = [(200, {}, version)]
+        path = tmp_path / 'browser.ws'
+        path.write_text(endpoint)
+        LaunchCounter.launched = 0
+        service = LaunchCounter(endpoint_file=path)
+        assert service.start() == endpoint
+        assert LaunchCounter.launched == 0
+
+    def test_launch_when_endpoint_is_dead(self, tmp_path):
+        path = tmp_path / 'browser.ws'
+        path.write_text('ws://127.0.0.1:9/devtools/browser/dead')
+        LaunchCounter.launched = 0
+        service = LaunchCounter(endpoint_file=path)
+        endpoint = service.start()
+        assert endpoint.endswith('/launched')
+        assert path.read_text() == endpoint
+        assert LaunchCounter.launched == 1
+
+    def test_service_context_close(self):
+        browser, context = FakeBrowser(), FakeContext()
+        service_context = ServiceContext(browser, context)
+        assert asyncio.run(service_context.newPage()) == 'page'
+        assert service_context.browserContextId == 'context-1'
+        asyncio.run(service_context.close())
+        assert context.closed
+        assert browser.disconnected
+
+    def test_scraper_passes_service(self):
+        service = BrowserService(endpoint='ws://127.0.0.1:9/devtools/browser/x')
+        sc = Scraper(sleep=0, browser_service=service)
+        assert sc.render_loop.browser_service is service
+        sc.close()
+
+    def test_process_rss(self):
+        assert process_rss(os.getpid()) > 0
+
+    def test_recycler_due(self):
+        recycler = BrowserRecycler(max_renders=3, max_rss=0)
+        browser = RenderBrowser()
+        for _ in range(3):
+            assert not recycler.due(browser)
+            recycler.count(browser)
+        assert recycler.due(browser)
+
+        recycler = BrowserRecycler(max_renders=0, max_rss=1, check_every=2)
+        recycler.count(browser)
+        assert not recycler.due(browser)
+        recycler.count(browser)
+        assert recycler.due(browser)
+        assert recycler.rss > 1
+
+    def test_recycle_keeps_inflight_renders(self):
+        metrics = Metrics()
+        recycler = BrowserRecycler(max_renders=2, metrics=metrics)
+
+        async def run():
+            session = FakeSession(browser_recycler=recycler)
+            session.browsers = list()
+            htmls = [ HTML(html='<html></html>', url='https://example.com/')
+                      for _ in range(5) ]
+            await asyncio.gather(*[ session.arender(x, wait=0, sleep=0)
+                                    for x in htmls ])
+            # retired browsers are closed after their renders finished.
+            assert [ x.closed for x in session.browsers ] == [True, True, False]
+            await session.close()
+            return session, htmls
+
+        session, htmls = asyncio.run(run())
+        assert [ x.renders for x in session.browsers ] == [2, 2, 1]
+        assert all( x.find('body', first=True).text == 'rendered'
+                    for x in htmls )
+        assert recycler.restarts == 2
+        assert metrics.summary()['values']['browser_restarts_total'] == 2
+        assert 'scrapinghelper_browser_restarts_total 2' in metrics.to_prometheus()
+
+    def test_scraper_recycler_metrics(self):
+        sc = Scraper(sleep=0)
+        assert sc.browser_recycler.metrics is sc.metrics
+        assert sc.render_loop.browser_recycler is sc.browser_recycler
+        sc.close()
+
+    def test_render_loop_bounds_browsers(self):
+        loop = FakeRenderLoop(max_browsers=2)
+        loop.created = list()
+        try:
+            proxies = [ 'http://proxy{}:8080'.format(x) for x in range(5) ]
+            for proxy in proxies:
+                html = HTML(html='<html></html>', url='https://example.com/')
+                loop.render(html, proxy_server=proxy, wait=0, sleep=0)
+                assert html.find('body', first=True).text == 'rendered'
+            sessions = dict(loop._sessions)
+            assert list(sessions) == proxies[-2:]
+            assert loop.evicted == 3
+            assert [ x.browsers[0].closed for x in loop.created ] == [
+                        True, True, True, False, False]
+            assert not loop._active
+            assert all( not x.browsers[0].closed for x in sessions.values() )
+        finally:
+            loop.close()
+        assert all( x.browsers[0].closed for x in sessions.values() )
@@ -0,0 +1,179 @@
+import sys
+import time
+import requests
+from urllib3.connection import HTTPConnection
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+sys.path.insert(0,"../scrapinghelper")
+
+from scrapinghelper import Scraper, DNSCache, ProxyRotate
+from scrapinghelper import connection
+from scrapinghelper.connection import (
+    PooledAdapter, mount_adapter, unmount_adapter
+)
+
+class FailingConnection(HTTPConnection):
+    """ first connect fails with error, then connects to nothing. """
+    error = None
+
+    def _new_conn(self):
+        self.hosts.append(self._dns_host)
+        if len(self.hosts) == 1:
+            raise self.error
+        return 'socket'
+
+class TimedFailingConnection(connection._TimedConnectionMixin,
+                             FailingConnection):
+    pass
+
+class TestClass:
+    def test_download_file_reuse_connection(self, http_server, tmp_path):
+        for n in range(3):
+            (http_server.docroot / f'file{n}.txt').write_text(f'data{n}')
+
+        s = Scraper(sleep=0)
+        for n in range(3):
+            filename = tmp_path / f'out{n}.txt'
+            assert s.download_file(f'{http_server.url}/file{n}.txt',
+                                   filename=str(filename)) == True
+            assert filename.read_text() == f'data{n}'
+
+        stats = s.connection_stats()
+        key = 'http://localhost:{}'.format(http_server.server_port)
+        assert stats[key]['connections'] == 1
+        assert stats[key]['requests'] == 3
+        assert stats[key]['reused'] == 2
+        s.close()
+
+    def test_unmount_adapter_keeps_pool(self, http_server):
+        (http_server.docroot / 'index.html').write_text('hello')
+        adapter = PooledAdapter()
+        for _ in range(2):
+            session = mount_adapter(requests.Session(), adapter)
+            assert session.get(http_server.url + '/index.html').text == 'hello'
+            unmount_adapter(session, adapter)
+            session.close()
+
+        stats = list(adapter.stats().values())[0]
+        assert stats['connections'] == 1
+        assert stats['reused'] == 1
+
+    def test_keep_alive_disabled(self, http_server):
+        (http_server.docroot / 'index.html').write_text('hello')
+        adapter = PooledAdapter(keep_alive=False)
+        session = mount_adapter(requests.Session(), adapter)
+        response = session.get(http_server.url + '/index.html')
+        assert response.request.headers['Connection'] == 'close'
+
+    def test_dns_cache(self, http_server):
+        (http_server.docroot / 'index.html').write_text('hello')
+        cache = DNSCache(ttl=60)
+        adapter = PooledAdapter(keep_alive=False, dns_cache=cache)
+        session = mount_adapter(requests.Session(), adapter)
+        for _ in range(3):
+            response = session.get(http_server.url + '/index.html')
+            assert response.text == 'hello'
+        assert cache.misses == 1
+        assert cache.hits == 2
+        cache.invalidate('localhost')
+        assert len(cache) == 0
+
+    def test_dns_cache_skip_ip(self):
+        cache = DNSCache()
+        assert cache.resolve('127.0.0.1', 80)[0][4][0] == '127.0.0.1'
+        assert len(cache) == 0
+
+    def test_prewarm(self, http_server):
+        (http_server.docroot / 'index.html').write_text('hello')
+        s = Scraper(sleep=0, dns_cache=DNSCache())
+        result = s.prewarm([http_server.url, 'http://127.0.0.1:9/'],
+                           connections=2, timeout=1)
+        assert result[http_server.url] == 2
+        assert isinstance(result['http://127.0.0.1:9/'], Exception)
+        for _ in range(2):
+            assert s.request(http_server.url + '/index.html',
+                             render=False).text == 'hello'
+        key = 'http://localhost:{}'.format(http_server.server_port)
+        stats = s.connection_stats()[key]
+        assert stats['connections'] == 2
+        assert stats['requests'] == 2
+        assert stats['idle'] >= 2
+        # idle connections are not opened again.
+        assert s.prewarm([http_server.url], connections=3)[http_server.url] == 1
+        assert s.connection_stats()[key]['connections'] == 3
+        s.close()
+
+    def test_proxy_pools_lru(self, http_server):
+        # the server works as forward proxy, path is absolute URL.
+        http_server.routes['http://www.example.com/index.html'] = [
+            (200, {}, b'hello') for _ in range(3) ]
+        port = http_server.server_port
+        proxies = [ 'http://127.0.0.1:{}'.format(port),
+                    'http://localhost:{}'.format(port) ]
+        adapter = PooledAdapter(max_proxies=1)
+        session = mount_adapter(requests.Session(), adapter)
+        for proxy in proxies + proxies[:1]:
+            response = session.get('http://www.example.com/index.html',
+                                   proxies={'http': proxy})
+            assert response.text == 'hello'
+        assert list(adapter.proxy_manager.keys()) == proxies[:1]
+        assert adapter.proxy_evictions == 2
+
+    def test_proxy_pools_idle(self, http_server):
+        http_server.routes['http://www.example.com/index.html'] = [
+            (200, {}, b'hello') ]
+        proxy = 'http://127.0.0.1:{}'.format(http_server.server_port)
+        adapter = PooledAdapter(proxy_idle_timeout=0.01)
+        session = mount_adapter(requests.Session(), adapter)
+        response = session.get('http://www.example.com/index.html',
+                               proxies={'http': proxy})
+        assert response.text == 'hello'
+        time.sleep(0.02)
+        assert adapter.evict_idle_proxies() == 1
+        assert not adapter.proxy_manager
+
+    def test_rotation_keeps_session(self, http_server):
+        http_server.routes['http://www.example.com/index.html'] = [
+            (200, {}, b'hello') for _ in range(4) ]
+        port = http_server.server_port
+        proxies = [ 'http://127.0.0.1:{}'.format(port),
+                    'http://localhost:{}'.format(port) ]
+        s = Scraper(sleep=0, proxies=proxies)
+        session = None
+        for _ in range(4):
+            response = s.request('http://www.example.com/index.html',
+                                 proxy_rotate=ProxyRotate.NEXT, render=False)
+            assert response.text == 'hello'
+            session = session or s.session
+            assert s.session is session
+        stats = s.connection_stats()
+        assert len(stats) == 2
+        for value in stats.values():
+            assert value['connections'] == 1
+            assert value['reused'] == 1
+        s.close()
+
+    def test_connect_fallback(self):
+        cache = DNSCache(ttl=60)
+        connection._local.dns_cache = cache
+        try:
+            conn = TimedFailingConnection('localhost', 80)
+            conn.hosts = list()
+            conn.error = NewConnectionError(conn, 'refused')
+            # stale address, then all addresses of host.
+            assert conn._new_conn() == 'socket'
+            assert conn.hosts[1] == 'localhost'
+
+            conn = TimedFailingConnection('localhost', 80)
+            conn.hosts = list()
+            conn.error = ConnectTimeoutError(conn, 'timed out')
+            try:
+                conn._new_conn()
+            except ConnectTimeoutError:
+                pass
+            else:
+                assert False, 'timeout must not be waited twice'
+            assert len(conn.hosts) == 1
+            assert len(cache) == 0
+        finally:
+            connection._local.dns_cache = None
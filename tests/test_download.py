@@ -0,0 +1,167 @@
+import re
+import sys
+import gzip
+import hashlib
+import threading
+sys.path.insert(0,"../scrapinghelper")
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import pytest
+from scrapinghelper import Scraper, DownloadStore, WebScraperException
+from scrapinghelper.download import SegmentedDownload, split_segments
+
+DATA = bytes(range(256)) * 4096        # 1MiB
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """ serve DATA with byte ranges.
+    server.broken is the number of range responses to cut off.
+    ranges starting at server.failing offsets, except the probe,
+    are answered with 503.
+    if server.compress, ranges are gzipped when client accepts it.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        matched = re.match(r'bytes=(\d+)-(\d+)', self.headers.get('Range', ''))
+        if not self.server.ranges or not matched:
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(DATA)))
+            self.end_headers()
+            self.wfile.write(DATA)
+            return
+        start, end = int(matched.group(1)), int(matched.group(2))
+        if start in self.server.failing and end > 0:
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = DATA[start:end + 1]
+        accept = self.headers.get('Accept-Encoding', '')
+        compress = self.server.compress and 'gzip' in accept
+        if compress:
+            body = gzip.compress(body)
+        with self.server.lock:
+            self.server.requests.append((start, end))
+            self.server.encodings.append(accept)
+            broken = self.server.broken > 0 and end > 0
+            if broken:
+                self.server.broken -= 1
+        self.send_response(206)
+        self.send_header('Content-Range',
+                         'bytes {}-{}/{}'.format(start, end, len(DATA)))
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', '"v1"')
+        if compress:
+            self.send_header('Content-Encoding', 'gzip')
+        self.end_headers()
+        if broken:
+            # send half of range and drop connection.
+            self.wfile.write(body[:len(body) // 2])
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def range_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), RangeHandler)
+    server.ranges = True
+    server.broken = 0
+    server.compress = False
+    server.failing = set()
+    server.requests = list()
+    server.encodings = list()
+    server.lock = threading.Lock()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = 'http://localhost:{}/data.bin'.format(server.server_port)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestClass:
+    def test_split_segments(self):
+        segments = split_segments(100, 4, min_size=10)
+        assert [ (x.start, x.end) for x in segments ] == [
+                    (0, 24), (25, 49), (50, 74), (75, 99)]
+        assert len(split_segments(100, 4, min_size=60)) == 1
+        assert split_segments(0, 4) == []
+
+    def test_segmented_download(self, range_server, tmp_path):
+        filename = tmp_path / 'data.bin'
+        checksum = 'sha256:' + hashlib.sha256(DATA).hexdigest()
+        with Scraper(sleep=0) as sc:
+            assert sc.download_file(range_server.url, str(filename),
+                                    segments=4, checksum=checksum)
+        assert filename.read_bytes() == DATA
+        # probe and one segment, 1MiB is less than MIN_SEGMENT_SIZE.
+        assert range_server.requests == [(0, 0), (0, len(DATA) - 1)]
+
+    def test_segments_not_encoded(self, range_server, tmp_path):
+        range_server.compress = True
+        filename = tmp_path / 'data.bin'
+        with Scraper(sleep=0) as sc:
+            downloader = SegmentedDownload(lambda: sc.http, segments=4,
+                                           min_segment_size=1024)
+            assert downloader.download(range_server.url, filename) == len(DATA)
+        assert filename.read_bytes() == DATA
+        assert set(range_server.encodings) == {'identity'}
+
+    def test_segment_retry(self, range_server, tmp_path):
+        range_server.broken = 2
+        filename = tmp_path / 'data.bin'
+        with Scraper(sleep=0) as sc:
+            downloader = SegmentedDownload(sc._thread_session, segments=4,
+                                           backoff=0, min_segment_size=1024)
+            assert downloader.download(range_server.url, filename) == len(DATA)
+        assert filename.read_bytes() == DATA
+        assert downloader.retried == 2
+        # probe, 4 segments and 2 retries from where they stopped.
+        assert len(range_server.requests) == 7
+
+    def test_failed_segment_leaves_no_file(self, range_server, tmp_path):
+        range_server.failing = {len(DATA) // 2}
+        filename = tmp_path / 'data.bin'
+        with Scraper(sleep=0) as sc:
+            downloader = SegmentedDownload(sc._thread_session, segments=4,
+                                           retries=2, backoff=0,
+                                           min_segment_size=1024)
+            with pytest.raises(Exception):
+                downloader.download(range_server.url, filename)
+        assert downloader.retried == 2
+        assert list(tmp_path.iterdir()) == []
+
+        # file of last download is kept as it was.
+        range_server.failing = {0}
+        filename.write_bytes(b'old')
+        with Scraper(sleep=0) as sc:
+            with pytest.raises(WebScraperException):
+                sc.download_file(range_server.url, str(filename), segments=4)
+        assert filename.read_bytes() == b'old'
+        assert list(tmp_path.iterdir()) == [filename]
+
+    def test_fallback_single_stream(self, range_server, tmp_path):
+        range_server.ranges = False
+        filename = tmp_path / 'data.bin'
+        with Scraper(sleep=0) as sc:
+            assert sc.download_file(range_server.url, str(filename), segments=4)
+        assert filename.read_bytes() == DATA
+
+    def test_checksum_mismatch(self, range_server, tmp_path):
+        with Scraper(sleep=0) as sc:
+            with pytest.raises(WebScraperException):
+                sc.download_file(range_server.url, str(tmp_path / 'data.bin'),
+                                 segments=2, checksum='sha256:00')
+        assert list(tmp_path.iterdir()) == []
+
+    def test_segmented_store(self, range_server, tmp_path):
+        store = DownloadStore(tmp_path / 'store')
+        with Scraper(sleep=0, store=store) as sc:
+            assert sc.download_file(range_server.url, str(tmp_path / 'a.bin'),
+                                    segments=4)
+        assert (tmp_path / 'a.bin').read_bytes() == DATA
+        assert store.lookup(range_server.url).digest == hashlib.sha256(DATA).hexdigest()
+        assert store.lookup(range_server.url).etag == '"v1"'
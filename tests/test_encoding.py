@@ -0,0 +1,81 @@
+import sys
+import gzip
+sys.path.insert(0,"../scrapinghelper")
+
+import brotli
+import zstandard
+import pytest
+import requests
+from scrapinghelper import Scraper
+from scrapinghelper.encoding import ContentDecoder, ACCEPT_ENCODING
+
+BODY = b'<html><body>' + b'<p>scrapinghelper</p>' * 2000 + b'</body></html>'
+
+ENCODERS = {
+    'gzip': gzip.compress,
+    'br': brotli.compress,
+    'zstd': lambda x: zstandard.ZstdCompressor().compress(x),
+}
+
+class TestClass:
+    @pytest.mark.parametrize('encoding', ['gzip', 'br', 'zstd', 'gzip, br'])
+    def test_decoder(self, encoding):
+        data = BODY
+        for x in encoding.split(', '):
+            data = ENCODERS[x](data)
+        decoder = ContentDecoder(encoding)
+        # feed in small chunks.
+        decoded = b''.join( decoder.decompress(data[i:i + 100])
+                            for i in range(0, len(data), 100) )
+        decoded += decoder.flush()
+        assert decoded == BODY
+        assert decoder.stats.compressed == len(data)
+        assert decoder.stats.decompressed == len(BODY)
+        assert decoder.stats.saved == len(BODY) - len(data)
+
+    def test_zstd_frames(self):
+        compressor = zstandard.ZstdCompressor()
+        data = compressor.compress(BODY) + compressor.compress(BODY)
+        decoder = ContentDecoder('zstd')
+        assert decoder.decompress(data) == BODY * 2
+
+    def test_unsupported(self):
+        with pytest.raises(ValueError):
+            ContentDecoder('compress')
+
+    @pytest.mark.parametrize('encoding', ['br', 'zstd'])
+    def test_request(self, http_server, encoding):
+        data = ENCODERS[encoding](BODY)
+        http_server.routes['/page.html'] = [
+            (200, {'Content-Encoding': encoding}, data),
+        ]
+        with Scraper(sleep=0) as sc:
+            assert sc.headers['Accept-Encoding'] == ACCEPT_ENCODING
+            response = sc.request(http_server.url + '/page.html', render=False)
+            assert response.content == BODY
+            assert response.transfer.compressed == len(data)
+            assert response.transfer.decompressed == len(BODY)
+            host = sc.metrics.summary()['host']['localhost']
+            assert host['bytes'] == len(BODY)
+            assert host['wire_bytes'] == len(data)
+
+    def test_download_file(self, http_server, tmp_path):
+        data = ENCODERS['zstd'](BODY)
+        http_server.routes['/page.html'] = [
+            (200, {'Content-Encoding': 'zstd'}, data),
+        ]
+        filename = tmp_path / 'page.html'
+        with Scraper(sleep=0) as sc:
+            assert sc.download_file(http_server.url + '/page.html', str(filename))
+            timing = sc.metrics.records[-1]
+        assert filename.read_bytes() == BODY
+        assert timing.bytes == len(BODY)
+        assert timing.wire_bytes == len(data)
+
+    def test_broken_body(self, http_server):
+        http_server.routes['/page.html'] = [
+            (200, {'Content-Encoding': 'br'}, b'not brotli'),
+        ]
+        with Scraper(sleep=0) as sc:
+            with pytest.raises(requests.exceptions.ContentDecodingError):
+                sc.http.get(http_server.url + '/page.html')
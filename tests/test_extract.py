@@ -0,0 +1,67 @@
+import sys
+import pickle
+
+sys.path.insert(0,"../scrapinghelper")
+
+from scrapinghelper import ExtractionSchema, Field, HTML
+from pprint import pprint
+
+test_page = """
+<html><body>
+  <h1>Products</h1>
+  <div class="item">
+    <a class="name" href="/p/1">Apple</a><span class="price">100</span>
+    <span class="tag">red</span><span class="tag">fruit</span>
+  </div>
+  <div class="item">
+    <a class="name" href="/p/2">Banana</a><span class="price">200</span>
+  </div>
+</body></html>
+"""
+
+class TestClass:
+    def test_schema_document(self):
+        schema = ExtractionSchema({
+                    'title': 'h1',
+                    'first': ('a.name', 'href'),
+                    'names': Field('', 'a.name', many=True),
+                 })
+        expect = [{'title': 'Products',
+                   'first': '/p/1',
+                   'names': ['Apple', 'Banana']}]
+        assert schema.apply(test_page) == expect
+
+    def test_schema_rows(self):
+        schema = ExtractionSchema({
+                    'name': 'a.name',
+                    'link': ('a.name', 'href'),
+                    'price': ('span.price', None, int),
+                    'tags': Field('', 'span.tag', many=True),
+                 }, root='div.item')
+        expect = [
+            {'name': 'Apple', 'link': '/p/1', 'price': 100,
+             'tags': ['red', 'fruit']},
+            {'name': 'Banana', 'link': '/p/2', 'price': 200, 'tags': []},
+        ]
+        assert schema.apply(test_page.encode()) == expect
+
+    def test_schema_with_html_object(self):
+        schema = ExtractionSchema({'title': 'h1', 'missing': 'table'})
+        html = HTML(html=test_page)
+        assert schema.apply(html) == [{'title': 'Products', 'missing': None}]
+
+    def test_schema_xpath_field(self):
+        schema = ExtractionSchema([
+                    Field('links', '//a/@href', many=True, xpath=True)])
+        assert schema.apply(test_page) == [{'links': ['/p/1', '/p/2']}]
+
+    def test_schema_dataframe(self):
+        schema = ExtractionSchema({'name': 'a.name'}, root='div.item')
+        df = schema.to_dataframe([test_page] * 3)
+        assert df.columns.tolist() == ['name']
+        assert len(df) == 6
+
+    def test_schema_pickle(self):
+        schema = ExtractionSchema({'title': 'h1'})
+        restored = pickle.loads(pickle.dumps(schema))
+        assert restored.apply(test_page) == [{'title': 'Products'}]
@@ -0,0 +1,117 @@
+import sys
+import asyncio
+sys.path.insert(0,"../scrapinghelper")
+
+import pytest
+from scrapinghelper import Scraper, HeaderProfiles
+from scrapinghelper.headers import parse_user_agent
+
+CHROME = ( 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+           '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36' )
+EDGE = CHROME + ' Edg/120.0.2210.91'
+OLD_CHROME = ( 'Mozilla/5.0 (Linux; Android 9; SM-G973F) AppleWebKit/537.36 '
+               '(KHTML, like Gecko) Chrome/77.0.3865.92 Mobile Safari/537.36' )
+FIREFOX = ( 'Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:120.0) '
+            'Gecko/20100101 Firefox/120.0' )
+SAFARI = ( 'Mozilla/5.0 (iPhone; CPU iPhone OS 16_5 like Mac OS X) '
+           'AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.5 '
+           'Mobile/15E148 Safari/604.1' )
+
+class TestClass:
+    @pytest.mark.parametrize('user_agent, expected', [
+        (CHROME, ('chrome', 120, 120, 'Windows', False)),
+        (EDGE, ('edge', 120, 120, 'Windows', False)),
+        (OLD_CHROME, ('chrome', 77, 77, 'Android', True)),
+        (FIREFOX, ('firefox', 120, 0, 'Linux', False)),
+        (SAFARI, ('safari', 16, 0, 'iOS', True)),
+        ('Hello, world', ('other', 0, 0, '', False)),
+    ])
+    def test_parse_user_agent(self, user_agent, expected):
+        assert tuple(parse_user_agent(user_agent)) == expected
+
+    def test_profiles(self):
+        profiles = HeaderProfiles(accept_encoding=None)
+        chrome = profiles.get(CHROME)
+        assert profiles.get(CHROME) is chrome
+        assert len(profiles) == 1
+        assert chrome['User-Agent'] == CHROME
+        assert chrome['sec-ch-ua-platform'] == '"Windows"'
+        assert '"Google Chrome";v="120"' in chrome['sec-ch-ua']
+        assert chrome['Accept-Encoding'] == 'gzip, deflate, br'
+        assert list(chrome)[:3] == ['Connection', 'sec-ch-ua', 'sec-ch-ua-mobile']
+        with pytest.raises(TypeError):
+            chrome['User-Agent'] = 'x'
+
+        assert '"Microsoft Edge";v="120"' in profiles.get(EDGE)['sec-ch-ua']
+        old = profiles.get(OLD_CHROME)
+        assert 'sec-ch-ua' not in old
+        assert old['Sec-Fetch-Mode'] == 'navigate'
+        firefox = profiles.get(FIREFOX)
+        assert list(firefox)[0] == 'User-Agent'
+        assert not any(x.startswith('sec-ch') for x in firefox)
+        assert 'Sec-Fetch-Dest' in profiles.get(SAFARI)
+
+        profiles = HeaderProfiles(accept_language='ja')
+        profiles.prepare([CHROME, FIREFOX])
+        assert len(profiles) == 2 and FIREFOX in profiles
+        assert profiles.get(FIREFOX)['Accept-Language'] == 'ja'
+        assert profiles.get(FIREFOX)['Accept-Encoding'] == 'gzip, deflate, br, zstd'
+
+    def test_request(self, http_server):
+        (http_server.docroot / 'index.html').write_text('<html></html>')
+        url = http_server.url + '/index.html'
+        with Scraper(sleep=0) as sc:
+            sc.request(url, render=False, user_agent=CHROME)
+            sc.request(url, render=False, user_agent=FIREFOX)
+            sc.request(url, render=False, user_agent='random')
+        sent = [ dict(x[1]) for x in http_server.requests ]
+        assert sent[0]['User-Agent'] == CHROME
+        assert sent[0]['sec-ch-ua'] == sc.header_profiles.get(CHROME)['sec-ch-ua']
+        assert sent[1]['User-Agent'] == FIREFOX
+        # no header of other user agent is left.
+        assert 'sec-ch-ua' not in sent[1]
+        names = [ k for k, v in http_server.requests[1][1] if k != 'Host' ]
+        assert names == list(sc.header_profiles.get(FIREFOX))
+        assert sent[2]['User-Agent'] in sc.user_agent.user_agents.user_agent.to_list()
+
+    def test_fetch(self, http_server):
+        (http_server.docroot / 'index.html').write_text('<html></html>')
+        url = http_server.url + '/index.html'
+        with Scraper(sleep=0) as sc:
+            sc.fetch(url, user_agent=FIREFOX, headers={'X-Test': '1'})
+            sc.fetch(url)
+        sent = [ dict(x[1]) for x in http_server.requests ]
+        assert sent[0]['User-Agent'] == FIREFOX
+        assert sent[0]['X-Test'] == '1'
+        assert sent[1]['User-Agent'] == sc.headers['User-Agent']
+        assert 'X-Test' not in sent[1]
+
+    def test_custom_headers(self, http_server):
+        (http_server.docroot / 'index.html').write_text('<html></html>')
+        url = http_server.url + '/index.html'
+        with Scraper(sleep=0, headers={'X-Test': '1'}) as sc:
+            sc.request(url, render=False, user_agent=FIREFOX)
+        sent = dict(http_server.requests[0][1])
+        assert sent['X-Test'] == '1'
+        assert sent['User-Agent'] == FIREFOX
+        assert 'Sec-Fetch-Mode' not in sent
+
+    def test_request_async(self, http_server, tmp_path):
+        (http_server.docroot / 'index.html').write_text('<html></html>')
+        url = http_server.url + '/index.html'
+
+        async def run(sc):
+            return await asyncio.gather(
+                    sc.request_async(url, render=False, user_agent=CHROME),
+                    sc.request_async(url, render=False, user_agent=FIREFOX))
+
+        with Scraper(sleep=0) as sc:
+            asyncio.run(run(sc))
+            sc.download_file(url, str(tmp_path / 'index.html'),
+                             user_agent=FIREFOX)
+        sent = sorted(( dict(x[1]) for x in http_server.requests ),
+                      key=lambda x: x['User-Agent'] == FIREFOX)
+        assert sent[0]['User-Agent'] == CHROME and 'sec-ch-ua' in sent[0]
+        for headers in sent[1:]:
+            assert headers['User-Agent'] == FIREFOX
+            assert 'sec-ch-ua' not in headers
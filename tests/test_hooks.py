@@ -0,0 +1,72 @@
+import sys
+import json
+import pytest
+
+sys.path.insert(0,"../scrapinghelper")
+
+from scrapinghelper import Scraper, HookRegistry, ChromeTraceHook, HTML
+
+test_page = '<html><body><a href="/a.txt">A</a><p>text</p></body></html>'
+
+class TestClass:
+    def test_null_span(self):
+        hooks = HookRegistry()
+        assert not hooks
+        with hooks.span('fetch', url='http://example.com/') as ctx:
+            assert ctx is None
+        assert hooks.span('fetch') is hooks.span('render')
+
+    def test_register_and_unregister(self):
+        hooks = HookRegistry()
+        events = list()
+        handle = hooks.register(start=lambda ctx: events.append(('start', ctx['stage'])),
+                                end=lambda ctx: events.append(('end', ctx['stage'], ctx['status'])),
+                                stages=['fetch'])
+        with hooks.span('fetch', url='http://example.com/') as ctx:
+            ctx['status'] = 200
+        with hooks.span('render') as ctx:
+            assert ctx is None
+        assert events == [('start', 'fetch'), ('end', 'fetch', 200)]
+        hooks.unregister(handle)
+        assert not hooks
+
+    def test_unknown_stage(self):
+        with pytest.raises(ValueError):
+            HookRegistry().register(end=print, stages=['unknown'])
+
+    def test_error_context(self):
+        hooks = HookRegistry()
+        errors = list()
+        hooks.register(end=lambda ctx: errors.append(ctx['error']))
+        with pytest.raises(KeyError):
+            with hooks.span('fetch'):
+                raise KeyError('x')
+        assert isinstance(errors[0], KeyError)
+
+    def test_scraper_stages(self, http_server):
+        (http_server.docroot / 'index.html').write_text(test_page)
+        hooks = HookRegistry()
+        stages = list()
+        hooks.register(end=lambda ctx: stages.append(ctx['stage']))
+        s = Scraper(sleep=0, hooks=hooks)
+        s.request(http_server.url + '/index.html', render=False)
+        s.get_texts('p')
+        s.get_links()
+        s.download_file(http_server.url + '/index.html',
+                        filename=str(http_server.docroot / 'copy.html'))
+        assert stages == ['fetch', 'get_texts', 'get_links', 'download_file']
+        s.close()
+
+    def test_chrome_trace(self, tmp_path):
+        path = tmp_path / 'trace.json'
+        hooks = HookRegistry()
+        s = Scraper(sleep=0, hooks=hooks)
+        with ChromeTraceHook(path) as trace:
+            hooks.register(trace)
+            s.get_links(html=HTML(html=test_page))
+        events = json.loads(path.read_text())['traceEvents']
+        spans = [ x for x in events if x['ph'] == 'X' ]
+        assert len(spans) == 1
+        assert spans[0]['name'] == 'get_links'
+        assert spans[0]['dur'] >= 0
+        assert spans[0]['args']['selector'] == 'a'
@@ -0,0 +1,55 @@
+import ipaddress
+import sys
+sys.path.insert(0,"../scrapinghelper")
+
+import numpy as np
+import pytest
+from scrapinghelper import Scraper, random_ips
+
+class TestClass:
+    def test_random_ipv4(self):
+        ips = random_ips(10000, rng=np.random.default_rng(1))
+        assert ips.shape == (10000,)
+        addresses = [ ipaddress.IPv4Address(x) for x in ips ]
+        assert all(x.is_global for x in addresses)
+        assert len(set(addresses)) > 9900
+
+    def test_random_ipv6(self):
+        ips = random_ips(10000, version=6, rng=np.random.default_rng(1))
+        addresses = [ ipaddress.IPv6Address(x) for x in ips ]
+        assert all(x in ipaddress.IPv6Network('2000::/3') for x in addresses)
+        assert all(x.is_global for x in addresses)
+        assert len(set(addresses)) == 10000
+
+    def test_networks(self):
+        networks = ['8.8.8.0/24', '1.1.1.0/30']
+        ips = random_ips(5000, networks=networks, rng=np.random.default_rng(2))
+        blocks = [ ipaddress.IPv4Network(x) for x in networks ]
+        counts = [ sum(ipaddress.IPv4Address(x) in block for x in ips)
+                   for block in blocks ]
+        assert sum(counts) == 5000
+        # drawn uniformly over addresses, 256:4.
+        assert counts[0] > counts[1] * 20
+
+        ips = random_ips(100, version=6, networks='2001:4860::/32')
+        assert all(ipaddress.IPv6Address(x) in ipaddress.IPv6Network('2001:4860::/32')
+                   for x in ips)
+
+    def test_exclude_private(self):
+        ips = random_ips(100, networks=['10.0.0.0/8', '8.8.8.8/32'])
+        assert set(ips) == {'8.8.8.8'}
+
+        ips = random_ips(100, networks='10.0.0.0/8', exclude_private=False)
+        assert all(ipaddress.IPv4Address(x).is_private for x in ips)
+
+        with pytest.raises(ValueError):
+            random_ips(10, networks='192.168.0.0/16')
+        with pytest.raises(ValueError):
+            random_ips(10, version=4, networks='2000::/3')
+        with pytest.raises(ValueError):
+            random_ips(10, version=5)
+
+    def test_scraper(self):
+        sc = Scraper(sleep=0)
+        assert ipaddress.ip_address(sc.get_random_ipv4()).version == 4
+        assert ipaddress.ip_address(sc.get_random_ipv6()).version == 6
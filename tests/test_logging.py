@@ -0,0 +1,61 @@
+import sys
+import json
+import threading
+sys.path.insert(0,"../scrapinghelper")
+
+from scrapinghelper import logger, LogConfig
+from scrapinghelper.logging import BatchedSink
+
+class SlowStream(object):
+    def __init__(self):
+        self.writes = list()
+        self.event = threading.Event()
+
+    def write(self, message):
+        self.event.wait(5)
+        self.writes.append(message)
+
+    def flush(self):
+        pass
+
+
+class TestClass:
+    def test_batched_sink_writes_in_batches(self, tmp_path):
+        path = tmp_path / 'log.txt'
+        sink = BatchedSink(path, batch_size=10, flush_interval=0.1)
+        for n in range(25):
+            sink.write('{}\n'.format(n))
+        sink.stop()
+        lines = path.read_text().splitlines()
+        assert lines == [ str(n) for n in range(25) ]
+
+    def test_batched_sink_does_not_block_writer(self):
+        stream = SlowStream()
+        sink = BatchedSink(stream, batch_size=100, flush_interval=0.1)
+        for n in range(10):
+            sink.write('{}\n'.format(n))
+        assert len(stream.writes) <= 1
+        stream.event.set()
+        sink.stop()
+        assert ''.join(stream.writes) == ''.join(
+                    '{}\n'.format(n) for n in range(10))
+
+    def test_logconfig_batched_serialize(self, tmp_path):
+        path = tmp_path / 'log.json'
+        config = LogConfig(file=path, serialize=True, colorize=False,
+                           batch_size=10, flush_interval=0.1)
+        handler = config.config()['handlers'][0]
+        assert isinstance(handler['sink'], BatchedSink)
+        assert handler['enqueue'] is False
+        handler_id = logger.add(**handler)
+        try:
+            logger.info('URL: {}', 'https://example.com/')
+        finally:
+            logger.remove(handler_id)
+        record = json.loads(path.read_text().splitlines()[0])
+        assert record['record']['message'] == 'URL: https://example.com/'
+
+    def test_logconfig_default_sink(self):
+        handler = LogConfig().config()['handlers'][0]
+        assert handler['sink'] is sys.stdout
+        assert handler['enqueue'] is False
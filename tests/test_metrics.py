@@ -0,0 +1,88 @@
+import sys
+import asyncio
+
+sys.path.insert(0,"../scrapinghelper")
+
+import pytest
+import requests
+from scrapinghelper import Scraper, Metrics, FetchTiming
+
+class TestClass:
+    def test_metrics_summary(self):
+        m = Metrics()
+        for n in range(100):
+            m.record(FetchTiming(url='http://example.com/', host='example.com',
+                                 proxy=None, status=200 if n % 10 else 503,
+                                 ttfb=n / 100, total=n / 10, bytes=10))
+        summary = m.summary()
+        host = summary['host']['example.com']
+        assert host['requests'] == 100
+        assert host['errors'] == 10
+        assert host['bytes'] == 1000
+        assert abs(host['latency']['total'][0.5] - 4.95) < 1e-6
+        assert abs(host['latency']['ttfb'][0.99] - 0.9801) < 1e-6
+        assert summary['proxy']['direct']['requests'] == 100
+
+    def test_metrics_prometheus(self):
+        m = Metrics()
+        m.record(FetchTiming(url='http://example.com/', host='example.com',
+                             proxy='socks5://127.0.0.1:9050', status=200,
+                             total=0.5, bytes=10))
+        text = m.to_prometheus()
+        assert 'scrapinghelper_requests_total{host="example.com"} 1' in text
+        assert ( 'scrapinghelper_proxy_requests_total'
+                 '{proxy="socks5://127.0.0.1:9050"} 1' ) in text
+        assert 'scrapinghelper_requests_total{proxy=' not in text
+        assert ( 'scrapinghelper_proxy_fetch_seconds_count'
+                 '{proxy="socks5://127.0.0.1:9050",phase="total"} 1' ) in text
+        assert ( 'scrapinghelper_fetch_seconds{host="example.com",'
+                 'phase="total",quantile="0.5"} 0.5' ) in text
+        assert ( 'scrapinghelper_fetch_seconds_count{host="example.com",'
+                 'phase="total"} 1' ) in text
+
+    def test_request_timing(self, http_server):
+        (http_server.docroot / 'index.html').write_text('<p>hello</p>')
+        s = Scraper(sleep=0)
+        response = s.request(http_server.url + '/index.html', render=False)
+        timing = response.timing
+        assert timing.host == 'localhost'
+        assert timing.status == 200
+        assert timing.bytes == 12
+        assert timing.connect > 0
+        assert timing.ttfb > 0
+        assert timing.total >= timing.connect + timing.ttfb
+
+        response = s.request(http_server.url + '/index.html', render=False)
+        assert response.timing.connect == 0
+
+        s.download_file(http_server.url + '/index.html',
+                        filename=str(http_server.docroot / 'copy.html'))
+        summary = s.metrics.summary()
+        assert summary['host']['localhost']['requests'] == 3
+        assert summary['host']['localhost']['bytes'] == 36
+        s.close()
+
+    def test_request_failure_recorded(self):
+        s = Scraper(sleep=0)
+        assert s.request('http://127.0.0.1:9/', render=False) is None
+        summary = s.metrics.summary()
+        assert summary['host']['127.0.0.1']['errors'] == 1
+        s.close()
+
+    def test_request_async_timing(self, http_server):
+        (http_server.docroot / 'index.html').write_text('<p>hello</p>')
+
+        async def run(sc):
+            response = await sc.request_async(http_server.url + '/index.html',
+                                              render=False)
+            with pytest.raises(requests.exceptions.ConnectionError):
+                await sc.request_async('http://127.0.0.1:9/', render=False)
+            return response
+
+        with Scraper(sleep=0) as sc:
+            response = asyncio.run(run(sc))
+        assert response.timing.status == 200
+        assert response.timing.bytes == 12
+        summary = sc.metrics.summary()
+        assert summary['host']['localhost']['requests'] == 1
+        assert summary['host']['127.0.0.1']['errors'] == 1
@@ -0,0 +1,60 @@
+import sys
+sys.path.insert(0,"../scrapinghelper")
+
+import pytest
+from scrapinghelper import Scraper, ParsePool, ExtractionSchema, HTML
+from scrapinghelper.parallel import parse_links, parse_texts, parse_tables
+
+PAGE = '''<html><body>
+<table id="list">
+<tr><th>name</th><th>price</th></tr>
+<tr><td><a href="/files/a.csv">a</a></td><td>1.5</td></tr>
+<tr><td><a href="/files/b.txt">b</a></td><td>2.5</td></tr>
+</table>
+<a href="#top">top</a>
+<a href="mailto:info@example.com">mail</a>
+</body></html>'''
+URL = 'https://www.example.com/list/index.html'
+
+class TestClass:
+    def test_parse_links(self):
+        links = parse_links(PAGE.encode(), URL)
+        assert links == [('a', 'https://www.example.com/files/a.csv'),
+                         ('b', 'https://www.example.com/files/b.txt')]
+        links = parse_links(PAGE.encode(), URL, endswith='.csv')
+        assert links == [('a', 'https://www.example.com/files/a.csv')]
+
+    def test_parse_texts_same_as_get_texts(self):
+        sc = Scraper(sleep=0)
+        expect = sc.get_texts(['table', 'tr'], html=HTML(html=PAGE, url=URL))
+        assert parse_texts(PAGE.encode(), URL) == expect
+
+    def test_parse_tables(self):
+        tables = parse_tables(PAGE.encode())
+        assert tables == [[['name', 'price'], ['a', '1.5'], ['b', '2.5']]]
+
+    def test_parse_empty(self):
+        assert parse_links(b'') == []
+
+    def test_pool(self):
+        schema = ExtractionSchema({'name': 'td a', 'price': ('td + td', None, float)},
+                                  root='tr')
+        pages = [ (PAGE, URL) for _ in range(5) ]
+        with ParsePool(workers=2, chunksize=2) as pool:
+            future = pool.submit('links', (PAGE, URL), containing='files')
+            assert len(future.result()) == 2
+            results = list(pool.map('extract', pages, schema=schema))
+            assert len(results) == 5
+            assert results[0] == [{'name': None, 'price': None},
+                                  {'name': 'a', 'price': 1.5},
+                                  {'name': 'b', 'price': 2.5}]
+            with pytest.raises(ValueError):
+                pool.submit('unknown', PAGE)
+
+    def test_scraper_parse(self):
+        sc = Scraper(sleep=0)
+        html = HTML(html=PAGE, url=URL)
+        assert sc.parse('tables', html).result()[0][1] == ['a', '1.5']
+        with ParsePool(workers=1) as pool:
+            sc.parse_pool = pool
+            assert len(sc.parse('links', html).result()) == 2
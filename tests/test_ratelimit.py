@@ -0,0 +1,153 @@
+import sys
+import time
+import fcntl
+import asyncio
+import multiprocessing
+
+sys.path.insert(0,"../scrapinghelper")
+
+from scrapinghelper import Scraper, RateLimiter, SharedRateLimiter, URL
+from scrapinghelper.ratelimit import TokenBucket, hostname
+
+def shared_reserve(path):
+    limiter = SharedRateLimiter(path, rate=0.1)
+    delay = limiter.reserve('example.com')
+    limiter.close()
+    return delay
+
+def inherited_reserve(limiter, queue):
+    start = time.monotonic()
+    limiter.reserve('example.com')
+    queue.put(time.monotonic() - start)
+
+class TestClass:
+    def test_hostname(self):
+        assert hostname('https://Example.com/path') == 'example.com'
+        assert hostname(URL('https://example.com/path')) == 'example.com'
+        assert hostname('example.com') == 'example.com'
+
+    def test_token_bucket(self):
+        bucket = TokenBucket(rate=2.0, burst=2)
+        now = bucket.updated
+        assert bucket.reserve(now) == 0.0
+        assert bucket.reserve(now) == 0.0
+        assert bucket.reserve(now) == 0.5
+        assert bucket.reserve(now) == 1.0
+        assert bucket.reserve(now + 1.0) == 0.5
+
+    def test_unlimited(self):
+        limiter = RateLimiter()
+        assert all(limiter.reserve('example.com') == 0 for _ in range(100))
+
+    def test_scraper_default_unlimited(self, http_server):
+        (http_server.docroot / 'index.html').write_text('<html></html>')
+        # sleep is render wait, not rate limit.
+        with Scraper() as sc:
+            assert sc.rate_limiter.rate == 0.0
+            start = time.monotonic()
+            for _ in range(3):
+                assert sc.fetch(http_server.url + '/index.html').ok
+            assert time.monotonic() - start < 5
+
+    def test_download_sleep_per_call(self, http_server, tmp_path):
+        (http_server.docroot / 'file.txt').write_text('data')
+        url = http_server.url + '/file.txt'
+        with Scraper() as sc:
+            start = time.monotonic()
+            assert sc.download_file(url, str(tmp_path / 'a.txt'), sleep=1)
+            assert sc.download_file(url, str(tmp_path / 'b.txt'), sleep=1)
+            assert time.monotonic() - start >= 1.0
+            # other requests to the host are not throttled by sleep.
+            assert sc.rate_limiter.reserve(url) == 0.0
+            assert sc.rate_limiter.reserve(url) == 0.0
+
+    def test_per_domain(self):
+        limiter = RateLimiter(rate=1.0,
+                              domains={'fast.example.com': {'rate': 0}})
+        assert limiter.reserve('https://slow.example.com/1') == 0.0
+        assert limiter.reserve('https://slow.example.com/2') > 0.9
+        assert limiter.reserve('https://other.example.com/1') == 0.0
+        assert all(limiter.reserve('fast.example.com') == 0
+                   for _ in range(10))
+
+    def test_configure_keeps_state(self):
+        limiter = RateLimiter()
+        limiter.configure('example.com', rate=1.0)
+        assert limiter.reserve('example.com') == 0.0
+        limiter.configure('example.com', rate=1.0)
+        assert limiter.reserve('example.com') > 0.9
+
+    def test_wait_async_does_not_block_other_hosts(self):
+        limiter = RateLimiter(rate=5.0)
+        limiter.reserve('slow.example.com')
+
+        async def main():
+            start = time.monotonic()
+            slow = asyncio.ensure_future(limiter.wait_async('slow.example.com'))
+            await limiter.wait_async('fast.example.com')
+            fast_elapsed = time.monotonic() - start
+            await slow
+            return fast_elapsed, time.monotonic() - start
+
+        fast_elapsed, total = asyncio.run(main())
+        assert fast_elapsed < 0.1
+        assert total >= 0.15
+
+    def test_cooldown(self):
+        limiter = RateLimiter()
+        limiter.cooldown('example.com', 5.0)
+        assert limiter.reserve('example.com') > 4.9
+        assert limiter.reserve('other.example.com') == 0.0
+
+    def test_shared_between_instances(self, tmp_path):
+        path = tmp_path / 'ratelimit'
+        a = SharedRateLimiter(path, rate=1.0)
+        b = SharedRateLimiter(path, rate=1.0)
+        assert a.reserve('example.com') == 0.0
+        assert b.reserve('example.com') > 0.9
+        assert b.reserve('other.example.com') == 0.0
+        a.cooldown('other.example.com', 5.0)
+        assert b.reserve('other.example.com') > 4.9
+        a.close()
+        b.close()
+
+    def test_shared_between_processes(self, tmp_path):
+        path = str(tmp_path / 'ratelimit')
+        ctx = multiprocessing.get_context('spawn')
+        with ctx.Pool(4) as pool:
+            delays = sorted(pool.map(shared_reserve, [path] * 4))
+        assert delays[0] == 0.0
+        for n in range(1, 4):
+            assert abs(delays[n] - n * 10.0) < 1.0
+
+    def test_shared_slots_full(self, tmp_path):
+        limiter = SharedRateLimiter(tmp_path / 'ratelimit', rate=1.0, slots=2)
+        assert limiter.reserve('a.example.com') == 0.0
+        assert limiter.reserve('b.example.com') == 0.0
+        try:
+            limiter.reserve('c.example.com')
+        except RuntimeError:
+            pass
+        else:
+            assert False, 'full table must not share slots'
+        assert limiter.reserve('a.example.com') > 0.9
+        limiter.close()
+
+    def test_shared_after_fork(self, tmp_path):
+        limiter = SharedRateLimiter(tmp_path / 'ratelimit', rate=1.0)
+        ctx = multiprocessing.get_context('fork')
+        queue = ctx.Queue()
+        # the child must wait for lock of parent, not share it.
+        fcntl.flock(limiter._fd, fcntl.LOCK_EX)
+        try:
+            process = ctx.Process(target=inherited_reserve,
+                                  args=(limiter, queue))
+            process.start()
+            time.sleep(0.3)
+        finally:
+            fcntl.flock(limiter._fd, fcntl.LOCK_UN)
+        assert queue.get(timeout=10) >= 0.25
+        process.join()
+        # state written by the child is seen by the parent.
+        assert limiter.reserve('example.com') > 0.9
+        limiter.close()
@@ -0,0 +1,172 @@
+import sys
+import asyncio
+sys.path.insert(0,"../scrapinghelper")
+
+import time
+import pyppeteer.errors
+from scrapinghelper import Scraper, ResourceBlocker, TRACKER_PATTERNS, HTML
+from scrapinghelper import (
+    WaitForSelector, WaitForNetworkIdle, WaitForFunction
+)
+from scrapinghelper.render import render_page
+
+class FakeRequest(object):
+    def __init__(self, url, resource_type):
+        self.url = url
+        self.resourceType = resource_type
+        self.result = None
+
+    async def abort(self):
+        self.result = 'abort'
+
+    async def continue_(self):
+        self.result = 'continue'
+
+class FakePage(object):
+    def __init__(self, content='<html><body>rendered</body></html>',
+                 ready_after=0.0):
+        self.interception = False
+        self.handlers = dict()
+        self._content = content
+        self.ready_after = ready_after
+        self.loaded = None
+        self.closed = False
+        self.calls = list()
+
+    async def setRequestInterception(self, value):
+        self.interception = value
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    async def goto(self, url, options=None):
+        self.calls.append(('goto', url))
+        self.loaded = time.monotonic()
+
+    async def _wait(self, name, options):
+        self.calls.append((name, options))
+        if self.ready_after > options['timeout'] / 1000:
+            raise pyppeteer.errors.TimeoutError('timeout')
+        await asyncio.sleep(self.ready_after)
+
+    async def waitForSelector(self, selector, options=None):
+        await self._wait('waitForSelector', options)
+
+    async def waitForFunction(self, expression, options=None):
+        await self._wait('waitForFunction', options)
+
+    async def content(self):
+        return self._content
+
+    async def close(self):
+        self.closed = True
+
+class FakeBrowser(object):
+    def __init__(self, **kwargs):
+        self.pages = list()
+        self.kwargs = kwargs
+
+    async def newPage(self):
+        page = FakePage(**self.kwargs)
+        self.pages.append(page)
+        return page
+
+
+class TestClass:
+    def test_is_blocked(self):
+        blocker = ResourceBlocker(patterns=TRACKER_PATTERNS)
+        assert blocker.is_blocked('https://example.com/a.png', 'image')
+        assert blocker.is_blocked('https://example.com/a.woff2', 'font')
+        assert not blocker.is_blocked('https://example.com/a.css', 'stylesheet')
+        assert blocker.is_blocked(
+            'https://www.google-analytics.com/analytics.js', 'script')
+        assert not blocker.is_blocked('https://example.com/', 'document')
+
+    def test_intercept_counters(self):
+        blocker = ResourceBlocker()
+        requests = [ FakeRequest('https://example.com/a.png', 'image'),
+                     FakeRequest('https://example.com/b.mp4', 'media'),
+                     FakeRequest('https://example.com/app.js', 'script') ]
+
+        async def run():
+            for request in requests:
+                await blocker._intercept(request)
+
+        asyncio.run(run())
+        assert [ x.result for x in requests ] == ['abort', 'abort', 'continue']
+        assert blocker.stats() == {'blocked': 2, 'allowed': 1,
+                                   'by_type': {'image': 1, 'media': 1}}
+
+    def test_install_on_browser(self):
+        blocker = ResourceBlocker()
+        browser = blocker.install(FakeBrowser())
+        assert blocker.install(browser) is browser
+        page = asyncio.run(browser.newPage())
+        assert page.interception
+        assert 'request' in page.handlers
+
+    def test_scraper_default_blocker(self):
+        assert Scraper(sleep=0).resource_blocker.resource_types == {
+                    'image', 'media', 'font'}
+        assert Scraper(sleep=0, block_resources=False).resource_blocker is None
+
+    def test_render_page_wait_for_selector(self):
+        browser = FakeBrowser(ready_after=0.05)
+        html = HTML(html='<html><body>raw</body></html>',
+                    url='https://example.com/')
+        start = time.monotonic()
+        asyncio.run(render_page(browser, html, wait=0,
+                                wait_for=WaitForSelector('#app', timeout=5)))
+        assert time.monotonic() - start < 1.0
+        assert html.find('body', first=True).text == 'rendered'
+        page = browser.pages[0]
+        assert page.calls[0] == ('goto', 'https://example.com/')
+        assert page.calls[1] == ('waitForSelector',
+                                 {'visible': False, 'timeout': 5000})
+        assert page.closed
+
+    def test_wait_timeout_renders_anyway(self):
+        page = FakePage(ready_after=10)
+        assert not asyncio.run(
+                    WaitForFunction('window.ready', timeout=0.1).wait(page))
+        assert asyncio.run(
+                    WaitForFunction('window.ready', timeout=20).wait(
+                        FakePage(ready_after=0)))
+
+    def test_wait_for_network_idle(self):
+        strategy = WaitForNetworkIdle(max_inflight=0, idle_time=0.1,
+                                      timeout=2)
+        page = FakePage()
+
+        async def run():
+            inflight = await strategy.prepare(page)
+            page.handlers['request']('a')
+            page.handlers['request']('b')
+            loop = asyncio.get_running_loop()
+            loop.call_later(0.1, page.handlers['requestfinished'], 'a')
+            loop.call_later(0.2, page.handlers['requestfailed'], 'b')
+            start = time.monotonic()
+            ready = await strategy.wait(page, inflight)
+            return ready, time.monotonic() - start
+
+        ready, elapsed = asyncio.run(run())
+        assert ready
+        assert 0.3 <= elapsed < 1.0
+
+    def test_wait_for_network_idle_timeout(self):
+        strategy = WaitForNetworkIdle(timeout=0.2)
+        page = FakePage()
+
+        async def run():
+            inflight = await strategy.prepare(page)
+            page.handlers['request']('a')
+            return await strategy.wait(page, inflight)
+
+        assert not asyncio.run(run())
+
+    def test_default_render_kwargs(self):
+        sc = Scraper(sleep=3, block_resources=False)
+        kwargs = sc._render_kwargs({'keep_page': False}, 0, sc.sleep)
+        assert isinstance(kwargs['wait_for'], WaitForNetworkIdle)
+        assert kwargs['wait_for'].timeout == 3
+        assert 'wait_for' not in sc._render_kwargs({'sleep': 1}, 0, 3)
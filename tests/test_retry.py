@@ -0,0 +1,157 @@
+import sys
+import time
+import asyncio
+import threading
+import pytest
+import requests
+
+sys.path.insert(0,"../scrapinghelper")
+
+from scrapinghelper import Scraper, RetryPolicy, RetryBudget, RetryScheduler
+from scrapinghelper.retry import parse_retry_after
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+class TestClass:
+    def test_parse_retry_after(self):
+        assert parse_retry_after('120') == 120.0
+        assert parse_retry_after('') is None
+        assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0.0
+        assert parse_retry_after('invalid') is None
+
+    def test_classify(self):
+        policy = RetryPolicy()
+        assert policy.is_retryable(FakeResponse(503)) == True
+        assert policy.is_retryable(FakeResponse(404)) == False
+        assert policy.is_retryable(
+                exception=requests.exceptions.ConnectionError()) == True
+        assert policy.is_retryable(exception=ValueError()) == False
+
+    def test_backoff_full_jitter(self):
+        policy = RetryPolicy(backoff=1.0, backoff_max=5.0)
+        for attempt in range(10):
+            delay = policy.backoff_delay(attempt)
+            assert 0 <= delay <= min(5.0, 2 ** attempt)
+
+    def test_delay(self):
+        policy = RetryPolicy(max_retries=2, retry_after_max=60)
+        assert policy.delay(0, FakeResponse(503, {'Retry-After': '7'})) == 7.0
+        assert policy.delay(0, FakeResponse(503, {'Retry-After': '61'})) is None
+        assert policy.delay(2, FakeResponse(503)) is None
+
+    def test_budget(self):
+        budget = RetryBudget(2)
+        policy = RetryPolicy(max_retries=5, backoff=0.0, budget=budget)
+        assert policy.delay(0) == 0.0
+        assert policy.delay(0) == 0.0
+        assert policy.delay(0) is None
+        assert budget.remaining == 0
+
+    def test_request_retry_after(self, http_server):
+        http_server.routes['/page'] = [
+            (503, {'Retry-After': '1'}, b'busy'),
+            (200, {'Content-Type': 'text/html'}, b'<p>ok</p>'),
+        ]
+        s = Scraper(sleep=0, retry=RetryPolicy(max_retries=2))
+        start = time.monotonic()
+        response = s.request(http_server.url + '/page', render=False)
+        assert response.status_code == 200
+        assert response.text == '<p>ok</p>'
+        assert time.monotonic() - start >= 1.0
+        s.close()
+
+    def test_request_retry_exhausted(self, http_server):
+        http_server.routes['/page'] = [
+            (500, {}, b'error') for _ in range(3) ]
+        s = Scraper(sleep=0)
+        policy = RetryPolicy(max_retries=2, backoff=0.01)
+        response = s.request(http_server.url + '/page',
+                             render=False, retry=policy)
+        assert response.status_code == 500
+        assert http_server.routes['/page'] == []
+        s.close()
+
+    def test_scheduler(self):
+        calls = list()
+        lock = threading.Lock()
+
+        def job(name, attempt):
+            with lock:
+                calls.append((name, attempt, time.monotonic()))
+            if name == 'flaky' and attempt < 2:
+                return FakeResponse(503)
+            return FakeResponse(200)
+
+        policy = RetryPolicy(max_retries=3, backoff=0.2, backoff_max=0.2)
+        with RetryScheduler(policy, workers=1) as scheduler:
+            flaky = scheduler.submit(job, 'flaky')
+            others = [ scheduler.submit(job, 'other') for _ in range(5) ]
+            assert flaky.result(timeout=5).status_code == 200
+            assert all(x.result(timeout=5).status_code == 200
+                       for x in others)
+
+        attempts = [ x[1] for x in calls if x[0] == 'flaky' ]
+        assert attempts == [0, 1, 2]
+        # a single worker served other jobs while flaky was waiting.
+        names = [ x[0] for x in calls ]
+        assert names.index('other') < names.index('flaky', 1)
+
+    def test_scheduler_without_attempt(self):
+        calls = list()
+
+        def job(url, **kwargs):
+            calls.append(kwargs)
+            return FakeResponse(200)
+
+        with RetryScheduler(RetryPolicy()) as scheduler:
+            assert scheduler.submit(job, 'a', timeout=1).result(timeout=5).status_code == 200
+        assert calls == [{'timeout': 1}]
+
+    def test_backoff_per_request(self, http_server):
+        policy = RetryPolicy(max_retries=2, backoff=0.1, backoff_max=0.1)
+        with Scraper(sleep=0, retry=policy) as s:
+            cooldowns = list()
+            cooldown = s.rate_limiter.cooldown
+            def record(url, seconds):
+                cooldowns.append(seconds)
+                cooldown(url, seconds)
+            s.rate_limiter.cooldown = record
+            assert not s.fetch('http://127.0.0.1:9/', timeout=1).ok
+            assert s.request('http://127.0.0.1:9/', render=False) is None
+            # backoff of exceptions does not hold other requests to the host.
+            assert cooldowns == []
+
+            http_server.routes['/page'] = [
+                (500, {}, b'error'),
+                (429, {}, b'slow down'),
+                (200, {}, b'ok'),
+            ]
+            assert s.fetch(http_server.url + '/page').status_code == 200
+            assert len(cooldowns) == 1
+
+    def test_throttles_host(self):
+        policy = RetryPolicy()
+        assert policy.throttles_host(FakeResponse(429)) == True
+        assert policy.throttles_host(FakeResponse(503, {'Retry-After': '1'})) == True
+        assert policy.throttles_host(FakeResponse(503)) == False
+        assert policy.throttles_host(None) == False
+        assert RetryPolicy(retry_after=False).throttles_host(
+                    FakeResponse(503, {'Retry-After': '1'})) == False
+
+    def test_request_async_retry_exception(self):
+        policy = RetryPolicy(max_retries=2, backoff=0.01)
+        with Scraper(sleep=0, retry=policy) as s:
+            with pytest.raises(requests.exceptions.ConnectionError):
+                asyncio.run(s.request_async('http://127.0.0.1:9/', render=False))
+        summary = s.metrics.summary()
+        assert summary['host']['127.0.0.1']['requests'] == 3
+        assert summary['host']['127.0.0.1']['errors'] == 3
+
+    def test_scheduler_fetch(self, http_server):
+        (http_server.docroot / 'index.html').write_text('<html></html>')
+        with Scraper(sleep=0) as s, RetryScheduler(RetryPolicy()) as scheduler:
+            future = scheduler.submit(s.fetch, http_server.url + '/index.html')
+            assert future.result(timeout=10).ok
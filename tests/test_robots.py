@@ -0,0 +1,121 @@
+import sys
+import asyncio
+sys.path.insert(0,"../scrapinghelper")
+
+import pytest
+from scrapinghelper import (
+    Scraper, RobotsCache, RateLimiter, WebScraperDisallowed, WebScraperException
+)
+from scrapinghelper.robots import RobotsRules, RuleTrie
+
+ROBOTS = b"""
+User-agent: *
+Disallow: /private/
+Allow: /private/public.html
+Disallow: /*.pdf$
+Crawl-delay: 2
+
+User-agent: mybot
+User-agent: otherbot
+Disallow: /
+Allow: /index.html
+Request-rate: 1/10s
+
+Sitemap: https://example.com/sitemap.xml
+"""
+
+class TestClass:
+    @pytest.mark.parametrize('path, expected', [
+        ('/', True),
+        ('/private/', False),
+        ('/private/a.html', False),
+        ('/private/public.html', True),
+        ('/docs/a.pdf', False),
+        ('/docs/a.pdf?x=1', True),
+        ('/privat', True),
+    ])
+    def test_rules(self, path, expected):
+        rules = RobotsRules.parse(ROBOTS.decode(), '*')
+        assert rules.allowed(path) == expected
+        assert rules.crawl_delay == 2.0
+        assert rules.rate == 0.5
+        assert rules.sitemaps == ['https://example.com/sitemap.xml']
+
+    def test_user_agent_group(self):
+        rules = RobotsRules.parse(ROBOTS.decode(), 'MyBot/1.0')
+        assert not rules.allowed('/about.html')
+        assert rules.allowed('/index.html')
+        assert rules.crawl_delay is None
+        assert rules.request_rate == 0.1
+
+    def test_longest_match(self):
+        trie = RuleTrie([(False, '/a'), (True, '/a/b'), (False, '/a/b/c'),
+                         (True, '/x'), (False, '/x'), (True, '/*.html')])
+        assert trie.match('/a/z') == (2, False)
+        assert trie.allowed('/a/b/z')
+        assert not trie.allowed('/a/b/c/d')
+        # Allow wins tie.
+        assert trie.allowed('/x')
+        assert trie.allowed('/a/b/c/d.html')
+        assert trie.match('/z') is None
+
+    def test_cache(self, http_server):
+        http_server.routes['/robots.txt'] = [
+            (200, {'Cache-Control': 'max-age=3600'}, ROBOTS),
+        ]
+        limiter = RateLimiter(rate=1.0)
+        robots = RobotsCache(rate_limiter=limiter)
+        assert not robots.is_fresh(http_server.url + '/')
+        assert robots.can_fetch(http_server.url + '/index.html')
+        assert not robots.can_fetch(http_server.url + '/private/a.html')
+        assert robots.is_fresh(http_server.url + '/')
+        assert robots.requests == 1
+        assert robots.crawl_delay(http_server.url) == 2.0
+        # Crawl-delay lowers rate, and never raises it.
+        assert limiter._settings['localhost'] == {'rate': 0.5}
+        limiter.throttle('localhost', 10.0)
+        assert limiter._settings['localhost'] == {'rate': 0.5}
+
+        robots.invalidate(http_server.url)
+        # 404 allows all, 5xx disallows all.
+        http_server.routes['/robots.txt'] = [ (404, {}, b''), (503, {}, b'') ]
+        assert robots.can_fetch(http_server.url + '/private/a.html')
+        robots.invalidate()
+        assert not robots.can_fetch(http_server.url + '/index.html')
+        assert robots.requests == 3
+
+    def test_scraper(self, http_server, tmp_path):
+        (http_server.docroot / 'index.html').write_text('<html></html>')
+        http_server.routes['/robots.txt'] = [ (200, {}, ROBOTS) ]
+        url = http_server.url
+        with Scraper(sleep=0, robots=RobotsCache()) as sc:
+            assert sc.request(url + '/index.html', render=False).status_code == 200
+            with pytest.raises(WebScraperDisallowed):
+                sc.request(url + '/private/a.html', render=False)
+            with pytest.raises(WebScraperException):
+                sc.download_file(url + '/docs/a.pdf', str(tmp_path / 'a.pdf'))
+            result = sc.fetch(url + '/private/a.html')
+            assert isinstance(result.error, WebScraperDisallowed)
+            assert not result.ok
+            assert sc.robots.requests == 1
+            assert sc.robots.rate_limiter is sc.rate_limiter
+        paths = [ x[0] for x in http_server.requests ]
+        assert paths.count('/robots.txt') == 1
+        assert '/private/a.html' not in paths
+
+    def test_request_async(self, http_server):
+        (http_server.docroot / 'index.html').write_text('<html></html>')
+        http_server.routes['/robots.txt'] = [ (200, {}, ROBOTS) ]
+        url = http_server.url
+
+        async def run(sc):
+            with pytest.raises(WebScraperDisallowed):
+                await sc.request_async(url + '/private/a.html', render=False)
+            return await sc.request_async(url + '/index.html', render=False)
+
+        with Scraper(sleep=0, robots=RobotsCache()) as sc:
+            assert asyncio.run(run(sc)).status_code == 200
+            assert sc.robots.requests == 1
+        paths = [ x[0] for x in http_server.requests ]
+        assert paths.count('/robots.txt') == 1
+        assert '/private/a.html' not in paths
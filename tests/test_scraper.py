@@ -1,4 +1,5 @@
 import sys
+import asyncio
 
 sys.path.insert(0,"../scrapinghelper")
 
@@ -24,3 +25,77 @@ class TestClass:
         url = 'https://github.com/iisaka51/scrapinghelper/blob/main/scrapinghelper/data/20000%20User%20Agents.csv'
         expect = "User_Agents.csv"
         assert s.get_filename(url, replace={' ':'_', '20000_': ''} ) == expect
+
+    def test_fetch_shared_by_threads(self, http_server):
+        from concurrent.futures import ThreadPoolExecutor
+        for n in range(64):
+            (http_server.docroot / 'page{}.html'.format(n)).write_text(
+                '<html><body><p id="n">{}</p></body></html>'.format(n))
+        urls = [ '{}/page{}.html'.format(http_server.url, n) for n in range(64) ]
+        with Scraper(sleep=0, pool_maxsize=32) as sc:
+            with ThreadPoolExecutor(32) as executor:
+                results = list(executor.map(sc.fetch, urls))
+            assert sc.response is None
+            assert sc.session is None
+        for n, result in enumerate(results):
+            assert result.ok
+            assert result.url == urls[n]
+            assert result.html.find('#n', first=True).text == str(n)
+
+    def test_fetch_result_is_immutable(self, http_server):
+        (http_server.docroot / 'a.html').write_text('<p>a</p>')
+        with Scraper(sleep=0) as sc:
+            result = sc.fetch('{}/a.html'.format(http_server.url),
+                              headers={'X-Test': '1'})
+        assert result.status_code == 200
+        assert result.timing.status == 200
+        try:
+            result.headers['X-Test'] = '2'
+        except TypeError:
+            pass
+        else:
+            assert False, 'headers must be read-only'
+
+    def test_fetch_error(self):
+        with Scraper(sleep=0) as sc:
+            result = sc.fetch('http://127.0.0.1:9/', timeout=1)
+        assert not result.ok
+        assert result.error is not None
+        assert result.status_code is None
+
+    def test_render_loop_shared(self):
+        sc = Scraper(sleep=0)
+        loop = sc.render_loop
+        assert sc.render_loop is loop
+        sc.close()
+        assert not loop._thread.is_alive()
+
+    def test_close_async_session(self, http_server):
+        (http_server.docroot / 'index.html').write_text('<html></html>')
+        url = http_server.url + '/index.html'
+
+        async def run():
+            async with Scraper(sleep=0) as sc:
+                await sc.request_async(url, render=False)
+                session = sc.session
+            return sc, session
+
+        sc, session = asyncio.run(run())
+        assert sc.session is None
+        assert session.thread_pool._shutdown
+
+        # loop of session is closed by asyncio.run().
+        sc = Scraper(sleep=0)
+        asyncio.run(sc.request_async(url, render=False))
+        session = sc.session
+        sc.close()
+        assert session.thread_pool._shutdown
+
+    def test_sync_after_async(self, http_server):
+        (http_server.docroot / 'index.html').write_text('<html></html>')
+        url = http_server.url + '/index.html'
+        with Scraper(sleep=0) as sc:
+            assert sc.request(url, render=False).status_code == 200
+            response = asyncio.run(sc.request_async(url, render=False))
+            assert response.status_code == 200
+            assert sc.request(url, render=False).status_code == 200
@@ -0,0 +1,72 @@
+import sys
+import json
+sys.path.insert(0,"../scrapinghelper")
+
+import pytest
+from scrapinghelper import Scraper, ResultSink, ExtractionSchema, HTML
+
+ROWS = [ {'name': 'item{}'.format(x), 'price': x * 1.5} for x in range(10) ]
+
+class TestClass:
+    def test_csv_batches(self, tmp_path):
+        path = tmp_path / 'items.csv'
+        sink = ResultSink(path, batch_size=4)
+        sink.extend(ROWS)
+        # two batches flushed, two rows buffered.
+        assert sink.batches == 2
+        assert len(path.read_text().splitlines()) == 1 + 8
+        sink.close()
+        df = sink.read()
+        assert df.name.tolist() == [ x['name'] for x in ROWS ]
+        assert len(sink) == 10
+
+    def test_csv_append_without_header(self, tmp_path):
+        path = tmp_path / 'items.csv'
+        with ResultSink(path) as sink:
+            sink.extend(ROWS[:3])
+        with ResultSink(path) as sink:
+            sink.extend(ROWS[3:])
+        lines = path.read_text().splitlines()
+        assert lines[0] == 'name,price'
+        assert len(lines) == 11
+
+    def test_csv_new_column_after_header(self, tmp_path):
+        sink = ResultSink(tmp_path / 'items.csv', batch_size=1)
+        sink.append({'name': 'a'})
+        with pytest.raises(ValueError):
+            sink.append({'name': 'b', 'price': 1})
+
+    def test_jsonl_new_column(self, tmp_path):
+        path = tmp_path / 'items.jsonl'
+        with ResultSink(path, batch_size=2) as sink:
+            sink.append({'name': 'a'})
+            sink.append({'name': 'b', 'price': 1})
+            sink.append({'name': 'c', 'tags': ['x', 'y']})
+        rows = [ json.loads(x) for x in path.read_text().splitlines() ]
+        assert rows[0] == {'name': 'a', 'price': None}
+        assert rows[2] == {'name': 'c', 'price': None, 'tags': ['x', 'y']}
+
+    def test_parquet_parts(self, tmp_path):
+        pytest.importorskip('pyarrow')
+        path = tmp_path / 'items.parquet'
+        sink = ResultSink(path, batch_size=4)
+        sink.append({'name': 'a', 'price': None})
+        sink.extend(ROWS)
+        # flushed parts are complete files before close.
+        assert len(list(path.glob('part-*.parquet'))) == 2
+        sink.close()
+        df = ResultSink(path).read()
+        assert len(df) == 11
+        assert df.price.tolist()[1:] == [ x['price'] for x in ROWS ]
+
+    def test_unknown_format(self, tmp_path):
+        with pytest.raises(ValueError):
+            ResultSink(tmp_path / 'items.txt')
+
+    def test_scraper_extract_to_sink(self, tmp_path):
+        path = tmp_path / 'items.jsonl'
+        schema = ExtractionSchema({'name': 'a'}, root='li')
+        html = HTML(html='<ul><li><a>x</a></li><li><a>y</a></li></ul>')
+        with Scraper(sleep=0, sink=ResultSink(path, batch_size=100)) as sc:
+            assert sc.extract(schema, html) == [{'name': 'x'}, {'name': 'y'}]
+        assert len(path.read_text().splitlines()) == 2
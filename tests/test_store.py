@@ -0,0 +1,75 @@
+import os
+import sys
+sys.path.insert(0,"../scrapinghelper")
+
+from scrapinghelper import Scraper, DownloadStore
+from scrapinghelper.store import freshness
+
+class TestClass:
+    def test_freshness(self):
+        assert freshness({'Cache-Control': 'public, max-age=60'}, 100.0) == 160.0
+        assert freshness({'Cache-Control': 'no-cache, max-age=60'}, 100.0) == 0.0
+        assert freshness({'Expires': 'Thu, 01 Jan 1970 00:01:00 GMT'}) == 60.0
+        assert freshness({}) == 0.0
+
+    def test_dedup(self, http_server, tmp_path):
+        body = b'a,b\n1,2\n' * 100
+        http_server.routes['/a.csv'] = [(200, {}, body)]
+        http_server.routes['/b.csv?v=1'] = [(200, {}, body)]
+        store = DownloadStore(tmp_path / 'store')
+        with Scraper(sleep=0, store=store) as sc:
+            assert sc.download_file(http_server.url + '/a.csv',
+                                    str(tmp_path / 'a.csv'))
+            assert sc.download_file(http_server.url + '/b.csv?v=1',
+                                    str(tmp_path / 'b.csv'))
+        assert (tmp_path / 'a.csv').read_bytes() == body
+        assert (tmp_path / 'b.csv').read_bytes() == body
+        assert os.path.samefile(tmp_path / 'a.csv', tmp_path / 'b.csv')
+        assert len(list((tmp_path / 'store' / 'objects').glob('*/*'))) == 1
+        assert len(store) == 2
+        stats = store.stats()
+        assert stats['downloads'] == 2
+        assert stats['dedup'] == 1
+        assert stats['dedup_bytes'] == len(body)
+
+    def test_fresh_url_is_not_requested(self, http_server, tmp_path):
+        http_server.routes['/fresh.bin'] = [
+            (200, {'Cache-Control': 'max-age=3600'}, b'data'),
+        ]
+        store = DownloadStore(tmp_path / 'store', link=False)
+        with Scraper(sleep=0, store=store) as sc:
+            url = http_server.url + '/fresh.bin'
+            assert sc.download_file(url, str(tmp_path / '1.bin'))
+            # route was consumed, request would fail with 404.
+            assert sc.download_file(url, str(tmp_path / '2.bin'))
+        assert (tmp_path / '2.bin').read_bytes() == b'data'
+        assert not os.path.samefile(tmp_path / '1.bin', tmp_path / '2.bin')
+        assert store.stats()['hits'] == 1
+
+    def test_not_modified(self, http_server, tmp_path):
+        (http_server.docroot / 'data.bin').write_bytes(b'x' * 1000)
+        store = DownloadStore(tmp_path / 'store')
+        with Scraper(sleep=0, store=store) as sc:
+            url = http_server.url + '/data.bin'
+            assert sc.download_file(url, str(tmp_path / '1.bin'))
+            assert store.lookup(url).last_modified
+            assert sc.download_file(url, str(tmp_path / '2.bin'))
+        assert (tmp_path / '2.bin').read_bytes() == b'x' * 1000
+        stats = store.stats()
+        assert stats['downloads'] == 1
+        assert stats['not_modified'] == 1
+
+    def test_linked_file_is_replaced(self, http_server, tmp_path):
+        http_server.routes['/a.bin'] = [(200, {}, b'old'), (200, {}, b'new')]
+        store = DownloadStore(tmp_path / 'store')
+        filename = tmp_path / 'a.bin'
+        with Scraper(sleep=0, store=store) as sc:
+            assert sc.download_file(http_server.url + '/a.bin', str(filename))
+            blob = store.blob_path(store.lookup(http_server.url + '/a.bin').digest)
+            assert os.path.samefile(filename, blob)
+            assert not os.stat(blob).st_mode & 0o222
+            # without store, linked file must not be written in place.
+            sc.store = None
+            assert sc.download_file(http_server.url + '/a.bin', str(filename))
+            assert filename.read_bytes() == b'new'
+            assert blob.read_bytes() == b'old'
@@ -0,0 +1,182 @@
+import ssl
+import sys
+import shutil
+import asyncio
+import threading
+import subprocess
+sys.path.insert(0,"../scrapinghelper")
+
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+import pytest
+import requests
+from scrapinghelper import Scraper, AiohttpTransport
+from scrapinghelper.scraper import AsyncHTMLSession
+from requests_html import HTMLResponse
+
+aiohttp = pytest.importorskip('aiohttp')
+
+PAGE = b'<html><head><title>test</title></head><body><a href="/a">a</a></body></html>'
+
+@pytest.fixture
+def https_server(tmp_path):
+    """ HTTPS server of tmp_path with self-signed certificate of localhost. """
+    if shutil.which('openssl') is None:
+        pytest.skip('openssl is required.')
+    cert, key = tmp_path / 'cert.pem', tmp_path / 'key.pem'
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes',
+                    '-days', '1', '-subj', '/CN=localhost',
+                    '-addext', 'subjectAltName=DNS:localhost',
+                    '-keyout', str(key), '-out', str(cert)],
+                   check=True, capture_output=True)
+    (tmp_path / 'page.html').write_bytes(PAGE)
+
+    class Handler(SimpleHTTPRequestHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=str(tmp_path), **kwargs)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(str(cert), str(key))
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = 'https://localhost:{}'.format(server.server_port)
+    server.cafile = str(cert)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestClass:
+    def test_request_async(self, http_server):
+        http_server.routes['/page.html'] = [
+            (200, {'Content-Type': 'text/html; charset=utf-8',
+                   'Set-Cookie': 'sid=1; Path=/'}, PAGE),
+        ]
+        transport = AiohttpTransport()
+
+        async def run():
+            sc = Scraper(sleep=0, transport=transport)
+            response = await sc.request_async(
+                            http_server.url + '/page.html', render=False)
+            await transport.close()
+            return sc, response
+
+        sc, response = asyncio.run(run())
+        assert isinstance(response, HTMLResponse)
+        assert response.status_code == 200
+        assert response.encoding == 'utf-8'
+        assert response.html.find('title', first=True).text == 'test'
+        assert response.html.absolute_links == {http_server.url + '/a'}
+        assert sc.session.cookies.get('sid') == '1'
+        assert transport.requests == 1
+
+    def test_concurrent_requests(self, http_server):
+        (http_server.docroot / 'page.html').write_bytes(PAGE)
+        transport = AiohttpTransport(limit_per_host=4)
+
+        async def run():
+            session = AsyncHTMLSession(transport=transport)
+            responses = await asyncio.gather(*[
+                            session.get(http_server.url + '/page.html')
+                            for _ in range(50) ])
+            await transport.close()
+            await session.close()
+            return responses
+
+        responses = asyncio.run(run())
+        assert [ x.status_code for x in responses ] == [200] * 50
+        assert transport.requests == 50
+
+    def test_connection_error(self):
+        transport = AiohttpTransport()
+
+        async def run():
+            session = AsyncHTMLSession(transport=transport)
+            try:
+                await session.get('http://127.0.0.1:9/')
+            finally:
+                await transport.close()
+
+        with pytest.raises(requests.exceptions.ConnectionError):
+            asyncio.run(run())
+
+    def test_thread_transport(self, http_server):
+        (http_server.docroot / 'page.html').write_bytes(PAGE)
+
+        async def run():
+            session = AsyncHTMLSession()
+            response = await session.get(http_server.url + '/page.html')
+            await session.close()
+            return response
+
+        assert asyncio.run(run()).status_code == 200
+
+    @pytest.mark.parametrize('encoding', ['gzip', 'br', 'zstd'])
+    def test_content_encoding(self, http_server, encoding):
+        import gzip
+        import brotli
+        import zstandard
+        body = PAGE * 100
+        data = { 'gzip': gzip.compress,
+                 'br': brotli.compress,
+                 'zstd': zstandard.ZstdCompressor().compress }[encoding](body)
+        http_server.routes['/page.html'] = [
+            (200, {'Content-Type': 'text/html; charset=utf-8',
+                   'Content-Encoding': encoding}, data),
+            (200, {'Content-Encoding': encoding}, b'\xff' * 16),
+        ]
+        transport = AiohttpTransport()
+
+        async def run():
+            session = AsyncHTMLSession(transport=transport)
+            try:
+                response = await session.get(http_server.url + '/page.html')
+                with pytest.raises(requests.exceptions.ContentDecodingError):
+                    await session.get(http_server.url + '/page.html')
+            finally:
+                await transport.close()
+                await session.close()
+            return response
+
+        response = asyncio.run(run())
+        assert response.content == body
+        assert response.transfer.compressed == len(data)
+        assert response.transfer.decompressed == len(body)
+
+    def test_verify_ca_bundle(self, https_server):
+        transport = AiohttpTransport()
+        url = https_server.url + '/page.html'
+
+        async def run(verify):
+            session = AsyncHTMLSession(transport=transport)
+            session.verify = verify
+            try:
+                return await session.get(url)
+            finally:
+                await transport.close()
+                await session.close()
+
+        assert asyncio.run(run(https_server.cafile)).content == PAGE
+        with pytest.raises(requests.exceptions.ConnectionError):
+            asyncio.run(run(True))
+        assert asyncio.run(run(False)).status_code == 200
+
+    def test_socks_proxy_unsupported(self):
+        transport = AiohttpTransport()
+
+        async def run():
+            session = AsyncHTMLSession(transport=transport)
+            try:
+                await session.get('http://example.com/',
+                                  proxies={'http': 'socks5://127.0.0.1:9050'})
+            finally:
+                await transport.close()
+                await session.close()
+
+        with pytest.raises(requests.exceptions.RequestException):
+            asyncio.run(run())